@@ -0,0 +1,24 @@
+"""add operator-confirmed fields to import_tasks
+
+Revision ID: add_import_confirmed_fields
+Revises: add_quotation_item_list_fields
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_import_confirmed_fields'
+down_revision = 'add_quotation_item_list_fields'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('import_tasks', sa.Column('confirmed_fields', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('import_tasks', 'confirmed_fields')
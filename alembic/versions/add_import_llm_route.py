@@ -0,0 +1,26 @@
+"""add llm route/model columns to import_tasks
+
+Revision ID: add_import_llm_route
+Revises: add_sku_dedup_index
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_import_llm_route'
+down_revision = 'add_sku_dedup_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('import_tasks', sa.Column('llm_route', sa.String(), nullable=True))
+    op.add_column('import_tasks', sa.Column('llm_model', sa.String(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('import_tasks', 'llm_model')
+    op.drop_column('import_tasks', 'llm_route')
@@ -0,0 +1,32 @@
+"""add token usage columns to import_tasks
+
+Revision ID: add_import_token_usage
+Revises: add_original_filename
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_import_token_usage'
+down_revision = 'add_original_filename'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('import_tasks', sa.Column('input_tokens_estimated', sa.Integer(), nullable=True))
+    op.add_column('import_tasks', sa.Column('prompt_tokens', sa.Integer(), nullable=True))
+    op.add_column('import_tasks', sa.Column('completion_tokens', sa.Integer(), nullable=True))
+    op.add_column('import_tasks', sa.Column('llm_calls', sa.Integer(), nullable=True))
+    op.add_column('import_tasks', sa.Column('extraction_ms', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('import_tasks', 'extraction_ms')
+    op.drop_column('import_tasks', 'llm_calls')
+    op.drop_column('import_tasks', 'completion_tokens')
+    op.drop_column('import_tasks', 'prompt_tokens')
+    op.drop_column('import_tasks', 'input_tokens_estimated')
@@ -0,0 +1,70 @@
+"""add category and thumbnail_url to quotation_items for list aggregates
+
+Revision ID: add_quotation_item_list_fields
+Revises: add_quotation_stale_flags
+Create Date: 2026-10-19 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_quotation_item_list_fields'
+down_revision = 'add_quotation_stale_flags'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def _thumbnail(snapshot):
+    # Must match QuotationService._thumbnail
+    for media in (snapshot or {}).get("media") or []:
+        if isinstance(media, dict) and (media.get("thumbnail_url") or media.get("url")):
+            return media.get("thumbnail_url") or media.get("url")
+    return None
+
+
+def upgrade():
+    op.add_column('quotation_items', sa.Column('category', sa.String(), nullable=True))
+    op.add_column('quotation_items', sa.Column('thumbnail_url', sa.String(), nullable=True))
+
+    conn = op.get_bind()
+    conn.execute(sa.text(
+        "UPDATE quotation_items SET category = skus.category "
+        "FROM skus WHERE quotation_items.sku_id = skus.id"
+    ))
+
+    # Thumbnails come from the (possibly shared) snapshot
+    items = sa.table(
+        'quotation_items',
+        sa.column('id', sa.String),
+        sa.column('snapshot', sa.JSON),
+        sa.column('snapshot_hash', sa.String),
+        sa.column('thumbnail_url', sa.String)
+    )
+    snapshots = sa.table('quotation_snapshots', sa.column('hash', sa.String), sa.column('data', sa.JSON))
+    rows = conn.execute(
+        sa.select(items.c.id, sa.func.coalesce(snapshots.c.data, items.c.snapshot))
+        .select_from(items.outerjoin(snapshots, snapshots.c.hash == items.c.snapshot_hash))
+    )
+    while True:
+        batch = rows.fetchmany(BATCH_SIZE)
+        if not batch:
+            break
+        updates = [
+            {"item_id": item_id, "thumbnail": thumbnail}
+            for item_id, snapshot in batch
+            if (thumbnail := _thumbnail(snapshot))
+        ]
+        if updates:
+            conn.execute(
+                items.update().where(items.c.id == sa.bindparam("item_id")).values(thumbnail_url=sa.bindparam("thumbnail")),
+                updates
+            )
+
+
+def downgrade():
+    op.drop_column('quotation_items', 'thumbnail_url')
+    op.drop_column('quotation_items', 'category')
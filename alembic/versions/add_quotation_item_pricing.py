@@ -0,0 +1,30 @@
+"""add service dates and pricing basis to quotation_items
+
+Revision ID: add_quotation_item_pricing
+Revises: add_quotation_snapshots
+Create Date: 2026-10-19 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_quotation_item_pricing'
+down_revision = 'add_quotation_snapshots'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('quotation_items', sa.Column('service_date', sa.Date(), nullable=True))
+    op.add_column('quotation_items', sa.Column('service_end_date', sa.Date(), nullable=True))
+    op.add_column('quotation_items', sa.Column('price_source', sa.String(), nullable=True))
+    op.add_column('quotation_items', sa.Column('price_basis', sa.String(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('quotation_items', 'price_basis')
+    op.drop_column('quotation_items', 'price_source')
+    op.drop_column('quotation_items', 'service_end_date')
+    op.drop_column('quotation_items', 'service_date')
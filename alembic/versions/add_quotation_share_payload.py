@@ -0,0 +1,26 @@
+"""add precomputed share payload to quotations
+
+Revision ID: add_quotation_share_payload
+Revises: add_supplier_templates
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_quotation_share_payload'
+down_revision = 'add_supplier_templates'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('quotations', sa.Column('share_payload', sa.Text(), nullable=True))
+    op.add_column('quotations', sa.Column('share_etag', sa.String(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('quotations', 'share_etag')
+    op.drop_column('quotations', 'share_payload')
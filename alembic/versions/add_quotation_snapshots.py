@@ -0,0 +1,92 @@
+"""content-addressed quotation item snapshots
+
+Revision ID: add_quotation_snapshots
+Revises: add_quotation_share_payload
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import hashlib
+import json
+from datetime import datetime
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_quotation_snapshots'
+down_revision = 'add_quotation_share_payload'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def _snapshot_hash(snapshot):
+    # Must match app.domain.quotations.snapshots.snapshot_hash
+    canonical = json.dumps(snapshot, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def upgrade():
+    op.create_table(
+        'quotation_snapshots',
+        sa.Column('hash', sa.String(), nullable=False),
+        sa.Column('data', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('hash')
+    )
+    op.add_column('quotation_items', sa.Column('snapshot_hash', sa.String(), nullable=True))
+    op.create_index('ix_quotation_items_snapshot_hash', 'quotation_items', ['snapshot_hash'])
+    op.alter_column('quotation_items', 'snapshot', existing_type=sa.JSON(), nullable=True)
+
+    # Move existing inline snapshots into the shared table
+    conn = op.get_bind()
+    items = sa.table(
+        'quotation_items',
+        sa.column('id', sa.String),
+        sa.column('snapshot', sa.JSON),
+        sa.column('snapshot_hash', sa.String)
+    )
+    snapshots = sa.table(
+        'quotation_snapshots',
+        sa.column('hash', sa.String),
+        sa.column('data', sa.JSON),
+        sa.column('created_at', sa.DateTime)
+    )
+    stored = set()
+    while True:
+        rows = conn.execute(
+            sa.select(items.c.id, items.c.snapshot)
+            .where(items.c.snapshot_hash.is_(None), items.c.snapshot.isnot(None))
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        new_snapshots = []
+        updates = []
+        for item_id, snapshot in rows:
+            digest = _snapshot_hash(snapshot)
+            if digest not in stored:
+                stored.add(digest)
+                new_snapshots.append({"hash": digest, "data": snapshot, "created_at": datetime.utcnow()})
+            updates.append({"item_id": item_id, "digest": digest})
+        if new_snapshots:
+            conn.execute(snapshots.insert(), new_snapshots)
+        conn.execute(
+            items.update()
+            .where(items.c.id == sa.bindparam("item_id"))
+            .values(snapshot_hash=sa.bindparam("digest"), snapshot=sa.null()),
+            updates
+        )
+
+
+def downgrade():
+    conn = op.get_bind()
+    conn.execute(sa.text(
+        "UPDATE quotation_items SET snapshot = quotation_snapshots.data "
+        "FROM quotation_snapshots WHERE quotation_items.snapshot_hash = quotation_snapshots.hash"
+    ))
+    op.alter_column('quotation_items', 'snapshot', existing_type=sa.JSON(), nullable=False)
+    op.drop_index('ix_quotation_items_snapshot_hash', table_name='quotation_items')
+    op.drop_column('quotation_items', 'snapshot_hash')
+    op.drop_table('quotation_snapshots')
@@ -0,0 +1,30 @@
+"""index quotation_items.sku_id and add stale flags to quotations
+
+Revision ID: add_quotation_stale_flags
+Revises: add_quotation_item_pricing
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_quotation_stale_flags'
+down_revision = 'add_quotation_item_pricing'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_quotation_items_sku_id', 'quotation_items', ['sku_id'])
+    op.add_column('quotations', sa.Column('price_stale', sa.Boolean(), nullable=True, server_default=sa.false()))
+    op.add_column('quotations', sa.Column('stale_since', sa.DateTime(), nullable=True))
+    op.create_index('ix_quotations_price_stale', 'quotations', ['price_stale'])
+
+
+def downgrade():
+    op.drop_index('ix_quotations_price_stale', table_name='quotations')
+    op.drop_column('quotations', 'stale_since')
+    op.drop_column('quotations', 'price_stale')
+    op.drop_index('ix_quotation_items_sku_id', table_name='quotation_items')
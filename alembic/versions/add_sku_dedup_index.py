@@ -0,0 +1,39 @@
+"""add sku near-duplicate index tables
+
+Revision ID: add_sku_dedup_index
+Revises: add_import_token_usage
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_sku_dedup_index'
+down_revision = 'add_import_token_usage'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'sku_signatures',
+        sa.Column('sku_id', sa.String(), primary_key=True),
+        sa.Column('category', sa.String(), nullable=True),
+        sa.Column('signature', sa.JSON(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+    op.create_table(
+        'sku_lsh_buckets',
+        sa.Column('bucket', sa.String(), primary_key=True),
+        sa.Column('sku_id', sa.String(), primary_key=True),
+    )
+    op.create_index('ix_sku_lsh_buckets_sku_id', 'sku_lsh_buckets', ['sku_id'])
+    # Backfill existing SKUs with: python rebuild_sku_dedup_index.py
+
+
+def downgrade():
+    op.drop_index('ix_sku_lsh_buckets_sku_id', table_name='sku_lsh_buckets')
+    op.drop_table('sku_lsh_buckets')
+    op.drop_table('sku_signatures')
@@ -0,0 +1,45 @@
+"""add supplier_templates table
+
+Revision ID: add_supplier_templates
+Revises: add_import_llm_route
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_supplier_templates'
+down_revision = 'add_import_llm_route'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'supplier_templates',
+        sa.Column('id', sa.String(), primary_key=True),
+        sa.Column('agency_id', sa.String(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('supplier_name', sa.String(), nullable=True),
+        sa.Column('sku_type', sa.String(), nullable=True),
+        sa.Column('category', sa.String(), nullable=True),
+        sa.Column('fingerprint', sa.String(), nullable=True),
+        sa.Column('labels', sa.JSON(), nullable=True),
+        sa.Column('rules', sa.JSON(), nullable=True),
+        sa.Column('source_task_id', sa.String(), nullable=True),
+        sa.Column('hit_count', sa.Integer(), nullable=True),
+        sa.Column('last_used_at', sa.DateTime(), nullable=True),
+        sa.Column('created_by', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+    )
+    op.create_index('ix_supplier_templates_agency_id', 'supplier_templates', ['agency_id'])
+    op.create_index('ix_supplier_templates_fingerprint', 'supplier_templates', ['fingerprint'])
+
+
+def downgrade():
+    op.drop_index('ix_supplier_templates_fingerprint', table_name='supplier_templates')
+    op.drop_index('ix_supplier_templates_agency_id', table_name='supplier_templates')
+    op.drop_table('supplier_templates')
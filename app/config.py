@@ -28,6 +28,98 @@ class Settings(BaseSettings):
     llm_provider: str = "kimi"
     kimi_api_key: str = ""
     kimi_model: str = "kimi-k2.5"
+    kimi_base_url: str = "https://api.moonshot.cn/v1"
+    # Save every successful extraction here for replay (app/infra/llm_replay.py)
+    llm_record_dir: str = ""
+    # Uploaded documents are reused by content hash for this long (seconds)
+    kimi_file_cache_ttl: int = 7 * 24 * 3600
+    # Model/prompt routing by input modality and size; empty model names fall back to kimi_model
+    llm_routing_enabled: bool = True
+    kimi_text_model: str = ""
+    kimi_vision_model: str = ""
+    llm_route_short_tokens: int = 1500
+    
+    # Image preprocessing before multimodal extraction
+    image_preprocess_enabled: bool = True
+    image_max_edge: int = 2048
+    image_jpeg_quality: int = 85
+    image_crop_whitespace: bool = False
+    
+    # Local OCR pre-pass (text-only fast path when confidence is high)
+    ocr_enabled: bool = True
+    ocr_workers: int = 2
+    ocr_min_confidence: float = 0.85
+    ocr_min_chars: int = 20
+    ocr_cache_ttl: int = 7 * 24 * 3600
+    ocr_pdf_dpi: int = 200
+    ocr_pdf_max_pages: int = 10
+    
+    # Multi-page PDFs: split into pages and extract in parallel
+    pdf_page_split_enabled: bool = True
+    pdf_page_dpi: int = 150
+    pdf_page_concurrency: int = 4
+    pdf_split_max_pages: int = 20
+    
+    # Prompt budget: inputs above llm_max_input_tokens are split and extracted chunk by chunk
+    llm_max_input_tokens: int = 24000
+    llm_chunk_tokens: int = 12000
+    llm_chunk_overlap_tokens: int = 300
+    llm_chunk_concurrency: int = 3
+    llm_max_chunks: int = 12
+    
+    # Shared LLM limiter (Redis): AIMD concurrency window, Retry-After backoff, circuit breaker
+    llm_limiter_enabled: bool = True
+    llm_window_initial: int = 4
+    llm_window_min: int = 1
+    llm_window_max: int = 16
+    llm_slot_lease: int = 660
+    llm_acquire_timeout: int = 120
+    llm_max_attempts: int = 3
+    llm_backoff_base: float = 2.0
+    llm_backoff_max: float = 60.0
+    llm_breaker_threshold: int = 5
+    llm_breaker_cooldown: int = 30
+    
+    # Opt-in micro-batching of short queued text imports into one LLM call
+    llm_batch_enabled: bool = False
+    llm_batch_max_items: int = 8
+    llm_batch_item_max_tokens: int = 600
+    llm_batch_window_ms: int = 800
+    llm_batch_claim_timeout_s: int = 600  # claimed but un-acked batches are re-queued after this
+    
+    # Rate sheets (DOCX tables / XLSX) parsed by column templates without an LLM call
+    rate_sheet_enabled: bool = True
+    rate_sheet_templates_path: str = ""
+    
+    # Targeted re-extraction: fields below this confidence are re-prompted
+    import_reextract_threshold: float = 0.7
+    
+    # Learned supplier templates: layout similarity to try a template, share of rules that must match
+    supplier_templates_enabled: bool = True
+    supplier_template_min_similarity: float = 0.8
+    supplier_template_min_coverage: float = 0.8
+    supplier_template_scan_limit: int = 200  # most-used templates compared by label similarity
+    
+    # Near-duplicate SKU detection (MinHash/LSH); estimated Jaccard similarity to flag
+    sku_dedup_threshold: float = 0.6
+    
+    # Rendered quotation PDFs are kept in storage, keyed by content version
+    quotation_pdf_cache_enabled: bool = True
+    
+    # Public quotation share links: cache TTL (seconds) for the payload, also sent as Cache-Control max-age
+    share_cache_ttl: int = 60
+    
+    # PDF rendering process pool (0 = render in the API process), render queue bound and bulk export limits
+    pdf_render_processes: int = 2
+    pdf_render_queue_size: int = 16
+    pdf_render_queue_timeout: float = 5.0
+    pdf_render_timeout: float = 60.0
+    pdf_bulk_concurrency: int = 2
+    pdf_bulk_export_max: int = 500
+    
+    # TrueType/TTC font for Chinese text in PDFs (subset-embedded); empty = search common system paths
+    pdf_cjk_font_path: str = ""
+    pdf_cjk_font_index: int = 0
     
     storage_provider: str = "local"
     storage_path: str = "./uploads"
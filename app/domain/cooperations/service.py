@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from app.infra.db import CooperationRelation, SKU, scoped_query, Notification
 from app.domain.cooperations.schemas import CooperationCreate, CooperationApprove
 from app.infra.audit import audit_log
+from app.domain.skus.dedup import SKUDedupIndex
 from typing import Optional, List
 import uuid
 from datetime import datetime, timedelta
@@ -283,6 +284,8 @@ class CooperationService:
         db.commit()
         db.refresh(sku)
         
+        sku.possible_duplicates = SKUDedupIndex.find_duplicates(db, sku, include_public=True)
+        
         audit_log(
             db=db,
             agency_id=agency_id,
@@ -290,7 +293,11 @@ class CooperationService:
             action="sku.publish_to_public",
             entity_type="sku",
             entity_id=sku_id,
-            after_data={"is_public": True, "public_status": "published"}
+            after_data={
+                "is_public": True,
+                "public_status": "published",
+                "possible_duplicates": [d["sku_id"] for d in sku.possible_duplicates]
+            }
         )
         
         return sku
@@ -419,6 +426,8 @@ class CooperationService:
         db.commit()
         db.refresh(new_sku)
         
+        SKUDedupIndex.index_sku(db, new_sku)
+        
         audit_log(
             db=db,
             agency_id=agency_id,
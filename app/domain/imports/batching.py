@@ -0,0 +1,158 @@
+"""
+Micro-batching of short queued text imports (opt-in, LLM_BATCH_ENABLED).
+
+create_import_task pushes small text-only tasks onto a Redis list instead of queuing
+parse_import_task directly; flush_import_batch claims up to llm_batch_max_items of them
+after llm_batch_window_ms and extracts them with one LLM call. Anything that cannot
+be batched, or whose item is missing from the batched response, goes through
+parse_import_task as before.
+
+Claimed ids move to a processing list and stay there until the flush acks them, so
+a worker that dies mid-flush does not lose them: requeue_stale puts claims older
+than llm_batch_claim_timeout_s back on the pending list.
+"""
+from typing import Optional, List, Dict, Any
+import logging
+import time
+import redis
+from app.config import get_settings
+from app.infra.cache import get_redis
+from app.infra.db import ImportTask
+from app.infra.tokens import estimate_tokens
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+PENDING_KEY = "import_batch:pending"
+PROCESSING_KEY = "import_batch:processing"
+CLAIMED_AT_KEY = "import_batch:claimed_at"  # task id -> claim timestamp
+
+
+def is_batchable(task: ImportTask) -> bool:
+    return bool(
+        settings.llm_batch_enabled
+        and task.input_text
+        and not task.input_files
+        and estimate_tokens(task.input_text) <= settings.llm_batch_item_max_tokens
+    )
+
+
+def enqueue(task_id: str) -> bool:
+    """Add a task to the pending batch; False if Redis is unavailable (caller queues it alone)."""
+    try:
+        get_redis().rpush(PENDING_KEY, task_id)
+        return True
+    except redis.RedisError as e:
+        logger.warning(f"Import batch queue unavailable, parsing {task_id} individually: {str(e)}")
+        return False
+
+
+def _decode(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def pop_batch(size: int) -> List[str]:
+    """Claim up to size pending ids; they stay on the processing list until ack()."""
+    try:
+        client = get_redis()
+        pipe = client.pipeline(transaction=False)
+        for _ in range(size):
+            pipe.lmove(PENDING_KEY, PROCESSING_KEY, "LEFT", "RIGHT")
+        ids = [_decode(i) for i in pipe.execute() if i is not None]
+        if ids:
+            client.hset(CLAIMED_AT_KEY, mapping={i: time.time() for i in ids})
+    except redis.RedisError as e:
+        logger.warning(f"Failed to pop import batch: {str(e)}")
+        return []
+    return ids
+
+
+def ack(task_ids: List[str]):
+    """Drop claimed ids once the flush has handed every one of them on."""
+    if not task_ids:
+        return
+    try:
+        pipe = get_redis().pipeline()
+        for task_id in task_ids:
+            pipe.lrem(PROCESSING_KEY, 0, task_id)
+        pipe.hdel(CLAIMED_AT_KEY, *task_ids)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.warning(f"Failed to ack import batch {task_ids}: {str(e)}")
+
+
+def requeue_stale(max_age_s: int) -> List[str]:
+    """Return claims older than max_age_s (their flush died) to the pending list."""
+    try:
+        client = get_redis()
+        claimed_at = {_decode(k): float(v) for k, v in client.hgetall(CLAIMED_AT_KEY).items()}
+        now = time.time()
+        requeued = []
+        for task_id in {_decode(i) for i in client.lrange(PROCESSING_KEY, 0, -1)}:
+            if task_id not in claimed_at:
+                # Crashed between the move and the timestamp: start its clock now
+                client.hsetnx(CLAIMED_AT_KEY, task_id, now)
+            elif now - claimed_at[task_id] > max_age_s and client.lrem(PROCESSING_KEY, 0, task_id):
+                # lrem decides the race between concurrent reapers: only the one that removed it re-queues
+                client.rpush(PENDING_KEY, task_id)
+                client.hdel(CLAIMED_AT_KEY, task_id)
+                requeued.append(task_id)
+    except redis.RedisError as e:
+        logger.warning(f"Failed to requeue stale import batches: {str(e)}")
+        return []
+    if requeued:
+        logger.warning(f"Re-queued {len(requeued)} import tasks from an unfinished batch: {requeued}")
+    return requeued
+
+
+def pending_count() -> int:
+    try:
+        return get_redis().llen(PENDING_KEY)
+    except redis.RedisError:
+        return 0
+
+
+def split_batch_result(result: Dict[str, Any], count: int) -> List[Optional[Dict[str, Any]]]:
+    """
+    Per-input extraction results from a batched response, in input order.
+    Items that are missing, duplicated or malformed come back as None.
+    The shared call's tokens are divided evenly over the items.
+    """
+    items = result.get("items") if isinstance(result, dict) else None
+    results: List[Optional[Dict[str, Any]]] = [None] * count
+    if not isinstance(items, list):
+        return results
+
+    usage = result.get("usage") or {}
+
+    def share(key: str) -> Optional[int]:
+        return usage[key] // count if usage.get(key) is not None else None
+
+    for position, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get("extracted_fields"), dict):
+            continue
+        try:
+            index = int(item.get("index", position + 1)) - 1
+        except (TypeError, ValueError):
+            continue
+        if not 0 <= index < count or results[index] is not None:
+            continue
+        results[index] = {
+            "sku_type": item.get("sku_type"),
+            "category": item.get("category"),
+            "extracted_fields": item["extracted_fields"],
+            "confidence": item.get("confidence") or {},
+            "evidence": item.get("evidence") or {},
+            "extraction_notes": item.get("extraction_notes"),
+            "extraction_mode": "text_batch",
+            "usage": {
+                "estimated_input_tokens": share("estimated_input_tokens"),
+                "prompt_tokens": share("prompt_tokens"),
+                "completion_tokens": share("completion_tokens"),
+                "llm_calls": 1,
+                "latency_ms": usage.get("latency_ms"),
+                "route": usage.get("route"),
+                "model": usage.get("model")
+            }
+        }
+    return results
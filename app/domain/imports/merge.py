@@ -0,0 +1,121 @@
+from typing import Dict, Any, List
+import json
+from app.domain.skus.schemas import SKU_TYPE_TO_CATEGORY
+from app.domain.imports.usage import merge_usage
+
+
+def _confidence_of(result: Dict[str, Any], field: str) -> float:
+    confidence = result.get("confidence")
+    if isinstance(confidence, dict):
+        value = confidence.get(field)
+    else:
+        value = confidence
+    try:
+        return float(value) if value is not None else 0.5
+    except (TypeError, ValueError):
+        return 0.5
+
+
+def _dedupe(items: List[Any]) -> List[Any]:
+    seen = set()
+    unique = []
+    for item in items:
+        key = json.dumps(item, sort_keys=True, ensure_ascii=False, default=str)
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(item)
+    return unique
+
+
+def merge_extraction_results(results: List[Dict[str, Any]], labels: List[str]) -> Dict[str, Any]:
+    """
+    Merge several partial extraction results (PDF pages, text chunks) into one.
+
+    - list fields (room_types, dining_options, departure_dates...) are concatenated and de-duplicated
+    - dict fields (contact_info, season_definitions...) are merged, earlier parts win on conflicts
+    - scalar fields take the value with the highest confidence
+    - evidence keeps the source label of every contributing part, e.g. "[第2页] ..."
+    """
+    if not results:
+        raise ValueError("No extraction results to merge")
+    if len(results) == 1:
+        merged = dict(results[0])
+        merged["parts"] = [_part_summary(results[0], labels[0])]
+        return merged
+
+    # sku_type: vote weighted by how many fields each part produced
+    votes: Dict[str, int] = {}
+    for result in results:
+        sku_type = result.get("sku_type")
+        if sku_type:
+            votes[sku_type] = votes.get(sku_type, 0) + max(1, len(result.get("extracted_fields") or {}))
+    if any((r.get("extracted_fields") or {}).get("room_types") for r in results):
+        sku_type = "hotel"
+    else:
+        sku_type = max(votes, key=votes.get) if votes else None
+    category = next(
+        (r.get("category") for r in results if r.get("sku_type") == sku_type and r.get("category")),
+        SKU_TYPE_TO_CATEGORY.get(sku_type)
+    )
+
+    fields: Dict[str, Any] = {}
+    confidence: Dict[str, float] = {}
+    evidence: Dict[str, Any] = {}
+    best_scalar: Dict[str, float] = {}
+
+    for result, label in zip(results, labels):
+        part_evidence = result.get("evidence") or {}
+        for field, value in (result.get("extracted_fields") or {}).items():
+            if value is None or value == "" or value == [] or value == {}:
+                continue
+            score = _confidence_of(result, field)
+
+            if isinstance(value, list):
+                fields[field] = _dedupe((fields.get(field) or []) + value) if isinstance(fields.get(field), list) else value
+                confidence[field] = max(confidence.get(field, 0.0), score)
+            elif isinstance(value, dict):
+                existing = fields.get(field) if isinstance(fields.get(field), dict) else {}
+                fields[field] = {**value, **existing}
+                confidence[field] = max(confidence.get(field, 0.0), score)
+            elif field not in best_scalar or score > best_scalar[field]:
+                fields[field] = value
+                best_scalar[field] = score
+                confidence[field] = score
+
+            if field in part_evidence and part_evidence[field]:
+                line = f"[{label}] {part_evidence[field]}"
+                evidence[field] = f"{evidence[field]}\n{line}" if field in evidence else line
+
+    notes = [f"[{label}] {r['extraction_notes']}" for r, label in zip(results, labels) if r.get("extraction_notes")]
+
+    return {
+        "sku_type": sku_type,
+        "category": category,
+        "extracted_fields": fields,
+        "confidence": confidence,
+        "evidence": evidence,
+        "extraction_notes": "\n".join(notes),
+        "parts": [_part_summary(r, label) for r, label in zip(results, labels)],
+        "usage": merge_usage([r.get("usage") for r in results])
+    }
+
+
+def _part_summary(result: Dict[str, Any], label: str) -> Dict[str, Any]:
+    confidence = result.get("confidence")
+    if isinstance(confidence, dict) and confidence:
+        values = [float(v) for v in confidence.values() if isinstance(v, (int, float))]
+        overall = round(sum(values) / len(values), 4) if values else None
+    else:
+        overall = confidence if isinstance(confidence, (int, float)) else None
+    return {
+        "label": label,
+        "sku_type": result.get("sku_type"),
+        "fields": sorted((result.get("extracted_fields") or {}).keys()),
+        "confidence": overall,
+        "evidence": result.get("evidence") or {}
+    }
+
+
+def failed_part(label: str, error: Exception) -> Dict[str, Any]:
+    return {"label": label, "error": str(error)}
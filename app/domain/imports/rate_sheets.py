@@ -0,0 +1,219 @@
+"""
+Deterministic parser for well-formed hotel rate sheets (DOCX tables / XLSX sheets).
+
+A template maps header cells to room_types fields. Columns whose header is a season
+(旺季/平季/淡季...) or a price become entries in room_types[].pricing. When a table
+does not match cleanly the caller falls back to the LLM.
+"""
+from typing import Optional, List, Dict, Any
+import json
+import re
+from app.config import get_settings
+
+settings = get_settings()
+
+DEFAULT_TEMPLATE = {
+    "name": "default",
+    "supplier_name": None,
+    "match": [],
+    "currency": "CNY",
+    "columns": {
+        "room_type_name": ["房型", "房间类型", "房型名称", "客房类型", "room type", "room"],
+        "building": ["楼栋", "楼号", "楼宇", "building"],
+        "area_sqm": ["面积", "平米", "㎡", "area"],
+        "include_breakfast": ["早餐", "含早", "breakfast"],
+        "bed_type": ["床型", "bed"],
+        "quantity": ["房间数", "数量", "间数"]
+    },
+    "price_columns": ["价格", "房价", "门市价", "协议价", "结算价", "price", "rate"],
+    "season_columns": ["旺季", "平季", "淡季", "节假日", "周末", "平日", "peak", "regular", "low", "high", "weekend"]
+}
+
+# Supplier-specific templates for our most common formats; more can be added via RATE_SHEET_TEMPLATES_PATH
+SUPPLIER_TEMPLATES: List[Dict[str, Any]] = [
+    {
+        "name": "jinjiang",
+        "supplier_name": "锦江酒店",
+        "match": ["锦江", "jinjiang"],
+        "columns": {"room_type_name": ["房型", "房间类型"], "include_breakfast": ["早餐"]},
+        "price_columns": ["协议价", "挂牌价", "会员价"]
+    },
+    {
+        "name": "huazhu",
+        "supplier_name": "华住集团",
+        "match": ["华住", "汉庭", "全季", "huazhu"],
+        "columns": {"room_type_name": ["房型"], "include_breakfast": ["早餐", "含早"]},
+        "price_columns": ["企业协议价", "前台价", "协议价"]
+    }
+]
+
+_NUMBER_RE = re.compile(r"(\d+(?:,\d{3})*(?:\.\d+)?)")
+
+
+def load_templates() -> List[Dict[str, Any]]:
+    templates = list(SUPPLIER_TEMPLATES)
+    if settings.rate_sheet_templates_path:
+        try:
+            with open(settings.rate_sheet_templates_path, encoding="utf-8") as f:
+                templates = json.load(f) + templates
+        except Exception as e:
+            print(f"Warning: Failed to load rate sheet templates: {str(e)}")
+    return templates
+
+
+def select_template(text: str, filename: Optional[str] = None) -> Dict[str, Any]:
+    """Supplier template whose keywords appear in the document or filename, else the default."""
+    haystack = f"{filename or ''}\n{text[:2000]}".lower()
+    for template in load_templates():
+        if any(keyword.lower() in haystack for keyword in template.get("match", [])):
+            return {
+                **DEFAULT_TEMPLATE,
+                **template,
+                "columns": {**DEFAULT_TEMPLATE["columns"], **template.get("columns", {})},
+                "price_columns": template.get("price_columns", []) + DEFAULT_TEMPLATE["price_columns"]
+            }
+    return DEFAULT_TEMPLATE
+
+
+def _normalize_header(cell: str) -> str:
+    return re.sub(r"\s+", "", cell or "").lower()
+
+
+def _parse_price(cell: str) -> Optional[float]:
+    if not cell:
+        return None
+    match = _NUMBER_RE.search(cell.replace("，", ","))
+    if not match:
+        return None
+    value = float(match.group(1).replace(",", ""))
+    return value if value > 0 else None
+
+
+def _parse_bool(cell: str) -> Optional[bool]:
+    cell = (cell or "").strip().lower()
+    if not cell:
+        return None
+    if cell in ("无", "不含", "否", "no", "n", "false", "×", "x", "0", "无早"):
+        return False
+    return True
+
+
+def _map_header(header: List[str], template: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    fields: Dict[str, int] = {}
+    prices: List[tuple] = []
+    for index, cell in enumerate(header):
+        name = _normalize_header(cell)
+        if not name:
+            continue
+        field = next(
+            (f for f, aliases in template["columns"].items() if any(a.lower() in name for a in aliases)),
+            None
+        )
+        if field and field not in fields:
+            fields[field] = index
+        elif any(k.lower() in name for k in template["season_columns"] + template["price_columns"]):
+            prices.append((index, cell.strip()))
+    if "room_type_name" not in fields or not prices:
+        return None
+    return {"fields": fields, "prices": prices}
+
+
+def parse_rate_table(rows: List[List[str]], template: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """room_types from one table, or None when the table is not a well-formed rate sheet."""
+    for header_index, header in enumerate(rows[:5]):
+        mapping = _map_header(header, template)
+        if mapping:
+            break
+    else:
+        return None
+
+    room_types = []
+    malformed = 0
+    for row in rows[header_index + 1:]:
+        cells = row + [""] * (len(header) - len(row))
+        name = cells[mapping["fields"]["room_type_name"]].strip()
+        pricing = [
+            {"season": label, "daily_price": price, "currency": template.get("currency") or "CNY"}
+            for index, label in mapping["prices"]
+            if (price := _parse_price(cells[index])) is not None
+        ]
+        if not name and not pricing:
+            continue
+        if not name or not pricing:
+            malformed += 1
+            continue
+
+        room = {"room_type_name": name, "pricing": pricing}
+        for field, index in mapping["fields"].items():
+            if field == "room_type_name" or not cells[index].strip():
+                continue
+            if field == "include_breakfast":
+                room[field] = _parse_bool(cells[index])
+            elif field == "area_sqm":
+                room[field] = _parse_price(cells[index])
+            else:
+                room[field] = cells[index].strip()
+        room_types.append(room)
+
+    # Too many rows we could not read: let the LLM handle this sheet
+    if not room_types or malformed > len(room_types) * 0.3:
+        return None
+    return room_types
+
+
+def _guess_hotel_name(paragraphs: List[str]) -> Optional[str]:
+    for line in paragraphs[:20]:
+        match = re.search(r"([\u4e00-\u9fa5A-Za-z0-9·（）()]{2,30}(?:酒店|宾馆|饭店|度假村|民宿|客栈|Hotel|Resort))", line)
+        if match:
+            return match.group(1)
+    return None
+
+
+def extract_rate_sheet(
+    tables: List[List[List[str]]],
+    paragraphs: List[str],
+    filename: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """Full extraction result (same shape as the LLM's) or None to fall back to the LLM."""
+    text = "\n".join(paragraphs)
+    template = select_template(text + "\n" + "\n".join(" ".join(r) for t in tables[:1] for r in t[:3]), filename)
+
+    room_types = []
+    table_numbers = []
+    for number, rows in enumerate(tables, 1):
+        parsed = parse_rate_table(rows, template)
+        if parsed:
+            room_types.extend(parsed)
+            table_numbers.append(number)
+    if not room_types:
+        return None
+
+    hotel_name = _guess_hotel_name(paragraphs) or _guess_hotel_name([filename or ""])
+    fields: Dict[str, Any] = {"room_types": room_types}
+    confidence: Dict[str, float] = {"room_types": 0.98}
+    if hotel_name:
+        fields["hotel_name"] = hotel_name
+        fields["sku_name"] = hotel_name
+        confidence["hotel_name"] = confidence["sku_name"] = 0.8
+    if template.get("supplier_name"):
+        fields["supplier_name"] = template["supplier_name"]
+        confidence["supplier_name"] = 0.9
+
+    return {
+        "sku_type": "hotel",
+        "category": "hotel",
+        "extracted_fields": fields,
+        "confidence": confidence,
+        "evidence": {"room_types": f"表格 {', '.join(map(str, table_numbers))}，共 {len(room_types)} 个房型"},
+        "extraction_notes": f"按价格表模板「{template['name']}」直接解析，未调用 LLM",
+        "extraction_mode": "rate_sheet",
+        "template": template["name"],
+        "usage": {
+            "estimated_input_tokens": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "llm_calls": 0,
+            "route": "rate_sheet",
+            "model": None
+        }
+    }
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any
 from datetime import datetime
 
@@ -20,6 +20,13 @@ class ImportTaskResponse(BaseModel):
     confidence: Optional[Any]  # Can be float (overall) or Dict[str, float] (per field)
     evidence: Optional[Dict[str, Any]]  # Dict with field evidence details
     error_message: Optional[str]
+    input_tokens_estimated: Optional[int] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+    llm_calls: Optional[int] = None
+    extraction_ms: Optional[int] = None
+    llm_route: Optional[str] = None
+    llm_model: Optional[str] = None
     created_sku_id: Optional[str]
     created_at: datetime
     updated_at: datetime
@@ -31,3 +38,38 @@ class ImportTaskResponse(BaseModel):
 class ImportConfirm(BaseModel):
     extracted_fields: Dict[str, Any]
     sku_type: str
+
+
+class ImportBatchConfirmItem(ImportConfirm):
+    task_id: str
+
+
+class ImportBatchConfirm(BaseModel):
+    items: List[ImportBatchConfirmItem] = Field(..., min_length=1, max_length=200)
+
+
+class ImportReextract(BaseModel):
+    fields: Optional[List[str]] = None  # defaults to every field below the confidence threshold
+    threshold: Optional[float] = None
+
+
+class SupplierTemplateCreate(BaseModel):
+    name: Optional[str] = None
+
+
+class SupplierTemplateResponse(BaseModel):
+    id: str
+    agency_id: str
+    name: str
+    supplier_name: Optional[str]
+    sku_type: Optional[str]
+    category: Optional[str]
+    labels: Optional[List[str]]
+    rules: Optional[Dict[str, Any]]
+    source_task_id: Optional[str]
+    hit_count: Optional[int]
+    last_used_at: Optional[datetime]
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
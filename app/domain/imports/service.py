@@ -1,14 +1,18 @@
 from sqlalchemy.orm import Session
 from app.infra.db import ImportTask, ImportStatus, scoped_query
-from app.domain.imports.schemas import ImportTaskCreate, ImportConfirm
-from app.domain.imports.tasks import parse_import_task
+from app.domain.imports.schemas import ImportTaskCreate, ImportConfirm, ImportBatchConfirmItem
+from app.domain.imports.tasks import parse_import_task, flush_import_batch
+from app.domain.imports import batching
 from app.domain.skus.schemas import SKUCreate
 from app.domain.skus.service import SKUService
-from app.infra.audit import audit_log
-from typing import Optional, List
-import zipfile
+from app.domain.skus.dedup import SKUDedupIndex
+from app.infra.audit import audit_log, audit_log_many
+from app.domain.imports.usage import record_usage
+from app.domain.imports.templates import SupplierTemplateService
+from typing import Optional, List, Dict, Any, AsyncIterator, Tuple
+import asyncio
+import time
 import io
-from xml.etree import ElementTree as ET
 import logging
 import uuid
 from datetime import datetime
@@ -42,7 +46,12 @@ class ImportService:
         task.status = ImportStatus.UPLOADED
         db.commit()
         
-        parse_import_task.delay(task_id)
+        if batching.is_batchable(task) and batching.enqueue(task_id):
+            # Short text: wait briefly so neighbouring pastes share one LLM call
+            from app.config import get_settings
+            flush_import_batch.apply_async(countdown=get_settings().llm_batch_window_ms / 1000)
+        else:
+            parse_import_task.delay(task_id)
         
         audit_log(
             db=db,
@@ -84,11 +93,310 @@ class ImportService:
         user_id: str,
         task_id: str,
         confirm_data: ImportConfirm
-    ) -> Optional[str]:
+    ) -> Optional[Dict[str, Any]]:
+        """Create the SKU; returns {"sku_id", "possible_duplicates"} or None if the task cannot be confirmed."""
         task = scoped_query(db, ImportTask, agency_id).filter(ImportTask.id == task_id).first()
         if not task or task.status != ImportStatus.PARSED:
             return None
         
+        sku_create = ImportService._build_sku_create(task, confirm_data)
+        
+        sku = SKUService.create_sku(db, agency_id, user_id, sku_create)
+        
+        task.status = ImportStatus.CONFIRMED
+        task.created_sku_id = sku.id
+        task.confirmed_fields = dict(confirm_data.extracted_fields)
+        task.updated_at = datetime.utcnow()
+        db.commit()
+        
+        # Same resource imported before (by this agency) or already in the public library
+        duplicates = SKUDedupIndex.find_duplicates(db, sku, agency_id=agency_id, include_public=True)
+        
+        audit_log(
+            db=db,
+            agency_id=agency_id,
+            user_id=user_id,
+            action="import.confirm",
+            entity_type="import_task",
+            entity_id=task.id,
+            after_data={"created_sku_id": sku.id, "possible_duplicates": [d["sku_id"] for d in duplicates]}
+        )
+        
+        return {"sku_id": sku.id, "possible_duplicates": duplicates}
+    
+    @staticmethod
+    def confirm_imports(
+        db: Session,
+        agency_id: str,
+        user_id: str,
+        items: List[ImportBatchConfirmItem]
+    ) -> List[Dict[str, Any]]:
+        """
+        Confirm many parsed tasks at once: every item is validated first, valid SKUs are
+        inserted together with their task updates in one transaction, and audit entries
+        are written in one batch. Items rejected by validation are reported and skipped;
+        if the write itself fails, nothing is confirmed and the failing task is named.
+        Returns one result per item, in request order:
+        {"task_id", "status": "confirmed"|"failed", "sku_id", "possible_duplicates", "error"}.
+        """
+        task_ids = [item.task_id for item in items]
+        tasks = {
+            task.id: task
+            for task in scoped_query(db, ImportTask, agency_id).filter(ImportTask.id.in_(task_ids))
+        }
+        
+        results: List[Dict[str, Any]] = []
+        prepared = []  # (result, task, sku)
+        confirmed_fields: Dict[str, Dict[str, Any]] = {}
+        seen = set()
+        for item in items:
+            result = {"task_id": item.task_id, "status": "failed", "sku_id": None, "possible_duplicates": [], "error": None}
+            results.append(result)
+            task = tasks.get(item.task_id)
+            if item.task_id in seen:
+                result["error"] = "Duplicate task in request"
+            elif not task:
+                result["error"] = "Import task not found"
+            elif task.status != ImportStatus.PARSED:
+                result["error"] = f"Import task is {ImportStatus(task.status).value}, not parsed"
+            else:
+                try:
+                    sku_create = ImportService._build_sku_create(task, item)
+                    confirmed_fields[task.id] = dict(item.extracted_fields)
+                    prepared.append((result, task, SKUService.build_sku(db, agency_id, user_id, sku_create)))
+                except Exception as e:
+                    result["error"] = str(e)
+            seen.add(item.task_id)
+        
+        if not prepared:
+            return results
+        
+        def stage(task: ImportTask, sku):
+            db.add(sku)
+            task.status = ImportStatus.CONFIRMED
+            task.created_sku_id = sku.id
+            task.confirmed_fields = confirmed_fields[task.id]
+            task.updated_at = datetime.utcnow()
+        
+        # Everything needed after the commit is read now, while the SKUs are loaded: the
+        # commit expires them and touching them afterwards would reload one row per SKU
+        signatures = SKUDedupIndex.signatures(sku for _, _, sku in prepared)
+        created = [
+            (result, task.id, {"sku_id": sku.id, "sku_name": sku.sku_name, "sku_type": sku.sku_type})
+            for result, task, sku in prepared
+        ]
+        
+        try:
+            for result, task, sku in prepared:
+                stage(task, sku)
+            db.commit()
+        except Exception as e:
+            # All or nothing: roll the whole batch back and name the task that broke it
+            db.rollback()
+            culprit = ImportService._find_failing_row(db, prepared, stage)
+            logging.getLogger(__name__).warning(f"Bulk import confirm rolled back: {str(e)}")
+            for result, task, sku in prepared:
+                if culprit and result is culprit[0]:
+                    result["error"] = culprit[1]
+                elif culprit:
+                    result["error"] = f"Not confirmed: batch rolled back because task {culprit[0]['task_id']} failed"
+                else:
+                    result["error"] = f"Not confirmed: batch rolled back ({str(e)})"
+            return results
+        
+        SKUDedupIndex.index_new(db, signatures)
+        duplicates_of = SKUDedupIndex.find_duplicates_many(db, signatures, agency_id=agency_id, include_public=True)
+        
+        entries = []
+        for result, task_id, sku in created:
+            duplicates = duplicates_of.get(sku["sku_id"], [])
+            result.update({"status": "confirmed", "sku_id": sku["sku_id"], "possible_duplicates": duplicates})
+            entries.append({
+                "action": "sku.create",
+                "entity_type": "sku",
+                "entity_id": sku["sku_id"],
+                "after_data": {"sku_name": sku["sku_name"], "sku_type": sku["sku_type"]}
+            })
+            entries.append({
+                "action": "import.confirm",
+                "entity_type": "import_task",
+                "entity_id": task_id,
+                "after_data": {"created_sku_id": sku["sku_id"], "possible_duplicates": [d["sku_id"] for d in duplicates]}
+            })
+        audit_log_many(db, agency_id, user_id, entries)
+        
+        return results
+    
+    @staticmethod
+    def _find_failing_row(db: Session, prepared: list, stage) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Replay a rolled-back batch row by row under savepoints; (result, error) of the first bad row."""
+        culprit = None
+        try:
+            for result, task, sku in prepared:
+                savepoint = db.begin_nested()
+                try:
+                    with db.no_autoflush:
+                        stage(task, sku)
+                    db.flush()
+                except Exception as row_error:
+                    savepoint.rollback()
+                    # Driver message (e.g. the violated constraint) without the echoed SQL
+                    culprit = (result, str(getattr(row_error, "orig", None) or row_error))
+                    break
+        finally:
+            db.rollback()
+        return culprit
+    
+    @staticmethod
+    async def reextract_fields(
+        db: Session,
+        agency_id: str,
+        user_id: str,
+        task_id: str,
+        fields: Optional[List[str]] = None,
+        threshold: Optional[float] = None
+    ) -> Optional[ImportTask]:
+        """
+        Re-prompt only for doubtful fields of a parsed task and merge the answers into
+        extracted_fields. The source is the task's text plus the cached OCR/document text
+        of its stored file, so no full multimodal extraction is repeated.
+        Returns None if the task cannot be re-extracted; raises ValueError if nothing to do.
+        """
+        from app.config import get_settings
+        from app.infra.llm_client import LLMClient
+        settings = get_settings()
+        
+        task = scoped_query(db, ImportTask, agency_id).filter(ImportTask.id == task_id).first()
+        if not task or task.status != ImportStatus.PARSED:
+            return None
+        
+        extracted = dict(task.extracted_fields or {})
+        confidence = dict(task.confidence) if isinstance(task.confidence, dict) else {}
+        evidence = dict(task.evidence or {})
+        threshold = settings.import_reextract_threshold if threshold is None else threshold
+        
+        if not fields:
+            fields = [
+                name for name, score in confidence.items()
+                if isinstance(score, (int, float)) and score < threshold
+            ]
+        if not fields:
+            raise ValueError("No low-confidence fields to re-extract")
+        
+        source_text, images = await ImportService._task_source(task)
+        if not source_text and not images:
+            raise ValueError("Original input of this import is no longer available")
+        
+        current = {name: extracted.get(name) for name in fields}
+        sku_type = (task.parsed_result or {}).get("sku_type")
+        result = await LLMClient().reextract_fields(source_text, sku_type, current, images)
+        
+        answers = result.get("extracted_fields") or {}
+        updated = {name: answers[name] for name in fields if answers.get(name) is not None}
+        new_confidence = result.get("confidence") or {}
+        new_evidence = result.get("evidence") or {}
+        for name, value in updated.items():
+            extracted[name] = value
+            if new_confidence.get(name) is not None:
+                confidence[name] = new_confidence[name]
+            if new_evidence.get(name):
+                evidence[name] = new_evidence[name]
+        
+        # Assign new objects so the JSON columns are flagged as changed
+        task.extracted_fields = extracted
+        task.confidence = confidence
+        task.evidence = evidence
+        task.parsed_result = {
+            **(task.parsed_result or {}),
+            "extracted_fields": extracted,
+            "confidence": confidence,
+            "evidence": evidence
+        }
+        usage = result.get("usage") or {}
+        task.llm_calls = (task.llm_calls or 0) + (usage.get("llm_calls") or 1)
+        if usage.get("prompt_tokens") is not None:
+            task.prompt_tokens = (task.prompt_tokens or 0) + usage["prompt_tokens"]
+        if usage.get("completion_tokens") is not None:
+            task.completion_tokens = (task.completion_tokens or 0) + usage["completion_tokens"]
+        task.updated_at = datetime.utcnow()
+        db.commit()
+        
+        audit_log(
+            db=db,
+            agency_id=agency_id,
+            user_id=user_id,
+            action="import.reextract",
+            entity_type="import_task",
+            entity_id=task.id,
+            before_data={"fields": current},
+            after_data={
+                "fields": updated,
+                "unresolved": [name for name in fields if name not in updated],
+                "prompt_tokens": usage.get("prompt_tokens"),
+                "latency_ms": usage.get("latency_ms")
+            }
+        )
+        
+        db.refresh(task)
+        return task
+    
+    @staticmethod
+    async def _task_source(task: ImportTask) -> Tuple[str, Optional[List[Dict[str, Any]]]]:
+        """
+        Text of a task's original input: pasted text plus OCR/document text of stored files
+        (OCR and Kimi document contents are cached by content hash). Files without usable
+        text are returned as images.
+        """
+        from app.infra.storage import StorageClient
+        import mimetypes
+        logger = logging.getLogger(__name__)
+        
+        parts = [task.input_text] if task.input_text else []
+        images = []
+        storage_client = StorageClient()
+        for file_url in task.input_files or []:
+            try:
+                file_path = file_url[len("/files"):] if file_url.startswith("/files/") else file_url
+                path = storage_client.resolve_local_path(file_path)
+                file_data = path.read_bytes()
+            except (ValueError, OSError) as e:
+                logger.warning(f"Stored file {file_url} of task {task.id} unavailable: {str(e)}")
+                continue
+            
+            mime_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+            text = await ImportService._file_text(file_data, mime_type, task.original_filename or path.name)
+            if text:
+                parts.append(text)
+            elif mime_type.startswith("image/") or mime_type == "application/pdf":
+                images.append({"data": file_data, "mime_type": mime_type})
+        
+        return "\n\n".join(parts), images or None
+    
+    @staticmethod
+    async def _file_text(file_data: bytes, mime_type: str, filename: str) -> Optional[str]:
+        from app.config import get_settings
+        settings = get_settings()
+        
+        office_kind = ImportService._office_kind(mime_type, filename)
+        if office_kind:
+            return ImportService._office_document(file_data, office_kind)[2] or None
+        if mime_type.startswith("text/"):
+            return file_data.decode("utf-8", errors="ignore")
+        if mime_type.startswith("image/") or mime_type == "application/pdf":
+            ocr_text = await ImportService._ocr_fast_path_text(file_data, mime_type)
+            if ocr_text or mime_type.startswith("image/"):
+                return ocr_text
+        if settings.llm_provider == "kimi":
+            from app.infra.kimi_client import KimiClient
+            try:
+                return (await KimiClient().get_document_content(file_data, filename))["content"] or None
+            except Exception as e:
+                logging.getLogger(__name__).warning(f"Document text unavailable for re-extraction: {str(e)}")
+        return None
+    
+    @staticmethod
+    def _build_sku_create(task: ImportTask, confirm_data: ImportConfirm) -> SKUCreate:
+        """Map reviewed extracted fields onto SKUCreate (type correction, defaults, list fields)."""
         # 准备attrs，为必需字段添加默认值
         attrs = confirm_data.extracted_fields.copy()
         
@@ -204,7 +512,7 @@ class ImportService:
         if task.input_files:
             media = [{"url": url, "path": url} for url in task.input_files]
         
-        sku_create = SKUCreate(
+        return SKUCreate(
             sku_name=sku_name,
             sku_type=sku_type,
             owner_type="private",
@@ -226,25 +534,6 @@ class ImportService:
             raw_extracted=task.extracted_fields,
             media=media
         )
-        
-        sku = SKUService.create_sku(db, agency_id, user_id, sku_create)
-        
-        task.status = ImportStatus.CONFIRMED
-        task.created_sku_id = sku.id
-        task.updated_at = datetime.utcnow()
-        db.commit()
-        
-        audit_log(
-            db=db,
-            agency_id=agency_id,
-            user_id=user_id,
-            action="import.confirm",
-            entity_type="import_task",
-            entity_id=task.id,
-            after_data={"created_sku_id": sku.id}
-        )
-        
-        return sku.id
     
     @staticmethod
     async def extract_with_ai(
@@ -261,16 +550,120 @@ class ImportService:
         Uses Kimi K2.5 with native multimodal support (vision + text)
         """
         from app.infra.llm_client import LLMClient
-        import logging
-        logger = logging.getLogger(__name__)
         
+        task = await ImportService._create_parsing_task(
+            db, agency_id, user_id, input_text, file_data, original_filename
+        )
+        
+        started = time.monotonic()
+        try:
+            # Well-formed DOCX/XLSX rate sheets need no LLM call at all
+            result = ImportService._parse_rate_sheet(file_data, file_mime_type, original_filename)
+            llm_input = None
+            
+            if result is None:
+                llm_input = await ImportService._prepare_llm_input(
+                    task.id, input_text, file_data, file_mime_type, original_filename
+                )
+                # Repeat layout from a known supplier: parse with the learned template
+                result = ImportService._match_template(db, agency_id, llm_input)
+            
+            if result is None:
+                if llm_input is None or ImportService._exceeds_token_budget(llm_input):
+                    result = await ImportService._extract_split(llm_input, file_data, input_text)
+                else:
+                    extraction_mode = llm_input.pop("extraction_mode")
+                    llm_client = LLMClient()
+                    result = await llm_client.parse_sku_input(**llm_input)
+                    result["extraction_mode"] = extraction_mode
+            
+            ImportService._mark_parsed(db, task, result, int((time.monotonic() - started) * 1000))
+        except Exception as e:
+            ImportService._mark_failed(db, task, e)
+        
+        db.commit()
+        db.refresh(task)
+        
+        return task
+    
+    @staticmethod
+    async def stream_extract_with_ai(
+        db: Session,
+        agency_id: str,
+        user_id: str,
+        input_text: Optional[str] = None,
+        file_data: Optional[bytes] = None,
+        file_mime_type: Optional[str] = None,
+        original_filename: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of extract_with_ai: yields events while the completion arrives.
+        
+        Events: {"event": "task", "task_id"} first, then {"event": "field"|"meta", "field", "value"}
+        for each finished value, and finally {"event": "done", "task": ImportTaskResponse}.
+        Rate sheets, multi-page PDFs and chunked long inputs are not streamed; their
+        fields are emitted once the whole result is ready.
+        """
+        from app.infra.llm_client import LLMClient
+        from app.domain.imports.schemas import ImportTaskResponse
+        
+        task = await ImportService._create_parsing_task(
+            db, agency_id, user_id, input_text, file_data, original_filename
+        )
+        yield {"event": "task", "task_id": task.id}
+        
+        started = time.monotonic()
+        try:
+            result = ImportService._parse_rate_sheet(file_data, file_mime_type, original_filename)
+            llm_input = None
+            if result is None:
+                llm_input = await ImportService._prepare_llm_input(
+                    task.id, input_text, file_data, file_mime_type, original_filename
+                )
+                result = ImportService._match_template(db, agency_id, llm_input)
+            
+            if result is not None or llm_input is None or ImportService._exceeds_token_budget(llm_input):
+                if result is None:
+                    result = await ImportService._extract_split(llm_input, file_data, input_text)
+                for field, value in (result.get("extracted_fields") or {}).items():
+                    yield {"event": "field", "field": field, "value": value}
+            else:
+                extraction_mode = llm_input.pop("extraction_mode")
+                llm_client = LLMClient()
+                result = None
+                async for event in llm_client.stream_sku_input(**llm_input):
+                    if event["type"] == "result":
+                        result = event["result"]
+                    else:
+                        yield {"event": event["type"], "field": event["field"], "value": event["value"]}
+                result["extraction_mode"] = extraction_mode
+            
+            ImportService._mark_parsed(db, task, result, int((time.monotonic() - started) * 1000))
+        except Exception as e:
+            ImportService._mark_failed(db, task, e)
+        
+        db.commit()
+        db.refresh(task)
+        
+        yield {"event": "done", "task": ImportTaskResponse.model_validate(task).model_dump(mode="json")}
+    
+    @staticmethod
+    async def _create_parsing_task(
+        db: Session,
+        agency_id: str,
+        user_id: str,
+        input_text: Optional[str],
+        file_data: Optional[bytes],
+        original_filename: Optional[str]
+    ) -> ImportTask:
+        """Keep the original upload in storage and create the task in PARSING state."""
+        logger = logging.getLogger(__name__)
         task_id = f"IMPORT-{uuid.uuid4().hex[:12].upper()}"
         
         # Save uploaded file to storage if provided
         file_url = None
         if file_data and original_filename:
             from app.infra.storage import StorageClient
-            import io
             storage_client = StorageClient()
             file_stream = io.BytesIO(file_data)
             file_path = await storage_client.upload_file(file_stream, original_filename)
@@ -291,146 +684,427 @@ class ImportService:
         
         db.add(task)
         db.commit()
+        return task
+    
+    @staticmethod
+    async def _prepare_llm_input(
+        task_id: str,
+        input_text: Optional[str],
+        file_data: Optional[bytes],
+        file_mime_type: Optional[str],
+        original_filename: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Decide how the input reaches the LLM in a single call.
+        Returns parse_sku_input kwargs plus "extraction_mode", or None when the
+        input is a multi-page PDF that should go through _extract_pdf_pages.
+        """
+        from app.config import get_settings
+        settings = get_settings()
+        logger = logging.getLogger(__name__)
         
-        try:
-            logger = logging.getLogger(__name__)
-            from app.config import get_settings
-            settings = get_settings()
+        print(f"\n{'='*80}")
+        print(f"LLM PROVIDER: {settings.llm_provider}")
+        print(f"{'='*80}\n")
+        
+        # DOCX/XLSX are read locally with their tables intact (no upload round trips)
+        office_kind = ImportService._office_kind(file_mime_type, original_filename) if file_data else None
+        if office_kind:
+            try:
+                office_text = ImportService._office_document(file_data, office_kind)[2]
+                logger.info(f"{office_kind.upper()} extracted {len(office_text)} chars for task {task_id}")
+                if office_text:
+                    return {
+                        "input_text": ImportService._merge_input_text(input_text, office_text, f"{office_kind.upper()} 内容"),
+                        "images": None,
+                        "file_ids": None,
+                        "extraction_mode": "text"
+                    }
+            except Exception as e:
+                logger.warning(f"{office_kind.upper()} extraction failed: {str(e)}")
+        
+        # For Kimi provider: handle images and documents differently
+        if settings.llm_provider == "kimi" and file_data and file_mime_type:
+            from app.infra.kimi_client import KimiClient
+            
+            ocr_text = await ImportService._ocr_fast_path_text(file_data, file_mime_type)
+            
+            if ocr_text:
+                # Confident local OCR: text-only prompt instead of a vision call
+                logger.info(f"OCR fast path: {len(ocr_text)} chars, skipping multimodal request")
+                return {
+                    "input_text": ImportService._merge_input_text(input_text, ocr_text, "OCR 识别文本"),
+                    "images": None,
+                    "file_ids": None,
+                    "extraction_mode": "ocr_text"
+                }
+            
+            if file_mime_type.startswith('image/'):
+                # For images: pass binary data directly for base64 encoding
+                logger.info(f"Processing image: {file_mime_type}, size: {len(file_data)} bytes")
+                return {
+                    "input_text": input_text or "",
+                    "images": [{
+                        'data': file_data,
+                        'mime_type': file_mime_type
+                    }],
+                    "file_ids": None,
+                    "extraction_mode": "vision"
+                }
+            
+            if file_mime_type == 'application/pdf':
+                # pdfinfo is a blocking subprocess: keep it off the event loop
+                loop = asyncio.get_running_loop()
+                if await loop.run_in_executor(None, ImportService._should_split_pdf, file_data):
+                    return None
+            
+            # For PDF/DOCX: upload to Kimi and extract text content
+            if file_mime_type == 'application/pdf':
+                filename = "document.pdf"
+            elif file_mime_type in ('application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'application/msword'):
+                filename = "document.docx"
+            else:
+                filename = "file"
+            
+            kimi_client = KimiClient()
+            logger.info(f"Uploading document to Kimi: {filename}, size: {len(file_data)} bytes")
+            
+            # Upload file to Kimi and extract its content (reused by content hash on re-imports)
+            document = await kimi_client.get_document_content(file_data, filename)
+            logger.info(f"Kimi file {document['file_id']}: {len(document['content'])} chars (cached: {document['cached']})")
             
+            # Pass content as text (so it is counted against the prompt budget)
+            return {
+                "input_text": ImportService._merge_input_text(input_text, document["content"], "文件内容"),
+                "images": None,
+                "file_ids": None,
+                "extraction_mode": "kimi_file"
+            }
+        
+        # Fallback: for other providers or image files, use direct processing
+        # Prepare images list for LLM client
+        images = None
+        if file_data and file_mime_type:
+            images = [{
+                'data': file_data,
+                'mime_type': file_mime_type
+            }]
             print(f"\n{'='*80}")
-            print(f"LLM PROVIDER: {settings.llm_provider}")
+            print(f"FILE UPLOAD DETECTED:")
+            print(f"  - MIME Type: {file_mime_type}")
+            print(f"  - File Size: {len(file_data)} bytes")
+            print(f"  - Input Text Length: {len(input_text) if input_text else 0} chars")
             print(f"{'='*80}\n")
-            
-            # For Kimi provider: handle images and documents differently
-            if settings.llm_provider == "kimi" and file_data and file_mime_type:
-                from app.infra.kimi_client import KimiClient
-                
-                if file_mime_type.startswith('image/'):
-                    # For images: pass binary data directly for base64 encoding
-                    logger.info(f"Processing image: {file_mime_type}, size: {len(file_data)} bytes")
-                    llm_client = LLMClient()
-                    result = await llm_client.parse_sku_input(
-                        input_text=input_text or "",
-                        images=[{
-                            'data': file_data,
-                            'mime_type': file_mime_type
-                        }],
-                        file_ids=None
-                    )
-                else:
-                    # For PDF/DOCX: upload to Kimi and extract text content
-                    if file_mime_type == 'application/pdf':
-                        filename = "document.pdf"
-                    elif file_mime_type in ('application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'application/msword'):
-                        filename = "document.docx"
-                    else:
-                        filename = "file"
-                    
-                    kimi_client = KimiClient()
-                    logger.info(f"Uploading document to Kimi: {filename}, size: {len(file_data)} bytes")
-                    
-                    # Upload file to Kimi
-                    file_id = await kimi_client.upload_file(file_data, filename)
-                    file_info = await kimi_client.get_file(file_id)
-                    logger.info(f"Kimi file uploaded: {file_info.get('filename')} (status: {file_info.get('status')})")
-                    
-                    # Extract content and pass as text
-                    llm_client = LLMClient()
-                    result = await llm_client.parse_sku_input(
-                        input_text=input_text or "",
-                        images=None,
-                        file_ids=[file_id]
-                    )
+        
+        return {
+            "input_text": input_text or "",
+            "images": images,
+            "file_ids": None,
+            "extraction_mode": "vision" if images else "text"
+        }
+    
+    @staticmethod
+    def _mark_parsed(db: Session, task: ImportTask, result: Dict[str, Any], extraction_ms: Optional[int] = None):
+        task.status = ImportStatus.PARSED
+        task.extracted_fields = result.get("extracted_fields", {})
+        task.confidence = result.get("confidence", {})
+        task.evidence = result.get("evidence", {})
+        task.parsed_result = result
+        record_usage(task, result, extraction_ms)
+        task.updated_at = datetime.utcnow()
+        
+        audit_log(
+            db=db,
+            agency_id=task.agency_id,
+            user_id=task.user_id,
+            action="import.parsed",
+            entity_type="import_task",
+            entity_id=task.id,
+            after_data={
+                "status": "parsed",
+                "sku_type": result.get("sku_type"),
+                "prompt_tokens": task.prompt_tokens,
+                "completion_tokens": task.completion_tokens,
+                "extraction_ms": task.extraction_ms,
+                "llm_route": task.llm_route,
+                "llm_model": task.llm_model
+            }
+        )
+    
+    @staticmethod
+    def _mark_failed(db: Session, task: ImportTask, error: Exception):
+        task.status = ImportStatus.FAILED
+        task.error_message = str(error)
+        task.updated_at = datetime.utcnow()
+        
+        audit_log(
+            db=db,
+            agency_id=task.agency_id,
+            user_id=task.user_id,
+            action="import.failed",
+            entity_type="import_task",
+            entity_id=task.id,
+            after_data={"error": str(error)}
+        )
+
+    @staticmethod
+    async def _ocr_fast_path_text(file_data: bytes, file_mime_type: str) -> Optional[str]:
+        """Local OCR pre-pass; returns text only when confident enough to replace the image."""
+        from app.infra.ocr import OCRService
+        
+        try:
+            if file_mime_type.startswith('image/'):
+                ocr_result = await OCRService.recognize_image(file_data)
+            elif file_mime_type == 'application/pdf':
+                loop = asyncio.get_running_loop()
+                if not await loop.run_in_executor(None, OCRService.is_scanned_pdf, file_data):
+                    return None
+                # None for PDFs longer than OCR_PDF_MAX_PAGES; those take the page-split / file path
+                ocr_result = await OCRService.recognize_pdf(file_data)
             else:
-                # Fallback: for other providers or image files, use direct processing
-                docx_text = None
-                if file_data and file_mime_type in (
-                    'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-                    'application/msword'
-                ):
-                    try:
-                        docx_text = ImportService._extract_docx_text(file_data)
-                        logger.info(f"DOCX extracted {len(docx_text)} chars for task {task_id}")
-                    except Exception as e:
-                        logger.warning(f"DOCX extraction failed: {str(e)}")
+                return None
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"OCR pre-pass failed: {str(e)}")
+            return None
+        
+        if not OCRService.is_confident(ocr_result):
+            return None
+        return ocr_result["text"]
 
-                if docx_text:
-                    # Merge original text with DOCX content
-                    input_text = (input_text or "").strip()
-                    if input_text:
-                        input_text += "\n\n--- DOCX 内容 ---\n" + docx_text
-                    else:
-                        input_text = docx_text
-                    images = None
-                else:
-                    # Prepare images list for LLM client
-                    images = None
-                    if file_data and file_mime_type:
-                        images = [{
-                            'data': file_data,
-                            'mime_type': file_mime_type
-                        }]
-                        print(f"\n{'='*80}")
-                        print(f"FILE UPLOAD DETECTED:")
-                        print(f"  - MIME Type: {file_mime_type}")
-                        print(f"  - File Size: {len(file_data)} bytes")
-                        print(f"  - Input Text Length: {len(input_text) if input_text else 0} chars")
-                        print(f"{'='*80}\n")
-                
+    @staticmethod
+    def _should_split_pdf(file_data: bytes) -> bool:
+        from app.config import get_settings
+        from app.infra.pdf_pages import count_pdf_pages
+        settings = get_settings()
+        
+        if not settings.pdf_page_split_enabled:
+            return False
+        page_count = count_pdf_pages(file_data)
+        return bool(page_count and 1 < page_count <= settings.pdf_split_max_pages)
+
+    @staticmethod
+    async def _extract_pdf_pages(file_data: bytes, input_text: Optional[str]) -> Dict[str, Any]:
+        """Rasterize a PDF and extract every page concurrently, then merge per-page results."""
+        from app.config import get_settings
+        from app.infra.llm_client import LLMClient
+        from app.infra.pdf_pages import render_pdf_pages
+        from app.domain.imports.merge import merge_extraction_results, failed_part
+        settings = get_settings()
+        logger = logging.getLogger(__name__)
+        
+        loop = asyncio.get_running_loop()
+        pages = await loop.run_in_executor(
+            None, render_pdf_pages, file_data, settings.pdf_page_dpi, settings.pdf_split_max_pages
+        )
+        logger.info(f"PDF split into {len(pages)} pages for parallel extraction")
+        
+        semaphore = asyncio.Semaphore(settings.pdf_page_concurrency)
+        
+        async def extract_page(page_no: int, page_bytes: bytes) -> Dict[str, Any]:
+            async with semaphore:
                 llm_client = LLMClient()
-                result = await llm_client.parse_sku_input(
+                ocr_text = await ImportService._ocr_fast_path_text(page_bytes, 'image/jpeg')
+                if ocr_text:
+                    return await llm_client.parse_sku_input(
+                        input_text=ImportService._merge_input_text(input_text, ocr_text, f"第{page_no}页 OCR 识别文本"),
+                        images=None
+                    )
+                return await llm_client.parse_sku_input(
                     input_text=input_text or "",
-                    images=images
+                    images=[{'data': page_bytes, 'mime_type': 'image/jpeg'}]
                 )
-            
-            task.status = ImportStatus.PARSED
-            task.extracted_fields = result.get("extracted_fields", {})
-            task.confidence = result.get("confidence", {})
-            task.evidence = result.get("evidence", {})
-            task.parsed_result = result
-            task.updated_at = datetime.utcnow()
-            
-            audit_log(
-                db=db,
-                agency_id=agency_id,
-                user_id=user_id,
-                action="import.parsed",
-                entity_type="import_task",
-                entity_id=task.id,
-                after_data={"status": "parsed", "sku_type": result.get("sku_type")}
-            )
-            
+        
+        outcomes = await asyncio.gather(
+            *(extract_page(i, page) for i, page in enumerate(pages, 1)),
+            return_exceptions=True
+        )
+        
+        results, labels, failures = [], [], []
+        for page_no, outcome in enumerate(outcomes, 1):
+            if isinstance(outcome, Exception):
+                logger.warning(f"PDF page {page_no} extraction failed: {str(outcome)}")
+                failures.append(failed_part(f"第{page_no}页", outcome))
+            else:
+                results.append(outcome)
+                labels.append(f"第{page_no}页")
+        
+        if not results:
+            raise next(o for o in outcomes if isinstance(o, Exception))
+        
+        merged = merge_extraction_results(results, labels)
+        merged["parts"].extend(failures)
+        merged["extraction_mode"] = "pdf_pages"
+        return merged
+
+    @staticmethod
+    async def _extract_split(
+        llm_input: Optional[Dict[str, Any]],
+        file_data: Optional[bytes],
+        input_text: Optional[str]
+    ) -> Dict[str, Any]:
+        """Extractions made of several LLM calls: multi-page PDFs (llm_input None) or oversized text."""
+        if llm_input is None:
+            # Multi-page PDF: one vision/OCR extraction per page, run in parallel, then merged
+            return await ImportService._extract_pdf_pages(file_data, input_text)
+        # Oversized text: split into chunks, extract concurrently, then merged
+        return await ImportService._extract_text_chunks(llm_input)
+
+    @staticmethod
+    def _match_template(db: Session, agency_id: str, llm_input: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Supplier template result for text-only inputs, None to go on with the LLM."""
+        if not llm_input or llm_input.get("images") or llm_input.get("file_ids"):
+            return None
+        return SupplierTemplateService.match(db, agency_id, llm_input.get("input_text"))
+
+    @staticmethod
+    async def save_as_template(
+        db: Session,
+        agency_id: str,
+        user_id: str,
+        task_id: str,
+        name: Optional[str] = None
+    ):
+        """Learn a supplier template from a confirmed import; None if the task does not exist."""
+        task = scoped_query(db, ImportTask, agency_id).filter(ImportTask.id == task_id).first()
+        if not task:
+            return None
+        source_text, _ = await ImportService._task_source(task)
+        return SupplierTemplateService.create_from_task(db, agency_id, user_id, task, source_text, name)
+
+    @staticmethod
+    def _office_kind(file_mime_type: Optional[str], filename: Optional[str]) -> Optional[str]:
+        if file_mime_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document':
+            return "docx"
+        if file_mime_type == 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet':
+            return "xlsx"
+        extension = (filename or "").lower().rsplit(".", 1)[-1]
+        return extension if extension in ("docx", "xlsx") else None
+
+    @staticmethod
+    def _office_document(file_data: bytes, kind: str):
+        """(tables, paragraphs, text) of a DOCX or XLSX file."""
+        from app.infra.office_tables import iter_docx_blocks, read_xlsx, table_to_text
+        
+        tables, paragraphs, parts = [], [], []
+        if kind == "docx":
+            for block_kind, content in iter_docx_blocks(file_data):
+                if block_kind == "table":
+                    tables.append(content)
+                    parts.append(table_to_text(content))
+                else:
+                    paragraphs.append(content)
+                    parts.append(content)
+        else:
+            for name, rows in read_xlsx(file_data).items():
+                tables.append(rows)
+                # Title rows (a single filled cell) usually carry the hotel name
+                paragraphs.extend(cells[0] for cells in ([c for c in row if c] for row in rows[:5]) if len(cells) == 1)
+                parts.append(f"--- 工作表: {name} ---\n{table_to_text(rows)}")
+        return tables, paragraphs, "\n".join(parts).strip()
+
+    @staticmethod
+    def _parse_rate_sheet(
+        file_data: Optional[bytes],
+        file_mime_type: Optional[str],
+        original_filename: Optional[str]
+    ) -> Optional[Dict[str, Any]]:
+        """Template-based rate sheet parse for DOCX/XLSX; None means use the LLM."""
+        from app.config import get_settings
+        from app.domain.imports.rate_sheets import extract_rate_sheet
+        settings = get_settings()
+        
+        kind = ImportService._office_kind(file_mime_type, original_filename) if file_data else None
+        if not kind or not settings.rate_sheet_enabled:
+            return None
+        try:
+            tables, paragraphs, _ = ImportService._office_document(file_data, kind)
+            result = extract_rate_sheet(tables, paragraphs, original_filename)
         except Exception as e:
-            task.status = ImportStatus.FAILED
-            task.error_message = str(e)
-            task.updated_at = datetime.utcnow()
-            
-            audit_log(
-                db=db,
-                agency_id=agency_id,
-                user_id=user_id,
-                action="import.failed",
-                entity_type="import_task",
-                entity_id=task.id,
-                after_data={"error": str(e)}
+            logging.getLogger(__name__).warning(f"Rate sheet parsing failed, falling back to LLM: {str(e)}")
+            return None
+        if result:
+            logging.getLogger(__name__).info(
+                f"Rate sheet parsed with template '{result['template']}': "
+                f"{len(result['extracted_fields']['room_types'])} room types, no LLM call"
             )
+        return result
+
+    @staticmethod
+    def _exceeds_token_budget(llm_input: Dict[str, Any]) -> bool:
+        from app.config import get_settings
+        from app.infra.tokens import estimate_tokens
+        settings = get_settings()
         
-        db.commit()
-        db.refresh(task)
+        return estimate_tokens(llm_input.get("input_text") or "") > settings.llm_max_input_tokens
+
+    @staticmethod
+    async def _extract_text_chunks(llm_input: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Split an oversized text input on line boundaries and extract every chunk
+        concurrently, then merge. Images (if any) are sent with the first chunk only.
+        """
+        from app.config import get_settings
+        from app.infra.llm_client import LLMClient
+        from app.infra.tokens import estimate_tokens, split_text_by_tokens
+        from app.domain.imports.merge import merge_extraction_results, failed_part
+        settings = get_settings()
+        logger = logging.getLogger(__name__)
         
-        return task
+        text = llm_input["input_text"]
+        chunks = split_text_by_tokens(text, settings.llm_chunk_tokens, settings.llm_chunk_overlap_tokens)
+        if len(chunks) > settings.llm_max_chunks:
+            raise ValueError(
+                f"Input too large: ~{estimate_tokens(text)} tokens would need {len(chunks)} chunks "
+                f"(limit {settings.llm_max_chunks}). Please split the document and import it in parts."
+            )
+        logger.info(f"Input of ~{estimate_tokens(text)} tokens split into {len(chunks)} chunks")
+        
+        semaphore = asyncio.Semaphore(settings.llm_chunk_concurrency)
+        
+        async def extract_chunk(chunk_no: int, chunk: str) -> Dict[str, Any]:
+            async with semaphore:
+                llm_client = LLMClient()
+                header = f"（长文档第{chunk_no}/{len(chunks)}段，仅提取本段中出现的信息）\n"
+                return await llm_client.parse_sku_input(
+                    input_text=header + chunk,
+                    images=llm_input.get("images") if chunk_no == 1 else None
+                )
+        
+        outcomes = await asyncio.gather(
+            *(extract_chunk(i, chunk) for i, chunk in enumerate(chunks, 1)),
+            return_exceptions=True
+        )
+        
+        results, labels, failures = [], [], []
+        for chunk_no, outcome in enumerate(outcomes, 1):
+            if isinstance(outcome, Exception):
+                logger.warning(f"Chunk {chunk_no} extraction failed: {str(outcome)}")
+                failures.append(failed_part(f"片段{chunk_no}", outcome))
+            else:
+                results.append(outcome)
+                labels.append(f"片段{chunk_no}")
+        
+        if not results:
+            raise next(o for o in outcomes if isinstance(o, Exception))
+        
+        merged = merge_extraction_results(results, labels)
+        merged["parts"].extend(failures)
+        merged["extraction_mode"] = f"{llm_input['extraction_mode']}_chunked"
+        return merged
+
+    @staticmethod
+    def _merge_input_text(input_text: Optional[str], extra_text: str, label: str) -> str:
+        input_text = (input_text or "").strip()
+        if input_text:
+            return input_text + f"\n\n--- {label} ---\n" + extra_text
+        return extra_text
 
     @staticmethod
     def _extract_docx_text(file_data: bytes) -> str:
-        """Lightweight DOCX text extractor without extra dependencies."""
-        with zipfile.ZipFile(io.BytesIO(file_data)) as zf:
-            xml_bytes = zf.read('word/document.xml')
-        root = ET.fromstring(xml_bytes)
-        texts: List[str] = []
-        for node in root.iter():
-            if node.tag.endswith('}t') and node.text:
-                texts.append(node.text)
-        content = '\n'.join(texts).strip()
+        """Lightweight streaming DOCX text extractor; tables are kept as pipe-separated rows."""
+        from app.infra.office_tables import docx_to_text
+        
+        content = docx_to_text(file_data)
         if not content:
             raise ValueError("DOCX has no readable text")
         return content
@@ -2,7 +2,39 @@ from app.infra.queue import celery_app
 from app.infra.db import SessionLocal, ImportTask, ImportStatus
 from app.infra.llm_client import LLMClient
 from app.infra.audit import audit_log
+from app.infra.llm_limiter import retry_countdown
+from app.domain.imports.usage import record_usage
+from app.domain.imports import batching
+from app.domain.imports.templates import SupplierTemplateService
+from app.config import get_settings
+import asyncio
+import logging
 import traceback
+import time
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+
+def _mark_task_parsed(db, task: ImportTask, result: dict, extraction_ms: int):
+    task.status = ImportStatus.PARSED
+    task.parsed_result = result
+    task.extracted_fields = result.get("extracted_fields", {})
+    task.confidence = result.get("confidence", {})
+    task.evidence = result.get("evidence", {})
+    record_usage(task, result, extraction_ms)
+    
+    db.commit()
+    
+    audit_log(
+        db=db,
+        agency_id=task.agency_id,
+        user_id=task.user_id,
+        action="import.parsed",
+        entity_type="import_task",
+        entity_id=task.id,
+        after_data={"status": "parsed", "sku_type": result.get("sku_type"), "llm_route": task.llm_route}
+    )
 
 
 @celery_app.task(bind=True, max_retries=3)
@@ -19,32 +51,19 @@ def parse_import_task(self, task_id: str):
         llm_client = LLMClient()
         
         result = None
-        try:
-            import asyncio
-            result = asyncio.run(llm_client.parse_sku_input(
-                input_text=task.input_text or "",
-                images=task.input_files
-            ))
-        except Exception as e:
-            raise Exception(f"LLM parsing failed: {str(e)}")
-        
-        task.status = ImportStatus.PARSED
-        task.parsed_result = result
-        task.extracted_fields = result.get("extracted_fields", {})
-        task.confidence = result.get("confidence", {})
-        task.evidence = result.get("evidence", {})
-        
-        db.commit()
+        started = time.monotonic()
+        if task.input_text and not task.input_files:
+            result = SupplierTemplateService.match(db, task.agency_id, task.input_text)
+        if result is None:
+            try:
+                result = asyncio.run(llm_client.parse_sku_input(
+                    input_text=task.input_text or "",
+                    images=task.input_files
+                ))
+            except Exception as e:
+                raise Exception(f"LLM parsing failed: {str(e)}") from e
         
-        audit_log(
-            db=db,
-            agency_id=task.agency_id,
-            user_id=task.user_id,
-            action="import.parsed",
-            entity_type="import_task",
-            entity_id=task.id,
-            after_data={"status": "parsed", "sku_type": result.get("sku_type")}
-        )
+        _mark_task_parsed(db, task, result, int((time.monotonic() - started) * 1000))
         
         return {"status": "success", "task_id": task_id}
         
@@ -67,7 +86,86 @@ def parse_import_task(self, task_id: str):
             after_data={"error": str(e)}
         )
         
-        raise self.retry(exc=e, countdown=60)
+        # Honour the provider's Retry-After / breaker window instead of a fixed delay
+        raise self.retry(exc=e, countdown=retry_countdown(e, self.request.retries))
         
     finally:
         db.close()
+
+
+@celery_app.task
+def flush_import_batch():
+    """
+    Extract up to llm_batch_max_items pending short text imports with one LLM call.
+    Tasks missing from the batched response (or a failed call) fall back to parse_import_task.
+    The claimed ids are acked only once every task has been handed on; if this worker
+    dies first, requeue_stale_import_batches returns them to the pending list.
+    """
+    batching.requeue_stale(settings.llm_batch_claim_timeout_s)
+    task_ids = batching.pop_batch(settings.llm_batch_max_items)
+    if not task_ids:
+        return {"status": "empty"}
+    if batching.pending_count():
+        # A full batch is already waiting: no need to sit out another window
+        flush_import_batch.delay()
+    
+    db = SessionLocal()
+    try:
+        result = _flush_batch(db, task_ids)
+    finally:
+        db.close()
+    batching.ack(task_ids)
+    return result
+
+
+@celery_app.task
+def requeue_stale_import_batches():
+    """Periodic safety net: re-queue batches whose flush never acked them."""
+    requeued = batching.requeue_stale(settings.llm_batch_claim_timeout_s)
+    if requeued:
+        flush_import_batch.delay()
+    return {"requeued": len(requeued)}
+
+
+def _flush_batch(db, task_ids):
+    tasks = []
+    # PARSING here means a flush claimed the task and died mid-call before its ack
+    # (requeue_stale handed the id back), so it is extracted again rather than dropped
+    for task in db.query(ImportTask).filter(
+        ImportTask.id.in_(task_ids),
+        ImportTask.status.in_([ImportStatus.UPLOADED, ImportStatus.PARSING])
+    ):
+        started = time.monotonic()
+        result = SupplierTemplateService.match(db, task.agency_id, task.input_text)
+        if result is not None:
+            _mark_task_parsed(db, task, result, int((time.monotonic() - started) * 1000))
+        else:
+            tasks.append(task)
+    if len(tasks) < 2:
+        for task in tasks:
+            parse_import_task.delay(task.id)
+        return {"status": "individual", "count": len(tasks)}
+    
+    for task in tasks:
+        task.status = ImportStatus.PARSING
+    db.commit()
+    
+    started = time.monotonic()
+    try:
+        result = asyncio.run(LLMClient().parse_sku_batch([task.input_text for task in tasks]))
+        parts = batching.split_batch_result(result, len(tasks))
+    except Exception as e:
+        logger.warning(f"Batched extraction of {len(tasks)} imports failed, falling back: {str(e)}")
+        parts = [None] * len(tasks)
+    extraction_ms = int((time.monotonic() - started) * 1000)
+    
+    fallback = []
+    for task, part in zip(tasks, parts):
+        if part is None:
+            fallback.append(task.id)
+        else:
+            _mark_task_parsed(db, task, part, extraction_ms)
+    for task_id in fallback:
+        parse_import_task.delay(task_id)
+    
+    return {"status": "success", "batched": len(tasks) - len(fallback), "fallback": len(fallback)}
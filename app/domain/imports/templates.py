@@ -0,0 +1,420 @@
+"""
+Supplier templates learned from reviewed imports.
+
+A template is built from one confirmed import's source text, the field values the
+operator confirmed and their
+evidence spans:
+- scalar fields become anchor rules: the literal text around the value on its line
+  (digits generalised) with the value captured in between;
+- list fields (room types, departure dates, ...) become row rules learned from the
+  first item's line, applied to every line of a later document;
+- fields that never appear in the text (inferred city, currency) are kept as constants.
+Every rule is checked against the source text before it is kept.
+
+Later imports whose line labels match a template closely enough are parsed with
+these rules in milliseconds; the LLM is used only when too few rules match.
+"""
+from typing import Optional, List, Dict, Any, Tuple
+from sqlalchemy.orm import Session, load_only
+from app.infra.db import SupplierTemplate, ImportTask, ImportStatus, SKU, scoped_query
+from app.infra.audit import audit_log
+from app.config import get_settings
+import hashlib
+import logging
+import re
+import unicodedata
+import uuid
+from datetime import datetime
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_NUMBER = r"(\d+(?:[.,]\d+)*)"
+_TEXT = r"(.+?)"
+_SPLIT_LABEL = re.compile(r"[:：]|\d")
+
+
+def _lines(text: str) -> List[str]:
+    text = unicodedata.normalize("NFKC", text or "")
+    return [line.strip() for line in text.splitlines() if line.strip()]
+
+
+def layout_labels(text: str) -> List[str]:
+    """Sorted distinct line labels (text before the first colon/digit); describes the layout, not the values."""
+    labels = set()
+    for line in _lines(text):
+        label = re.sub(r"[\s|]+", "", _SPLIT_LABEL.split(line, 1)[0])
+        if len(label) >= 2:
+            labels.add(label[:20])
+    return sorted(labels)
+
+
+def fingerprint(labels: List[str]) -> str:
+    return hashlib.sha1("\n".join(labels).encode("utf-8")).hexdigest()
+
+
+def label_similarity(a: List[str], b: List[str]) -> float:
+    a, b = set(a), set(b)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _literal(text: str) -> str:
+    """Regex for literal text with whitespace relaxed and digit runs generalised (dates, years change)."""
+    parts = [re.escape(part) for part in text.split()]
+    return r"\s*".join(re.sub(r"\d+", r"\\d+", part) for part in parts)
+
+
+def _value_text(value: Any) -> Optional[str]:
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    if isinstance(value, (int, float, str)):
+        text = unicodedata.normalize("NFKC", str(value)).strip()
+        return text or None
+    return None
+
+
+def _convert(raw: str, kind: str) -> Any:
+    raw = raw.strip()
+    if kind != "number":
+        return raw
+    number = float(raw.replace(",", ""))
+    return int(number) if number.is_integer() else number
+
+
+def _same(a: Any, b: Any) -> bool:
+    return _value_text(a) == _value_text(b)
+
+
+def _scalar_rule(field: str, value: Any, lines: List[str], evidence: Optional[str]) -> Optional[Dict[str, Any]]:
+    value_text = _value_text(value)
+    if not value_text:
+        return None
+    kind = "number" if isinstance(value, (int, float)) else "text"
+    evidence = unicodedata.normalize("NFKC", str(evidence or ""))
+
+    candidates = [l for l in lines if value_text in l]
+    # Prefer the line the evidence span points at
+    candidates.sort(key=lambda l: 0 if evidence and (evidence in l or l in evidence) else 1)
+    for line in candidates:
+        start = line.index(value_text)
+        prefix, suffix = line[:start].strip(), line[start + len(value_text):].strip()
+        if not prefix and not suffix:
+            continue  # a bare value line has nothing to anchor on
+        pattern = r"^\s*" + _literal(prefix) + r"\s*" + (_NUMBER if kind == "number" else _TEXT)
+        pattern += r"\s*" + _literal(suffix) + r"\s*$"
+        rule = {"field": field, "pattern": pattern, "type": kind}
+        if _same(_apply_scalar(rule, lines), value):
+            return rule
+    return None
+
+
+def _apply_scalar(rule: Dict[str, Any], lines: List[str]) -> Any:
+    regex = re.compile(rule["pattern"])
+    for line in lines:
+        match = regex.match(line)
+        if match:
+            try:
+                return _convert(match.group(1), rule["type"])
+            except ValueError:
+                return None
+    return None
+
+
+def _flatten(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Scalars of a list item; one-element nested lists (e.g. pricing) are flattened as key.0.sub."""
+    flat = {}
+    for key, value in item.items():
+        if isinstance(value, list) and len(value) == 1 and isinstance(value[0], dict):
+            for sub, sub_value in value[0].items():
+                if _value_text(sub_value) is not None or isinstance(sub_value, bool):
+                    flat[f"{key}.0.{sub}"] = sub_value
+        elif _value_text(value) is not None or isinstance(value, bool):
+            flat[key] = value
+    return flat
+
+
+def _unflatten(flat: Dict[str, Any]) -> Dict[str, Any]:
+    item: Dict[str, Any] = {}
+    for path, value in flat.items():
+        if ".0." in path:
+            key, sub = path.split(".0.", 1)
+            item.setdefault(key, [{}])[0][sub] = value
+        else:
+            item[path] = value
+    return item
+
+
+def _row_rule(field: str, items: List[Any], lines: List[str]) -> Optional[Dict[str, Any]]:
+    if not items or not isinstance(items[0], dict):
+        return None
+    flat = _flatten(items[0])
+    texts = {path: _value_text(v) for path, v in flat.items() if not isinstance(v, bool) and _value_text(v)}
+
+    # The line carrying most of the first item's values
+    best_line, best_found = None, []
+    for line in lines:
+        found = [(line.find(t), path, t) for path, t in texts.items() if t in line]
+        if len(found) > len(best_found):
+            best_line, best_found = line, found
+    if not best_line or len(best_found) < 2:
+        return None
+
+    # Non-overlapping values in line order; longer values win ties at the same position
+    best_found.sort(key=lambda f: (f[0], -len(f[2])))
+    pattern, paths, types, cursor = r"^\s*", [], [], 0
+    for position, path, text in best_found:
+        if position < cursor:
+            continue
+        kind = "number" if isinstance(flat[path], (int, float)) else "text"
+        pattern += _literal(best_line[cursor:position]) + r"\s*" + (_NUMBER if kind == "number" else _TEXT) + r"\s*"
+        paths.append(path)
+        types.append(kind)
+        cursor = position + len(text)
+    pattern += _literal(best_line[cursor:]) + r"\s*$"
+
+    # Values the line does not carry (currency, flags) are copied as constants
+    constants = {path: value for path, value in flat.items() if path not in paths}
+    rule = {"field": field, "pattern": pattern, "paths": paths, "types": types, "constants": constants}
+
+    rows = _apply_rows(rule, lines)
+    if len(rows) != len(items) or not all(_same(_flatten(rows[0]).get(p), flat[p]) for p in paths):
+        return None
+    return rule
+
+
+def _apply_rows(rule: Dict[str, Any], lines: List[str]) -> List[Dict[str, Any]]:
+    regex = re.compile(rule["pattern"])
+    rows = []
+    for line in lines:
+        match = regex.match(line)
+        if not match:
+            continue
+        try:
+            flat = {path: _convert(match.group(i + 1), kind) for i, (path, kind) in enumerate(zip(rule["paths"], rule["types"]))}
+        except ValueError:
+            continue
+        rows.append(_unflatten({**rule["constants"], **flat}))
+    return rows
+
+
+def build_rules(text: str, extracted_fields: Dict[str, Any], evidence: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """{"scalars": [...], "rows": [...], "constants": {...}, "skipped": [...]} for one reviewed import."""
+    lines = _lines(text)
+    evidence = evidence or {}
+    scalars, rows, constants, skipped = [], [], {}, []
+    joined = "\n".join(lines)
+
+    for field, value in (extracted_fields or {}).items():
+        if isinstance(value, list) and value and isinstance(value[0], dict):
+            rule = _row_rule(field, value, lines)
+            if rule:
+                rows.append(rule)
+            else:
+                skipped.append(field)
+            continue
+        value_text = _value_text(value)
+        if value_text is None:
+            if value not in (None, "", [], {}):
+                constants[field] = value  # lists of strings, flags: keep as reviewed
+            continue
+        rule = _scalar_rule(field, value, lines, evidence.get(field))
+        if rule:
+            scalars.append(rule)
+        elif value_text not in joined:
+            constants[field] = value  # inferred, not in the text (e.g. city from the address)
+        else:
+            skipped.append(field)
+
+    return {"scalars": scalars, "rows": rows, "constants": constants, "skipped": skipped}
+
+
+def apply_template(template: SupplierTemplate, text: str) -> Optional[Dict[str, Any]]:
+    """Extraction result (LLM result shape) or None when too few rules match the text."""
+    rules = template.rules or {}
+    lines = _lines(text)
+    total = len(rules.get("scalars", [])) + len(rules.get("rows", []))
+    if not total:
+        return None
+
+    fields: Dict[str, Any] = dict(rules.get("constants") or {})
+    confidence: Dict[str, float] = {field: 0.7 for field in fields}
+    evidence: Dict[str, str] = {}
+    matched = 0
+    for rule in rules.get("scalars", []):
+        value = _apply_scalar(rule, lines)
+        if value is not None:
+            fields[rule["field"]] = value
+            confidence[rule["field"]] = 0.9
+            matched += 1
+    for rule in rules.get("rows", []):
+        items = _apply_rows(rule, lines)
+        if items:
+            fields[rule["field"]] = items
+            confidence[rule["field"]] = 0.9
+            evidence[rule["field"]] = f"{len(items)} 行匹配模板"
+            matched += 1
+
+    coverage = matched / total
+    if coverage < settings.supplier_template_min_coverage:
+        logger.info(f"Supplier template {template.id} matched {matched}/{total} rules, falling back to LLM")
+        return None
+
+    return {
+        "sku_type": template.sku_type,
+        "category": template.category,
+        "extracted_fields": fields,
+        "confidence": confidence,
+        "evidence": evidence,
+        "extraction_notes": f"按供应商模板「{template.name}」解析（{matched}/{total} 条规则匹配），未调用 LLM",
+        "extraction_mode": "supplier_template",
+        "template_id": template.id,
+        "usage": {
+            "estimated_input_tokens": 0,
+            "prompt_tokens": 0,
+            "completion_tokens": 0,
+            "llm_calls": 0,
+            "route": "supplier_template",
+            "model": None
+        }
+    }
+
+
+class SupplierTemplateService:
+    @staticmethod
+    def create_from_task(
+        db: Session,
+        agency_id: str,
+        user_id: str,
+        task: ImportTask,
+        source_text: str,
+        name: Optional[str] = None
+    ) -> SupplierTemplate:
+        """Learn a template from a confirmed import; raises ValueError if nothing can be learned."""
+        if task.status != ImportStatus.CONFIRMED:
+            raise ValueError("Only confirmed imports can be saved as templates")
+        if not task.confirmed_fields:
+            raise ValueError("Import has no confirmed fields to learn a template from")
+        if not source_text.strip():
+            raise ValueError("Import has no text to learn a template from")
+
+        # Rules come from what the operator confirmed, never from the raw LLM output
+        fields = task.confirmed_fields
+        rules = build_rules(source_text, fields, task.evidence or {})
+        if not rules["scalars"] and not rules["rows"]:
+            raise ValueError("No field could be anchored in the source text")
+
+        sku = db.query(SKU).filter(SKU.id == task.created_sku_id).first() if task.created_sku_id else None
+        labels = layout_labels(source_text)
+        template = SupplierTemplate(
+            id=f"TPL-{uuid.uuid4().hex[:12].upper()}",
+            agency_id=agency_id,
+            name=name or fields.get("supplier_name") or fields.get("sku_name") or task.original_filename or task.id,
+            supplier_name=fields.get("supplier_name"),
+            sku_type=sku.sku_type.value if sku else None,
+            category=sku.category if sku else None,
+            fingerprint=fingerprint(labels),
+            labels=labels,
+            rules=rules,
+            source_task_id=task.id,
+            hit_count=0,
+            created_by=user_id,
+            created_at=datetime.utcnow(),
+            updated_at=datetime.utcnow()
+        )
+        db.add(template)
+        db.commit()
+        db.refresh(template)
+
+        audit_log(
+            db=db,
+            agency_id=agency_id,
+            user_id=user_id,
+            action="supplier_template.create",
+            entity_type="supplier_template",
+            entity_id=template.id,
+            after_data={
+                "source_task_id": task.id,
+                "rules": len(rules["scalars"]) + len(rules["rows"]),
+                "skipped": rules["skipped"]
+            }
+        )
+        return template
+
+    @staticmethod
+    def list_templates(db: Session, agency_id: str) -> List[SupplierTemplate]:
+        return scoped_query(db, SupplierTemplate, agency_id).order_by(SupplierTemplate.created_at.desc()).all()
+
+    @staticmethod
+    def delete_template(db: Session, agency_id: str, user_id: str, template_id: str) -> bool:
+        template = scoped_query(db, SupplierTemplate, agency_id).filter(SupplierTemplate.id == template_id).first()
+        if not template:
+            return False
+        db.delete(template)
+        db.commit()
+        audit_log(
+            db=db,
+            agency_id=agency_id,
+            user_id=user_id,
+            action="supplier_template.delete",
+            entity_type="supplier_template",
+            entity_id=template_id,
+            before_data={"name": template.name}
+        )
+        return True
+
+    @staticmethod
+    def match(db: Session, agency_id: str, text: str) -> Optional[Dict[str, Any]]:
+        """Parse text with the agency's best matching template; None means use the LLM."""
+        if not settings.supplier_templates_enabled or not text or not text.strip():
+            return None
+        labels = layout_labels(text)
+        exact = fingerprint(labels)
+        try:
+            # Same layout: indexed fingerprint lookup, no scan
+            same_layout = (
+                scoped_query(db, SupplierTemplate, agency_id)
+                .filter(SupplierTemplate.fingerprint == exact)
+                .order_by(SupplierTemplate.hit_count.desc())
+                .all()
+            )
+            result = SupplierTemplateService._apply_first(db, text, [(1.0, t) for t in same_layout])
+            if result:
+                return result
+
+            # Near layout: compare labels of the most-used templates, loading full rows only for hits
+            candidates = (
+                scoped_query(db, SupplierTemplate, agency_id)
+                .filter(SupplierTemplate.fingerprint != exact)
+                .options(load_only(SupplierTemplate.id, SupplierTemplate.labels))
+                .order_by(SupplierTemplate.hit_count.desc())
+                .limit(settings.supplier_template_scan_limit)
+                .all()
+            )
+        except Exception as e:
+            logger.warning(f"Supplier template lookup failed: {str(e)}")
+            return None
+
+        ranked: List[Tuple[float, SupplierTemplate]] = sorted(
+            ((label_similarity(labels, t.labels or []), t) for t in candidates),
+            key=lambda pair: pair[0],
+            reverse=True
+        )
+        return SupplierTemplateService._apply_first(
+            db, text, [pair for pair in ranked if pair[0] >= settings.supplier_template_min_similarity]
+        )
+
+    @staticmethod
+    def _apply_first(db: Session, text: str, ranked: List[Tuple[float, SupplierTemplate]]) -> Optional[Dict[str, Any]]:
+        for score, template in ranked:
+            result = apply_template(template, text)
+            if result:
+                template.hit_count = (template.hit_count or 0) + 1
+                template.last_used_at = datetime.utcnow()
+                db.commit()
+                result["template_similarity"] = round(score, 3)
+                return result
+        return None
@@ -0,0 +1,44 @@
+from typing import Dict, Any, List, Optional
+from app.infra.db import ImportTask
+
+
+def merge_usage(usages: List[Optional[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Combine per-call usage of a split extraction (pages, chunks).
+    Token counts and calls add up; latency is the slowest call since parts run concurrently.
+    """
+    usages = [u for u in usages if u]
+
+    def total(key: str) -> Optional[int]:
+        values = [u[key] for u in usages if u.get(key) is not None]
+        return sum(values) if values else None
+
+    return {
+        "estimated_input_tokens": total("estimated_input_tokens"),
+        "prompt_tokens": total("prompt_tokens"),
+        "completion_tokens": total("completion_tokens"),
+        "llm_calls": total("llm_calls") or 0,
+        "latency_ms": max((u.get("latency_ms") or 0 for u in usages), default=None),
+        "route": _common(usages, "route"),
+        "model": _common(usages, "model")
+    }
+
+
+def _common(usages: List[Dict[str, Any]], key: str) -> Optional[str]:
+    """The value shared by every part, "mixed" when parts were routed differently."""
+    values = {u.get(key) for u in usages if u.get(key)}
+    if len(values) > 1:
+        return "mixed"
+    return values.pop() if values else None
+
+
+def record_usage(task: ImportTask, result: Dict[str, Any], extraction_ms: Optional[int] = None):
+    """Copy token counts from an extraction result onto the import task."""
+    usage = result.get("usage") or {}
+    task.input_tokens_estimated = usage.get("estimated_input_tokens")
+    task.prompt_tokens = usage.get("prompt_tokens")
+    task.completion_tokens = usage.get("completion_tokens")
+    task.llm_calls = usage.get("llm_calls")
+    task.extraction_ms = extraction_ms if extraction_ms is not None else usage.get("latency_ms")
+    task.llm_route = usage.get("route")
+    task.llm_model = usage.get("model")
@@ -1,15 +1,19 @@
 from sqlalchemy.orm import Session
-from app.infra.db import PricingFactor, SKU, scoped_query
+from app.infra.db import PricingFactor, SKU, SKUType, scoped_query
 from app.domain.skus.service import SKUService
 from app.domain.skus.schemas import SKUCreate
 from app.domain.skus.pricing_schemas import AvailabilityItem, AvailabilityResponse
 from app.infra.audit import audit_log
-from typing import Optional, List, Tuple
+from typing import Optional, List, Tuple, Dict, Any
 from decimal import Decimal
 from datetime import date, timedelta
 import uuid
 
 
+# SKU types sold per night/day (converter units 晚, 车/天, 天); everything else is per person/ticket
+PER_DAY_SKU_TYPES = {SKUType.HOTEL, SKUType.CAR, SKUType.GUIDE}
+
+
 class PricingService:
     @staticmethod
     def apply_factor_to_price(
@@ -25,10 +29,17 @@ class PricingService:
         agency_id: str,
         sku: SKU
     ) -> Optional[PricingFactor]:
-        factors = scoped_query(db, PricingFactor, agency_id).order_by(
+        return PricingService.match_factor(PricingService.load_factors(db, agency_id), sku)
+    
+    @staticmethod
+    def load_factors(db: Session, agency_id: str) -> List[PricingFactor]:
+        """All of an agency's factors, highest priority first (load once, match many SKUs)."""
+        return scoped_query(db, PricingFactor, agency_id).order_by(
             PricingFactor.priority.desc()
         ).all()
-        
+    
+    @staticmethod
+    def match_factor(factors: List[PricingFactor], sku: SKU) -> Optional[PricingFactor]:
         for factor in factors:
             if factor.valid_from and factor.valid_from > date.today():
                 continue
@@ -121,6 +132,51 @@ class PricingService:
             "factor_applied": factor_applied
         }
 
+    @staticmethod
+    def price_for_period(
+        sku: SKU,
+        start_date: date,
+        end_date: Optional[date] = None,
+        factor: Optional[PricingFactor] = None
+    ) -> Dict[str, Any]:
+        """
+        Price of one unit for a service period. Per-night/per-day SKUs (hotel, car, guide)
+        sum the daily prices over [start_date, end_date), e.g. a hotel stay of N nights.
+        Other types (itinerary, ticket, restaurant, activity) are priced per person/ticket,
+        once on start_date. Without an end date (or end <= start) a single day is priced.
+        """
+        if sku.sku_type in PER_DAY_SKU_TYPES and end_date:
+            days = max((end_date - start_date).days, 1)
+        else:
+            days = 1
+        total = Decimal("0")
+        sources = set()
+        for offset in range(days):
+            result = PricingService.resolve_price_for_date(sku, start_date + timedelta(days=offset), factor)
+            total += Decimal(str(result["final_price"]))
+            sources.add(result["price_source"])
+        return {
+            "unit_price": total.quantize(Decimal("0.01")),
+            "days": days,
+            "price_source": sources.pop() if len(sources) == 1 else "mixed",
+            "factor_applied": factor.id if factor else None
+        }
+
+    @staticmethod
+    def price_lines(
+        db: Session,
+        agency_id: str,
+        lines: List[Tuple[SKU, date, Optional[date]]],
+        factors: Optional[List[PricingFactor]] = None
+    ) -> List[Dict[str, Any]]:
+        """price_for_period for many (sku, start_date, end_date) lines with one factor query."""
+        if factors is None:
+            factors = PricingService.load_factors(db, agency_id)
+        return [
+            PricingService.price_for_period(sku, start, end, PricingService.match_factor(factors, sku))
+            for sku, start, end in lines
+        ]
+
     @staticmethod
     def build_availability(
         db: Session,
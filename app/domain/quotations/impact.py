@@ -0,0 +1,46 @@
+"""
+Change impact of SKU edits on open quotations.
+
+quotation_items.sku_id is indexed, so "which draft/published quotations use these SKUs"
+is one indexed lookup, and flagging them stale is a single UPDATE ... WHERE id IN
+(subquery) regardless of how many quotations are affected. Flags are cleared by
+QuotationService.reprice_quotation.
+"""
+from typing import List
+from datetime import datetime
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.infra.db import Quotation, QuotationItem
+
+OPEN_STATUSES = ("draft", "published")
+
+
+class QuotationImpactService:
+    @staticmethod
+    def _affected_ids(agency_id: str, sku_ids: List[str]):
+        return select(QuotationItem.quotation_id).join(
+            Quotation, Quotation.id == QuotationItem.quotation_id
+        ).where(
+            QuotationItem.sku_id.in_(sku_ids),
+            Quotation.agency_id == agency_id,
+            Quotation.status.in_(OPEN_STATUSES)
+        ).distinct()
+    
+    @staticmethod
+    def affected_quotation_ids(db: Session, agency_id: str, sku_ids: List[str]) -> List[str]:
+        if not sku_ids:
+            return []
+        return list(db.execute(QuotationImpactService._affected_ids(agency_id, sku_ids)).scalars())
+    
+    @staticmethod
+    def mark_stale(db: Session, agency_id: str, sku_ids: List[str]) -> int:
+        """Flag open quotations using any of these SKUs as stale; runs in the caller's transaction."""
+        if not sku_ids:
+            return 0
+        return db.query(Quotation).filter(
+            Quotation.id.in_(QuotationImpactService._affected_ids(agency_id, sku_ids)),
+            Quotation.price_stale.isnot(True)
+        ).update(
+            {Quotation.price_stale: True, Quotation.stale_since: datetime.utcnow()},
+            synchronize_session=False
+        )
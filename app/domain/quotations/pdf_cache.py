@@ -0,0 +1,132 @@
+"""
+Rendered quotation PDFs cached in storage at /quotation_pdfs/{quotation_id}/{version}.pdf.
+
+The version hashes the quotation's updated_at together with every item's pricing and
+snapshot, so any change produces a new key. invalidate() removes older renders.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import hashlib
+import json
+import logging
+from app.config import get_settings
+from app.infra.db import Quotation, QuotationItem
+from app.infra.storage import StorageClient
+from app.domain.quotations import pdf_renderer
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+PDF_FOLDER = "quotation_pdfs"
+# Bump when the PDF layout or fonts change so existing renders are not served again
+PDF_LAYOUT_VERSION = "2"
+
+
+def pdf_version(quotation: Quotation, items: List[QuotationItem]) -> str:
+    digest = hashlib.sha256(PDF_LAYOUT_VERSION.encode())
+    digest.update((quotation.updated_at.isoformat() if quotation.updated_at else "").encode())
+    for item in items:
+        digest.update(json.dumps(
+            [item.id, item.sku_id, item.quantity, item.unit_price, item.subtotal, item.sort_order, item.snapshot],
+            sort_keys=True, ensure_ascii=False, default=str
+        ).encode())
+    return digest.hexdigest()[:20]
+
+
+def pdf_input(quotation: Quotation, items: List[QuotationItem]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Plain dicts for QuotationPDFGenerator.generate."""
+    quotation_dict = {
+        'id': quotation.id,
+        'title': quotation.title,
+        'customer_name': quotation.customer_name,
+        'customer_contact': quotation.customer_contact,
+        'total_amount': quotation.total_amount,
+        'discount_amount': quotation.discount_amount,
+        'final_amount': quotation.final_amount,
+        'notes': quotation.notes
+    }
+    items_list = [
+        {
+            'snapshot': item.snapshot,
+            'quantity': item.quantity,
+            'unit_price': item.unit_price,
+            'subtotal': item.subtotal
+        }
+        for item in items
+    ]
+    return quotation_dict, items_list
+
+
+def _path(quotation_id: str, version: str) -> str:
+    return f"/{PDF_FOLDER}/{quotation_id}/{version}.pdf"
+
+
+def get_cached_pdf(quotation_id: str, version: str) -> Optional[bytes]:
+    if not settings.quotation_pdf_cache_enabled:
+        return None
+    try:
+        return StorageClient().read_bytes(_path(quotation_id, version))
+    except (OSError, ValueError) as e:
+        logger.warning(f"Failed to read cached PDF for {quotation_id}: {str(e)}")
+        return None
+
+
+def store_pdf(quotation_id: str, version: str, data: bytes):
+    if not settings.quotation_pdf_cache_enabled:
+        return
+    try:
+        StorageClient().write_bytes(_path(quotation_id, version), data)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Failed to cache PDF for {quotation_id}: {str(e)}")
+
+
+def render_pdf(quotation: Quotation, items: List[QuotationItem], version: str) -> bytes:
+    """Cached PDF for this version, rendering and storing it on a miss."""
+    data = get_cached_pdf(quotation.id, version)
+    if data is not None:
+        return data
+
+    quotation_dict, items_list = pdf_input(quotation, items)
+    data = pdf_renderer.render(quotation_dict, items_list)
+    store_pdf(quotation.id, version, data)
+    return data
+
+
+def export_zip(quotations: List[Tuple[Quotation, List[QuotationItem]]]) -> Iterator[bytes]:
+    """
+    Zip stream with one PDF per quotation. Cached renders are reused, the rest render in
+    parallel; failures are listed in errors.txt. ORM objects are read eagerly here so the
+    stream does not need the DB session.
+    """
+    jobs = []
+    for quotation, items in quotations:
+        quotation_dict, items_list = pdf_input(quotation, items)
+        jobs.append(((quotation.id, pdf_version(quotation, items)), quotation_dict, items_list))
+
+    def files() -> Iterator[Tuple[str, bytes]]:
+        to_render = []
+        for (quotation_id, version), quotation_dict, items_list in jobs:
+            data = get_cached_pdf(quotation_id, version)
+            if data is None:
+                to_render.append(((quotation_id, version), quotation_dict, items_list))
+            else:
+                yield f"quotation_{quotation_id}.pdf", data
+
+        errors = []
+        for (quotation_id, version), data, error in pdf_renderer.render_many(to_render):
+            if data is None:
+                errors.append(f"{quotation_id}: {error}")
+                continue
+            store_pdf(quotation_id, version, data)
+            yield f"quotation_{quotation_id}.pdf", data
+        if errors:
+            yield "errors.txt", "\n".join(errors).encode("utf-8")
+
+    return pdf_renderer.iter_zip(files())
+
+
+def invalidate(quotation_id: str):
+    """Drop every cached render of a quotation (call after changing it or its items)."""
+    try:
+        StorageClient().delete_folder(f"/{PDF_FOLDER}/{quotation_id}")
+    except (OSError, ValueError) as e:
+        logger.warning(f"Failed to invalidate cached PDFs for {quotation_id}: {str(e)}")
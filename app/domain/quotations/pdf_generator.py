@@ -5,24 +5,115 @@ from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph,
 from reportlab.lib import colors
 from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfbase.cidfonts import UnicodeCIDFont
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 from io import BytesIO
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Tuple
 from datetime import datetime
+from functools import lru_cache
+import logging
 import os
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# TrueType CJK fonts in common system locations (CFF-based .otf such as Noto Sans CJK is not supported by ReportLab)
+CJK_FONT_CANDIDATES = [
+    "/usr/share/fonts/truetype/wqy/wqy-microhei.ttc",
+    "/usr/share/fonts/truetype/wqy/wqy-zenhei.ttc",
+    "/usr/share/fonts/truetype/arphic/uming.ttc",
+    "/usr/share/fonts/wqy-microhei/wqy-microhei.ttc",
+    "/System/Library/Fonts/STHeiti Light.ttc",
+    "C:/Windows/Fonts/msyh.ttc",
+    "C:/Windows/Fonts/simsun.ttc"
+]
+CID_FALLBACK_FONT = "STSong-Light"
+
+
+@lru_cache(maxsize=1)
+def register_fonts() -> Tuple[str, str]:
+    """
+    (regular, bold) font names, registered once per process.
+    
+    A configured (PDF_CJK_FONT_PATH) or discovered TrueType font is embedded as a
+    subset holding only the glyphs each document uses, so PDFs stay small even though
+    the font file is 10-20 MB. Without one we fall back to ReportLab's built-in
+    STSong-Light CID font, which is not embedded at all and relies on the viewer.
+    """
+    paths = [settings.pdf_cjk_font_path] if settings.pdf_cjk_font_path else CJK_FONT_CANDIDATES
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        try:
+            pdfmetrics.registerFont(TTFont("CJK", path, subfontIndex=settings.pdf_cjk_font_index))
+            return "CJK", "CJK"
+        except Exception as e:
+            logger.warning(f"Cannot use CJK font {path}: {str(e)}")
+    
+    if settings.pdf_cjk_font_path:
+        logger.warning(f"PDF_CJK_FONT_PATH not usable, falling back to {CID_FALLBACK_FONT}")
+    pdfmetrics.registerFont(UnicodeCIDFont(CID_FALLBACK_FONT))
+    return CID_FALLBACK_FONT, CID_FALLBACK_FONT
+
+
+@lru_cache(maxsize=1)
+def _styles() -> Dict[str, ParagraphStyle]:
+    """Paragraph styles never change between documents, so build them once per process."""
+    base = getSampleStyleSheet()
+    regular_font, bold_font = register_fonts()
+
+    # Custom styles
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=base['Heading1'],
+        fontSize=24,
+        textColor=colors.HexColor('#1e40af'),
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        fontName=bold_font
+    )
+
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=base['Heading2'],
+        fontSize=14,
+        textColor=colors.HexColor('#334155'),
+        spaceAfter=12,
+        spaceBefore=12,
+        fontName=bold_font
+    )
+
+    normal_style = ParagraphStyle(
+        'CustomNormal',
+        parent=base['Normal'],
+        fontSize=10,
+        textColor=colors.HexColor('#475569'),
+        fontName=regular_font
+    )
+
+    footer_style = ParagraphStyle(
+        'Footer',
+        parent=base['Normal'],
+        fontSize=9,
+        textColor=colors.HexColor('#94a3b8'),
+        alignment=TA_CENTER,
+        fontName=regular_font
+    )
+    
+    return {
+        'title': title_style,
+        'heading': heading_style,
+        'normal': normal_style,
+        'footer': footer_style
+    }
 
 
 class QuotationPDFGenerator:
     """Generate PDF quotations with Chinese support"""
     
     def __init__(self):
-        # Try to register Chinese fonts (optional, fallback to default if not available)
-        try:
-            # You may need to provide actual font files
-            # pdfmetrics.registerFont(TTFont('SimSun', 'simsun.ttc'))
-            pass
-        except:
-            pass
+        self.regular_font, self.bold_font = register_fonts()
     
     def generate(
         self,
@@ -52,35 +143,10 @@ class QuotationPDFGenerator:
         )
         
         story = []
-        styles = getSampleStyleSheet()
-        
-        # Custom styles
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#1e40af'),
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold'
-        )
-        
-        heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=styles['Heading2'],
-            fontSize=14,
-            textColor=colors.HexColor('#334155'),
-            spaceAfter=12,
-            spaceBefore=12,
-            fontName='Helvetica-Bold'
-        )
-        
-        normal_style = ParagraphStyle(
-            'CustomNormal',
-            parent=styles['Normal'],
-            fontSize=10,
-            textColor=colors.HexColor('#475569')
-        )
+        styles = _styles()
+        title_style = styles['title']
+        heading_style = styles['heading']
+        normal_style = styles['normal']
         
         # Title
         story.append(Paragraph("旅游产品报价单", title_style))
@@ -97,7 +163,7 @@ class QuotationPDFGenerator:
         
         header_table = Table(header_data, colWidths=[4*cm, 12*cm])
         header_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTNAME', (0, 0), (-1, -1), self.regular_font),
             ('FONTSIZE', (0, 0), (-1, -1), 10),
             ('TEXTCOLOR', (0, 0), (0, -1), colors.HexColor('#64748b')),
             ('TEXTCOLOR', (1, 0), (1, -1), colors.HexColor('#0f172a')),
@@ -130,9 +196,9 @@ class QuotationPDFGenerator:
         
         items_table = Table(items_data, colWidths=[1.5*cm, 7*cm, 2*cm, 2*cm, 3*cm, 3*cm])
         items_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 0), (-1, 0), self.bold_font),
             ('FONTSIZE', (0, 0), (-1, 0), 11),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
+            ('FONTNAME', (0, 1), (-1, -1), self.regular_font),
             ('FONTSIZE', (0, 1), (-1, -1), 9),
             ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#f1f5f9')),
             ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor('#0f172a')),
@@ -160,7 +226,7 @@ class QuotationPDFGenerator:
         
         summary_table = Table(summary_data, colWidths=[14*cm, 4*cm])
         summary_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica-Bold'),
+            ('FONTNAME', (0, 0), (-1, -1), self.bold_font),
             ('FONTSIZE', (0, 0), (-1, -2), 11),
             ('FONTSIZE', (0, -1), (-1, -1), 14),
             ('TEXTCOLOR', (0, 0), (-1, -2), colors.HexColor('#475569')),
@@ -183,13 +249,7 @@ class QuotationPDFGenerator:
         
         # Footer
         story.append(Spacer(1, 1*cm))
-        footer_style = ParagraphStyle(
-            'Footer',
-            parent=styles['Normal'],
-            fontSize=9,
-            textColor=colors.HexColor('#94a3b8'),
-            alignment=TA_CENTER
-        )
+        footer_style = styles['footer']
         
         story.append(Paragraph(f"本报价单由 {agency_name} 提供", footer_style))
         story.append(Paragraph("感谢您的信任与支持！", footer_style))
@@ -199,3 +259,8 @@ class QuotationPDFGenerator:
         buffer.seek(0)
         
         return buffer
+
+
+def render_pdf_bytes(quotation: Dict[str, Any], items: List[Dict[str, Any]]) -> bytes:
+    """Module-level entry point so the render can run in a worker process."""
+    return QuotationPDFGenerator().generate(quotation, items).getvalue()
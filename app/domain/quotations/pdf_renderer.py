@@ -0,0 +1,141 @@
+"""
+Quotation PDF rendering off the request worker.
+
+ReportLab is pure-Python and CPU-bound, so renders run in a small process pool
+(PDF_RENDER_PROCESSES) instead of holding the GIL in the API process. At most
+PDF_RENDER_QUEUE_SIZE renders are queued or running at once; a single export that
+cannot get a slot within PDF_RENDER_QUEUE_TIMEOUT gets PDFRenderBusyError (503),
+while bulk exports wait for slots and are capped at PDF_BULK_CONCURRENCY.
+"""
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import logging
+import multiprocessing
+import threading
+import zipfile
+from app.config import get_settings
+from app.domain.quotations.pdf_generator import register_fonts, render_pdf_bytes
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_slots = threading.BoundedSemaphore(max(1, settings.pdf_render_queue_size))
+
+
+class PDFRenderBusyError(Exception):
+    """Render queue is full; retry_after is a hint for the Retry-After header."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _get_pool() -> Optional[ProcessPoolExecutor]:
+    """Shared process pool (lazy); None renders in-process (PDF_RENDER_PROCESSES=0)."""
+    global _pool
+    if settings.pdf_render_processes <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # spawn: forking a threaded server process is not safe
+                _pool = ProcessPoolExecutor(
+                    max_workers=settings.pdf_render_processes,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    # Load fonts when a worker starts, not on its first render
+                    initializer=register_fonts
+                )
+    return _pool
+
+
+def _submit(quotation: Dict[str, Any], items: List[Dict[str, Any]]) -> Future:
+    """Start a render in a slot that is already held; the slot is released when it finishes."""
+    try:
+        pool = _get_pool()
+        if pool is None:
+            future: Future = Future()
+            try:
+                future.set_result(render_pdf_bytes(quotation, items))
+            except Exception as e:
+                future.set_exception(e)
+        else:
+            future = pool.submit(render_pdf_bytes, quotation, items)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda _: _slots.release())
+    return future
+
+
+def render(quotation: Dict[str, Any], items: List[Dict[str, Any]]) -> bytes:
+    """Render one PDF; raises PDFRenderBusyError if the queue stays full."""
+    if not _slots.acquire(timeout=settings.pdf_render_queue_timeout):
+        raise PDFRenderBusyError("PDF render queue is full", retry_after=settings.pdf_render_queue_timeout or 1)
+    return _submit(quotation, items).result(timeout=settings.pdf_render_timeout)
+
+
+def render_many(jobs: List[Tuple[Any, Dict[str, Any], List[Dict[str, Any]]]]) -> Iterator[Tuple[Any, Optional[bytes], Optional[str]]]:
+    """
+    Render (key, quotation, items) jobs in parallel, yielding (key, pdf, error) in input order.
+    At most PDF_BULK_CONCURRENCY renders are in flight, so a bulk export leaves queue
+    slots for interactive downloads.
+    """
+    window = max(1, settings.pdf_bulk_concurrency)
+    pending: List[Tuple[Any, Future]] = []
+    jobs_iter = iter(jobs)
+
+    def fill():
+        while len(pending) < window:
+            job = next(jobs_iter, None)
+            if job is None:
+                return
+            key, quotation, items = job
+            _slots.acquire()
+            pending.append((key, _submit(quotation, items)))
+
+    fill()
+    while pending:
+        key, future = pending.pop(0)
+        try:
+            yield key, future.result(timeout=settings.pdf_render_timeout), None
+        except Exception as e:
+            logger.warning(f"Bulk PDF render failed for {key}: {str(e)}")
+            yield key, None, str(e) or type(e).__name__
+        fill()
+
+
+class _ZipSink:
+    """Write-only file object: zipfile appends to it and we hand the bytes to the response."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._offset = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_zip(files: Iterator[Tuple[str, bytes]]) -> Iterator[bytes]:
+    """Stream a zip archive of (name, data) as each file becomes available."""
+    sink = _ZipSink()
+    # PDFs are already compressed; storing them keeps the zip step cheap
+    with zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        for name, data in files:
+            archive.writestr(name, data)
+            yield sink.drain()
+    yield sink.drain()
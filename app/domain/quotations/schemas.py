@@ -1,15 +1,26 @@
-from pydantic import BaseModel, field_serializer
+from pydantic import BaseModel, Field, field_serializer, model_validator
 from typing import Optional, List, Dict, Any
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 
 
 class QuotationItemCreate(BaseModel):
     sku_id: str
     quantity: int = 1
+    # Service period [service_date, service_end_date), e.g. check-in/check-out; dated lines use calendar/rule/factor pricing
+    service_date: Optional[date] = None
+    service_end_date: Optional[date] = None
     custom_title: Optional[str] = None
     custom_description: Optional[str] = None
     custom_notes: Optional[str] = None
+    
+    @model_validator(mode='after')
+    def check_service_dates(self):
+        if self.service_end_date and not self.service_date:
+            raise ValueError("service_end_date requires service_date")
+        if self.service_end_date and self.service_end_date < self.service_date:
+            raise ValueError("service_end_date must not be before service_date")
+        return self
 
 
 class QuotationCreate(BaseModel):
@@ -20,6 +31,30 @@ class QuotationCreate(BaseModel):
     notes: Optional[str] = None
 
 
+class QuotationTemplateCustomer(BaseModel):
+    customer_name: str
+    customer_contact: Optional[str] = None
+    # Per-customer overrides of the template
+    title: Optional[str] = None
+    notes: Optional[str] = None
+    discount_amount: Optional[Decimal] = None
+
+
+class QuotationTemplateBulkCreate(BaseModel):
+    title: str
+    items: List[QuotationItemCreate] = Field(min_length=1)
+    notes: Optional[str] = None
+    customers: List[QuotationTemplateCustomer] = Field(min_length=1, max_length=200)
+    publish: bool = True
+
+
+class QuotationTemplateBulkResult(BaseModel):
+    customer_name: Optional[str]
+    quotation_id: str
+    share_token: Optional[str]
+    published_url: Optional[str]
+
+
 class QuotationItemResponse(BaseModel):
     id: str
     quotation_id: str
@@ -28,6 +63,9 @@ class QuotationItemResponse(BaseModel):
     quantity: int
     unit_price: Optional[Decimal]
     subtotal: Optional[Decimal]
+    service_date: Optional[date] = None
+    service_end_date: Optional[date] = None
+    price_source: Optional[str] = None
     custom_title: Optional[str]
     custom_description: Optional[str]
     custom_notes: Optional[str]
@@ -55,6 +93,8 @@ class QuotationResponse(BaseModel):
     published_at: Optional[datetime]
     published_url: Optional[str]
     share_token: Optional[str]
+    price_stale: Optional[bool] = None
+    stale_since: Optional[datetime] = None
     created_at: datetime
     updated_at: datetime
     
@@ -66,6 +106,22 @@ class QuotationResponse(BaseModel):
         from_attributes = True
 
 
+class QuotationRepriceResult(BaseModel):
+    quotation_id: str
+    repriced: int
+    unchanged: int
+    missing_sku_ids: List[str]
+    total_amount: float
+    final_amount: float
+
+
+class QuotationListItem(QuotationResponse):
+    item_count: int = 0
+    categories: List[str] = []
+    thumbnail_url: Optional[str] = None
+    last_modified: Optional[datetime] = None
+
+
 class QuotationUpdate(BaseModel):
     title: Optional[str] = None
     customer_name: Optional[str] = None
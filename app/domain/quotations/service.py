@@ -1,16 +1,153 @@
-from sqlalchemy.orm import Session
-from app.infra.db import Quotation, QuotationItem, scoped_query, SKU
-from app.domain.quotations.schemas import QuotationCreate, QuotationUpdate, QuotationItemCreate
+from sqlalchemy import insert, select, func, distinct
+from sqlalchemy.orm import Session, defer
+from app.infra.db import Quotation, QuotationItem, PricingFactor, scoped_query, SKU
+from app.domain.quotations.schemas import QuotationCreate, QuotationUpdate, QuotationItemCreate, QuotationTemplateBulkCreate
 from app.domain.quotations.converters import SKUToQuoteItemConverter
-from app.infra.audit import audit_log
-from typing import Optional, List
+from app.infra.audit import audit_log, audit_log_many
+from app.domain.quotations import pdf_cache, share, snapshots as snapshot_store
+from app.domain.pricing.service import PricingService
+from typing import Optional, List, Dict, Tuple, Any
+import hashlib
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 import secrets
 
 
+class MissingSKUError(ValueError):
+    """Quotation items reference SKUs that do not exist (or belong to another agency)."""
+    
+    def __init__(self, sku_ids: List[str]):
+        super().__init__(f"SKUs not found: {', '.join(sku_ids)}")
+        self.sku_ids = sku_ids
+
+
 class QuotationService:
+    @staticmethod
+    def _thumbnail(snapshot: Dict[str, Any]) -> Optional[str]:
+        for media in snapshot.get("media") or []:
+            if isinstance(media, dict) and (media.get("thumbnail_url") or media.get("url")):
+                return media.get("thumbnail_url") or media.get("url")
+        return None
+    
+    @staticmethod
+    def _price_basis(
+        sku: SKU,
+        factor: Optional[PricingFactor],
+        service_date: Optional[date],
+        service_end_date: Optional[date]
+    ) -> str:
+        """Fingerprint of a line's pricing inputs; while it is unchanged the stored price is still valid."""
+        parts = [
+            sku.id,
+            sku.updated_at.isoformat() if sku.updated_at else "",
+            service_date.isoformat() if service_date else "",
+            service_end_date.isoformat() if service_end_date else ""
+        ]
+        if factor:
+            parts += [factor.id, factor.updated_at.isoformat() if factor.updated_at else ""]
+        return hashlib.sha256("|".join(parts).encode("utf-8")).hexdigest()[:20]
+    
+    @staticmethod
+    def _price_items(
+        db: Session,
+        agency_id: str,
+        lines: List[Tuple[SKU, Optional[date], Optional[date], Dict[str, Any]]]
+    ) -> List[Dict[str, Any]]:
+        """
+        unit_price / price_source / price_basis for (sku, service_date, service_end_date, snapshot) lines.
+        Dated lines are priced in one batch by the pricing engine (calendar, rules, factors);
+        undated lines keep the static price from the SKU snapshot.
+        """
+        factors = PricingService.load_factors(db, agency_id)
+        dated = [index for index, line in enumerate(lines) if line[1]]
+        engine_prices = dict(zip(dated, PricingService.price_lines(
+            db, agency_id, [lines[index][:3] for index in dated], factors
+        )))
+        factors_by_id = {factor.id: factor for factor in factors}
+        
+        results = []
+        for index, (sku, service_date, service_end_date, snapshot) in enumerate(lines):
+            if index in engine_prices:
+                priced = engine_prices[index]
+                unit_price = priced["unit_price"]
+                price_source = priced["price_source"]
+                factor = factors_by_id.get(priced["factor_applied"])
+            else:
+                unit_price = Decimal(str(snapshot.get("unit_price") or 0))
+                price_source = "static"
+                factor = None
+            results.append({
+                "unit_price": unit_price,
+                "price_source": price_source,
+                "price_basis": QuotationService._price_basis(sku, factor, service_date, service_end_date)
+            })
+        return results
+    
+    @staticmethod
+    def _build_item_rows(
+        db: Session,
+        agency_id: str,
+        items: List[QuotationItemCreate]
+    ) -> Tuple[List[Dict[str, Any]], Decimal]:
+        """
+        Item rows (without id/quotation_id) and their total for a list of lines.
+        SKUs are loaded with one IN query, snapshots stored once and dated lines priced in
+        one batch; raises MissingSKUError if any SKU is unknown.
+        """
+        sku_ids = list(dict.fromkeys(item.sku_id for item in items))
+        skus = {
+            sku.id: sku
+            for sku in scoped_query(db, SKU, agency_id).filter(SKU.id.in_(sku_ids))
+        } if sku_ids else {}
+        missing = [sku_id for sku_id in sku_ids if sku_id not in skus]
+        if missing:
+            raise MissingSKUError(missing)
+        
+        total_amount = Decimal(0)
+        snapshots = {sku_id: SKUToQuoteItemConverter.convert(sku) for sku_id, sku in skus.items()}
+        snapshot_hashes = dict(zip(snapshots, snapshot_store.store_snapshots(db, snapshots.values())))
+        prices = QuotationService._price_items(db, agency_id, [
+            (skus[item.sku_id], item.service_date, item.service_end_date, snapshots[item.sku_id])
+            for item in items
+        ])
+        now = datetime.utcnow()
+        rows = []
+        
+        for idx, (item_data, price) in enumerate(zip(items, prices)):
+            unit_price = price["unit_price"]
+            quantity = item_data.quantity
+            subtotal = unit_price * quantity
+            
+            rows.append({
+                "sku_id": item_data.sku_id,
+                "category": skus[item_data.sku_id].category,
+                "thumbnail_url": QuotationService._thumbnail(snapshots[item_data.sku_id]),
+                "snapshot_hash": snapshot_hashes[item_data.sku_id],
+                "quantity": quantity,
+                "unit_price": unit_price,
+                "subtotal": subtotal,
+                "service_date": item_data.service_date,
+                "service_end_date": item_data.service_end_date,
+                "price_source": price["price_source"],
+                "price_basis": price["price_basis"],
+                "custom_title": item_data.custom_title,
+                "custom_description": item_data.custom_description,
+                "custom_notes": item_data.custom_notes,
+                "sort_order": idx,
+                "created_at": now
+            })
+            total_amount += subtotal
+        
+        return rows, total_amount
+    
+    @staticmethod
+    def _new_item_rows(quotation_id: str, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        return [
+            {**row, "id": f"QITEM-{uuid.uuid4().hex[:12].upper()}", "quotation_id": quotation_id}
+            for row in rows
+        ]
+    
     @staticmethod
     def create_quotation(
         db: Session,
@@ -18,6 +155,9 @@ class QuotationService:
         user_id: str,
         quotation_data: QuotationCreate
     ) -> Quotation:
+        """Create a quotation with all its items; raises MissingSKUError if any SKU is unknown."""
+        rows, total_amount = QuotationService._build_item_rows(db, agency_id, quotation_data.items)
+        
         quotation_id = f"QUOTE-{uuid.uuid4().hex[:12].upper()}"
         
         quotation = Quotation(
@@ -28,6 +168,9 @@ class QuotationService:
             customer_name=quotation_data.customer_name,
             customer_contact=quotation_data.customer_contact,
             notes=quotation_data.notes,
+            total_amount=total_amount,
+            discount_amount=Decimal(0),
+            final_amount=total_amount,
             status="draft",
             created_at=datetime.utcnow(),
             updated_at=datetime.utcnow()
@@ -36,40 +179,9 @@ class QuotationService:
         db.add(quotation)
         db.flush()
         
-        total_amount = Decimal(0)
-        
-        for idx, item_data in enumerate(quotation_data.items):
-            sku = scoped_query(db, SKU, agency_id).filter(SKU.id == item_data.sku_id).first()
-            if not sku:
-                continue
-            
-            snapshot = SKUToQuoteItemConverter.convert(sku)
-            
-            unit_price = Decimal(str(snapshot.get("unit_price", 0)))
-            quantity = item_data.quantity
-            subtotal = unit_price * quantity
-            
-            item = QuotationItem(
-                id=f"QITEM-{uuid.uuid4().hex[:12].upper()}",
-                quotation_id=quotation.id,
-                sku_id=sku.id,
-                snapshot=snapshot,
-                quantity=quantity,
-                unit_price=unit_price,
-                subtotal=subtotal,
-                custom_title=item_data.custom_title,
-                custom_description=item_data.custom_description,
-                custom_notes=item_data.custom_notes,
-                sort_order=idx,
-                created_at=datetime.utcnow()
-            )
-            
-            db.add(item)
-            total_amount += subtotal
-        
-        quotation.total_amount = total_amount
-        quotation.discount_amount = Decimal(0)
-        quotation.final_amount = total_amount
+        # Single executemany INSERT for all lines
+        if rows:
+            db.execute(insert(QuotationItem), QuotationService._new_item_rows(quotation.id, rows))
         
         db.commit()
         db.refresh(quotation)
@@ -86,15 +198,99 @@ class QuotationService:
         
         return quotation
     
+    @staticmethod
+    def create_from_template(
+        db: Session,
+        agency_id: str,
+        user_id: str,
+        template_data: QuotationTemplateBulkCreate
+    ) -> List[Dict[str, Any]]:
+        """
+        One quotation per customer from a shared item list, in a single transaction.
+        SKUs, snapshots and prices are resolved once; quotations and all their items are
+        written with one bulk insert each. Published quotations get share tokens and payloads.
+        Returns customer_name / quotation_id / share_token / published_url per customer.
+        """
+        rows, total_amount = QuotationService._build_item_rows(db, agency_id, template_data.items)
+        now = datetime.utcnow()
+        
+        quotations = []
+        item_rows = []
+        for customer in template_data.customers:
+            discount = customer.discount_amount or Decimal(0)
+            quotation = Quotation(
+                id=f"QUOTE-{uuid.uuid4().hex[:12].upper()}",
+                agency_id=agency_id,
+                user_id=user_id,
+                title=customer.title or template_data.title,
+                customer_name=customer.customer_name,
+                customer_contact=customer.customer_contact,
+                notes=customer.notes if customer.notes is not None else template_data.notes,
+                total_amount=total_amount,
+                discount_amount=discount,
+                final_amount=total_amount - discount,
+                status="draft",
+                created_at=now,
+                updated_at=now
+            )
+            if template_data.publish:
+                quotation.share_token = secrets.token_urlsafe(18)
+                quotation.status = "published"
+                quotation.published_at = now
+                quotation.published_url = f"/share/quotations/{quotation.share_token}"
+            quotations.append(quotation)
+            item_rows.extend(QuotationService._new_item_rows(quotation.id, rows))
+        
+        db.add_all(quotations)
+        db.flush()
+        if item_rows:
+            db.execute(insert(QuotationItem), item_rows)
+        
+        if template_data.publish:
+            items_by_quotation: Dict[str, List[QuotationItem]] = {q.id: [] for q in quotations}
+            items = db.query(QuotationItem).filter(
+                QuotationItem.quotation_id.in_(list(items_by_quotation))
+            ).order_by(QuotationItem.quotation_id, QuotationItem.sort_order).all()
+            for item in snapshot_store.attach_snapshots(db, items):
+                items_by_quotation[item.quotation_id].append(item)
+            for quotation in quotations:
+                share.store_payload(quotation, items_by_quotation[quotation.id])
+        
+        # Read everything needed before commit expires the objects (avoids a refresh per quotation)
+        results = [
+            {
+                "customer_name": quotation.customer_name,
+                "quotation_id": quotation.id,
+                "share_token": quotation.share_token,
+                "published_url": quotation.published_url
+            }
+            for quotation in quotations
+        ]
+        audit_entries = [
+            {
+                "action": "quotation.create",
+                "entity_type": "quotation",
+                "entity_id": quotation.id,
+                "after_data": {"title": quotation.title, "total_amount": float(total_amount), "template": True}
+            }
+            for quotation in quotations
+        ]
+        
+        db.commit()
+        audit_log_many(db, agency_id, user_id, audit_entries)
+        
+        return results
+    
     @staticmethod
     def get_quotation(db: Session, agency_id: str, quotation_id: str) -> Optional[Quotation]:
         return scoped_query(db, Quotation, agency_id).filter(Quotation.id == quotation_id).first()
     
     @staticmethod
     def get_quotation_items(db: Session, quotation_id: str) -> List[QuotationItem]:
-        return db.query(QuotationItem).filter(
+        items = db.query(QuotationItem).filter(
             QuotationItem.quotation_id == quotation_id
         ).order_by(QuotationItem.sort_order).all()
+        return snapshot_store.attach_snapshots(db, items)
     
     @staticmethod
     def update_quotation(
@@ -118,8 +314,14 @@ class QuotationService:
         
         quotation.updated_at = datetime.utcnow()
         
+        if quotation.status == "published":
+            share.store_payload(quotation, QuotationService.get_quotation_items(db, quotation.id))
+        
         db.commit()
         db.refresh(quotation)
+        pdf_cache.invalidate(quotation.id)
+        if quotation.status == "published":
+            share.invalidate(quotation.share_token)
         
         audit_log(
             db=db,
@@ -133,6 +335,95 @@ class QuotationService:
         
         return quotation
     
+    @staticmethod
+    def reprice_quotation(
+        db: Session,
+        agency_id: str,
+        user_id: str,
+        quotation_id: str,
+        force: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Re-price a quotation against current SKU prices. Only lines whose SKU, pricing
+        factor or service dates changed since they were priced are recomputed (all lines
+        with force=True). Lines whose SKU no longer exists keep their price.
+        """
+        quotation = scoped_query(db, Quotation, agency_id).filter(Quotation.id == quotation_id).first()
+        if not quotation:
+            return None
+        
+        items = db.query(QuotationItem).filter(
+            QuotationItem.quotation_id == quotation_id
+        ).order_by(QuotationItem.sort_order).all()
+        sku_ids = list({item.sku_id for item in items})
+        skus = {
+            sku.id: sku
+            for sku in scoped_query(db, SKU, agency_id).filter(SKU.id.in_(sku_ids))
+        } if sku_ids else {}
+        factors = PricingService.load_factors(db, agency_id)
+        
+        changed = []
+        missing = []
+        published_token = None
+        for item in items:
+            sku = skus.get(item.sku_id)
+            if not sku:
+                missing.append(item.sku_id)
+                continue
+            factor = PricingService.match_factor(factors, sku) if item.service_date else None
+            basis = QuotationService._price_basis(sku, factor, item.service_date, item.service_end_date)
+            if force or basis != item.price_basis:
+                changed.append((item, sku))
+        
+        if changed:
+            static_prices = {
+                sku.id: SKUToQuoteItemConverter.convert(sku)
+                for sku in {sku.id: sku for _, sku in changed}.values()
+            }
+            prices = QuotationService._price_items(db, agency_id, [
+                (sku, item.service_date, item.service_end_date, static_prices[sku.id])
+                for item, sku in changed
+            ])
+            for (item, _), price in zip(changed, prices):
+                item.unit_price = price["unit_price"]
+                item.subtotal = price["unit_price"] * (item.quantity or 1)
+                item.price_source = price["price_source"]
+                item.price_basis = price["price_basis"]
+            
+            quotation.total_amount = sum((item.subtotal or Decimal(0) for item in items), Decimal(0))
+            quotation.final_amount = quotation.total_amount - (quotation.discount_amount or Decimal(0))
+            quotation.updated_at = datetime.utcnow()
+            if quotation.status == "published":
+                share.store_payload(quotation, snapshot_store.attach_snapshots(db, items))
+                published_token = quotation.share_token
+        
+        # Prices are current again
+        quotation.price_stale = False
+        quotation.stale_since = None
+        db.commit()
+        
+        if changed:
+            pdf_cache.invalidate(quotation.id)
+            share.invalidate(published_token)
+            audit_log(
+                db=db,
+                agency_id=agency_id,
+                user_id=user_id,
+                action="quotation.reprice",
+                entity_type="quotation",
+                entity_id=quotation.id,
+                after_data={"repriced": len(changed), "total_amount": float(quotation.total_amount)}
+            )
+        
+        return {
+            "quotation_id": quotation.id,
+            "repriced": len(changed),
+            "unchanged": len(items) - len(changed) - len(missing),
+            "missing_sku_ids": sorted(set(missing)),
+            "total_amount": float(quotation.total_amount or 0),
+            "final_amount": float(quotation.final_amount or 0)
+        }
+    
     @staticmethod
     def publish_quotation(
         db: Session,
@@ -149,8 +440,11 @@ class QuotationService:
         quotation.status = "published"
         quotation.published_at = datetime.utcnow()
         quotation.published_url = f"/share/quotations/{quotation.share_token}"
+        share.store_payload(quotation, QuotationService.get_quotation_items(db, quotation.id))
+        share_token = quotation.share_token
         
         db.commit()
+        share.invalidate(share_token)
         
         audit_log(
             db=db,
@@ -171,12 +465,71 @@ class QuotationService:
         status: Optional[str] = None,
         skip: int = 0,
         limit: int = 50
-    ) -> List[Quotation]:
-        query = scoped_query(db, Quotation, agency_id)
+    ) -> List[Tuple[Quotation, Dict[str, Any]]]:
+        """
+        Quotations with item aggregates (item count, categories, first thumbnail, last
+        modified) computed in one grouped query, so list views need no per-row item calls.
+        """
+        if db.bind.dialect.name == "postgresql":
+            categories = func.string_agg(distinct(QuotationItem.category), ",")
+        else:
+            categories = func.group_concat(distinct(QuotationItem.category))
+        thumbnail = select(QuotationItem.thumbnail_url).where(
+            QuotationItem.quotation_id == Quotation.id,
+            QuotationItem.thumbnail_url.isnot(None)
+        ).order_by(QuotationItem.sort_order).limit(1).correlate(Quotation).scalar_subquery()
+        
+        query = scoped_query(db, Quotation, agency_id).options(defer(Quotation.share_payload)).outerjoin(
+            QuotationItem, QuotationItem.quotation_id == Quotation.id
+        ).add_columns(
+            func.count(QuotationItem.id),
+            categories,
+            thumbnail,
+            func.max(QuotationItem.created_at)
+        ).group_by(Quotation.id)
         
         if status:
             query = query.filter(Quotation.status == status)
         
         query = query.order_by(Quotation.created_at.desc())
         
-        return query.offset(skip).limit(limit).all()
+        results = []
+        for quotation, item_count, category_list, thumbnail_url, last_item_at in query.offset(skip).limit(limit):
+            results.append((quotation, {
+                "item_count": item_count,
+                "categories": sorted(filter(None, (category_list or "").split(","))),
+                "thumbnail_url": thumbnail_url,
+                "last_modified": max(filter(None, [quotation.updated_at, last_item_at]), default=None)
+            }))
+        return results
+    
+    @staticmethod
+    def list_quotations_with_items(
+        db: Session,
+        agency_id: str,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        status: Optional[str] = None,
+        limit: int = 500
+    ) -> List[Tuple[Quotation, List[QuotationItem]]]:
+        """Quotations in a creation-date range with their items (two queries in total)."""
+        query = scoped_query(db, Quotation, agency_id)
+        if created_from:
+            query = query.filter(Quotation.created_at >= created_from)
+        if created_to:
+            query = query.filter(Quotation.created_at < created_to)
+        if status:
+            query = query.filter(Quotation.status == status)
+        quotations = query.order_by(Quotation.created_at).limit(limit).all()
+        if not quotations:
+            return []
+        
+        items_by_quotation: Dict[str, List[QuotationItem]] = {q.id: [] for q in quotations}
+        items = db.query(QuotationItem).filter(
+            QuotationItem.quotation_id.in_(list(items_by_quotation))
+        ).order_by(QuotationItem.quotation_id, QuotationItem.sort_order).all()
+        snapshot_store.attach_snapshots(db, items)
+        for item in items:
+            items_by_quotation[item.quotation_id].append(item)
+        
+        return [(q, items_by_quotation[q.id]) for q in quotations]
@@ -0,0 +1,87 @@
+"""
+Public share payload for published quotations.
+
+publish_quotation serializes the response body once and stores it on the quotation
+(share_payload/share_etag). The share endpoint serves that blob from a process-local +
+Redis cache, so repeated hits on a link shared in a group chat run no queries at all.
+Writers only drop the cached entry after their commit succeeds; the next read refills it.
+"""
+from typing import Any, Dict, List, Optional
+import hashlib
+import json
+from sqlalchemy.orm import Session
+from app.config import get_settings
+from app.infra.cache import CacheClient
+from app.infra.db import Quotation, QuotationItem
+from app.domain.quotations.snapshots import attach_snapshots
+
+settings = get_settings()
+
+_cache = CacheClient("quotation_share", ttl=settings.share_cache_ttl, local_size=1024)
+
+
+def build_payload(quotation: Quotation, items: List[QuotationItem]) -> Dict[str, Any]:
+    return {
+        "quotation": {
+            "id": quotation.id,
+            "title": quotation.title,
+            "customer_name": quotation.customer_name,
+            "total_amount": float(quotation.total_amount) if quotation.total_amount else 0,
+            "discount_amount": float(quotation.discount_amount) if quotation.discount_amount else 0,
+            "final_amount": float(quotation.final_amount) if quotation.final_amount else 0,
+            "notes": quotation.notes,
+            "published_at": quotation.published_at.isoformat() if quotation.published_at else None,
+            "share_token": quotation.share_token
+        },
+        "items": [
+            {
+                "id": item.id,
+                "snapshot": item.snapshot,
+                "quantity": item.quantity,
+                "unit_price": float(item.unit_price) if item.unit_price else 0,
+                "subtotal": float(item.subtotal) if item.subtotal else 0,
+                "custom_title": item.custom_title,
+                "custom_description": item.custom_description
+            }
+            for item in items
+        ]
+    }
+
+
+def store_payload(quotation: Quotation, items: List[QuotationItem]):
+    """Serialize the share body onto the quotation; the caller commits, then calls invalidate()."""
+    body = json.dumps(build_payload(quotation, items), ensure_ascii=False, separators=(",", ":"), default=str)
+    quotation.share_payload = body
+    quotation.share_etag = hashlib.sha256(body.encode("utf-8")).hexdigest()[:20]
+
+
+def invalidate(share_token: Optional[str]):
+    """Drop the cached body after the new payload is committed; the next read refills it from the DB."""
+    if share_token:
+        _cache.delete(share_token)
+
+
+def get_payload(db: Session, share_token: str) -> Optional[Dict[str, str]]:
+    """{"body", "etag"} for a published quotation, or None."""
+    cached = _cache.get(share_token)
+    if cached is not None:
+        return cached
+
+    quotation = db.query(Quotation).filter(
+        Quotation.share_token == share_token,
+        Quotation.status == "published"
+    ).first()
+    if not quotation:
+        return None
+
+    # Published before payloads were precomputed
+    if not quotation.share_payload:
+        items = db.query(QuotationItem).filter(
+            QuotationItem.quotation_id == quotation.id
+        ).order_by(QuotationItem.sort_order).all()
+        store_payload(quotation, attach_snapshots(db, items))
+        db.commit()
+
+    entry = {"body": quotation.share_payload, "etag": quotation.share_etag}
+    _cache.set(share_token, entry)
+    return entry
@@ -0,0 +1,65 @@
+"""
+Content-addressed storage for quotation item snapshots.
+
+A snapshot is stored once in quotation_snapshots under the sha256 of its canonical
+JSON; quotation items keep only snapshot_hash. Items written before this change still
+carry the snapshot inline and are read as-is.
+"""
+from typing import Any, Dict, Iterable, List
+import hashlib
+import json
+from datetime import datetime
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+from app.infra.db import QuotationItem, QuotationSnapshot
+
+
+def snapshot_hash(snapshot: Dict[str, Any]) -> str:
+    canonical = json.dumps(snapshot, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def store_snapshots(db: Session, snapshots: Iterable[Dict[str, Any]]) -> List[str]:
+    """Hashes of the given snapshots, inserting the ones not stored yet (one SELECT, at most one INSERT)."""
+    hashes = []
+    by_hash: Dict[str, Dict[str, Any]] = {}
+    for snapshot in snapshots:
+        digest = snapshot_hash(snapshot)
+        hashes.append(digest)
+        by_hash[digest] = snapshot
+    if not by_hash:
+        return hashes
+
+    existing = {
+        row[0] for row in db.query(QuotationSnapshot.hash).filter(QuotationSnapshot.hash.in_(list(by_hash)))
+    }
+    now = datetime.utcnow()
+    rows = [
+        {"hash": digest, "data": snapshot, "created_at": now}
+        for digest, snapshot in by_hash.items()
+        if digest not in existing
+    ]
+    if rows:
+        # A concurrent quotation may store the same snapshot between our SELECT and INSERT
+        if db.bind.dialect.name == "postgresql":
+            db.execute(pg_insert(QuotationSnapshot).on_conflict_do_nothing(index_elements=["hash"]), rows)
+        else:
+            db.execute(insert(QuotationSnapshot), rows)
+    return hashes
+
+
+def attach_snapshots(db: Session, items: List[QuotationItem]) -> List[QuotationItem]:
+    """Fill item.snapshot from the snapshot table with one IN query (without marking items dirty)."""
+    hashes = {item.snapshot_hash for item in items if item.snapshot_hash}
+    if not hashes:
+        return items
+
+    data = dict(
+        db.query(QuotationSnapshot.hash, QuotationSnapshot.data).filter(QuotationSnapshot.hash.in_(list(hashes)))
+    )
+    for item in items:
+        if item.snapshot_hash in data:
+            set_committed_value(item, "snapshot", data[item.snapshot_hash])
+    return items
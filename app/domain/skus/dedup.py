@@ -0,0 +1,320 @@
+from sqlalchemy import or_, func
+from sqlalchemy.orm import Session
+from app.infra.db import SKU, SKUSignature, SKULSHBucket, SKUStatus
+from app.config import get_settings
+from typing import Optional, List, Dict, Any, Iterable, Set, Tuple
+from collections import Counter
+import hashlib
+import logging
+import random
+import unicodedata
+from datetime import datetime
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 64
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+MAX_CANDIDATES = 500  # in-scope candidates scored per lookup, most shared bands first
+
+_PRIME = (1 << 61) - 1
+_rng = random.Random(20240207)
+_PERMUTATIONS = [(_rng.randrange(1, _PRIME), _rng.randrange(0, _PRIME)) for _ in range(NUM_PERM)]
+
+# attrs that identify a resource beyond its display name
+_NAME_ATTRS = ("hotel_name", "itinerary_name", "attraction_name", "restaurant_name", "activity_name", "guide_name")
+
+
+def normalize(text: Optional[str]) -> str:
+    """NFKC, lower case, letters/digits/CJK only (drops spaces and punctuation)."""
+    if not text:
+        return ""
+    text = unicodedata.normalize("NFKC", str(text)).lower()
+    return "".join(ch for ch in text if ch.isalnum())
+
+
+def _bigrams(prefix: str, text: str) -> Set[str]:
+    text = normalize(text)
+    if len(text) < 2:
+        return {f"{prefix}:{text}"} if text else set()
+    return {f"{prefix}:{text[i:i + 2]}" for i in range(len(text) - 1)}
+
+
+def sku_shingles(sku: SKU) -> Set[str]:
+    """Shingles over normalized name, city, supplier and key attrs."""
+    attrs = sku.attrs or {}
+    shingles = _bigrams("n", sku.sku_name)
+    for key in _NAME_ATTRS:
+        if attrs.get(key):
+            shingles |= _bigrams("n", attrs[key])
+
+    for prefix, value in (
+        ("a", attrs.get("address")),
+        ("c", sku.destination_city),
+        ("k", sku.destination_country),
+        ("s", sku.supplier_name)
+    ):
+        if normalize(value):
+            shingles.add(f"{prefix}:{normalize(value)}")
+
+    if attrs.get("days"):
+        shingles.add(f"d:{attrs.get('days')}/{attrs.get('nights')}")
+    for room in attrs.get("room_types") or []:
+        if isinstance(room, dict) and normalize(room.get("name") or room.get("room_type")):
+            shingles.add(f"r:{normalize(room.get('name') or room.get('room_type'))}")
+    return shingles
+
+
+def _hash(shingle: str) -> int:
+    return int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def minhash(shingles: Iterable[str]) -> List[int]:
+    hashes = [_hash(s) for s in shingles]
+    if not hashes:
+        return []
+    return [min((a * h + b) % _PRIME for h in hashes) for a, b in _PERMUTATIONS]
+
+
+def lsh_buckets(category: Optional[str], signature: List[int]) -> List[str]:
+    """One bucket key per band; category is part of the key so hotels never match itineraries."""
+    buckets = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS:(band + 1) * ROWS]
+        digest = hashlib.blake2b(",".join(map(str, rows)).encode(), digest_size=8).hexdigest()
+        buckets.append(f"{category or '-'}:{band}:{digest}")
+    return buckets
+
+
+def similarity(a: List[int], b: List[int]) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    if not a or not b or len(a) != len(b):
+        return 0.0
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a)
+
+
+class SKUDedupIndex:
+    """
+    Near-duplicate index over SKUs (MinHash + LSH banding, stored in sku_signatures/sku_lsh_buckets).
+    Kept up to date on SKU writes; lookups touch only the candidate SKUs that share a bucket.
+    Index maintenance never fails the SKU write that triggered it.
+    """
+
+    @staticmethod
+    def _stage(db: Session, sku: SKU):
+        signature = minhash(sku_shingles(sku))
+        db.query(SKULSHBucket).filter(SKULSHBucket.sku_id == sku.id).delete(synchronize_session=False)
+        if not signature:
+            db.query(SKUSignature).filter(SKUSignature.sku_id == sku.id).delete(synchronize_session=False)
+            return
+
+        db.merge(SKUSignature(
+            sku_id=sku.id,
+            category=sku.category,
+            signature=signature,
+            updated_at=datetime.utcnow()
+        ))
+        db.add_all([SKULSHBucket(bucket=b, sku_id=sku.id) for b in lsh_buckets(sku.category, signature)])
+
+    @staticmethod
+    def index_sku(db: Session, sku: SKU):
+        try:
+            SKUDedupIndex._stage(db, sku)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Failed to index SKU {sku.id} for duplicate detection: {str(e)}")
+
+    @staticmethod
+    def index_skus(db: Session, skus: Iterable[SKU]):
+        """Index several SKUs in one transaction, falling back to one at a time on error."""
+        skus = list(skus)
+        try:
+            for sku in skus:
+                SKUDedupIndex._stage(db, sku)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Batch duplicate indexing failed, indexing SKUs one by one: {str(e)}")
+            for sku in skus:
+                SKUDedupIndex.index_sku(db, sku)
+
+    @staticmethod
+    def remove_skus(db: Session, sku_ids: List[str]):
+        if not sku_ids:
+            return
+        try:
+            db.query(SKULSHBucket).filter(SKULSHBucket.sku_id.in_(sku_ids)).delete(synchronize_session=False)
+            db.query(SKUSignature).filter(SKUSignature.sku_id.in_(sku_ids)).delete(synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Failed to remove SKUs from duplicate index: {str(e)}")
+
+    @staticmethod
+    def find_duplicates(
+        db: Session,
+        sku: SKU,
+        agency_id: Optional[str] = None,
+        include_public: bool = True,
+        threshold: Optional[float] = None,
+        limit: int = 5
+    ) -> List[Dict[str, Any]]:
+        """
+        Likely duplicates of sku among active SKUs of agency_id and/or the published public library.
+        Returns [{sku_id, sku_name, agency_id, destination_city, is_public, similarity}], best first.
+        """
+        threshold = settings.sku_dedup_threshold if threshold is None else threshold
+        try:
+            stored = db.query(SKUSignature).filter(SKUSignature.sku_id == sku.id).first()
+            signature = stored.signature if stored else minhash(sku_shingles(sku))
+            if not signature:
+                return []
+
+            scopes = SKUDedupIndex._scopes(agency_id, include_public)
+            if not scopes:
+                return []
+
+            # Scope and status are filtered before the cap, so foreign or deleted SKUs in a busy
+            # band cannot crowd out real duplicates; the closest candidates (most bands) go first
+            shared = func.count(SKULSHBucket.bucket)
+            candidate_ids = [
+                row.sku_id for row in db.query(SKULSHBucket.sku_id).join(
+                    SKU, SKU.id == SKULSHBucket.sku_id
+                ).filter(
+                    SKULSHBucket.bucket.in_(lsh_buckets(sku.category, signature)),
+                    SKULSHBucket.sku_id != sku.id,
+                    SKU.status == SKUStatus.ACTIVE,
+                    or_(*scopes)
+                ).group_by(SKULSHBucket.sku_id).order_by(shared.desc()).limit(MAX_CANDIDATES)
+            ]
+            if not candidate_ids:
+                return []
+
+            rows = db.query(SKU, SKUSignature.signature).join(
+                SKUSignature, SKUSignature.sku_id == SKU.id
+            ).filter(SKU.id.in_(candidate_ids)).all()
+        except Exception as e:
+            logger.warning(f"Duplicate lookup failed for SKU {sku.id}: {str(e)}")
+            return []
+
+        return SKUDedupIndex._matches(signature, rows, threshold, limit)
+
+    @staticmethod
+    def _scopes(agency_id: Optional[str], include_public: bool) -> list:
+        scopes = []
+        if agency_id:
+            scopes.append(SKU.agency_id == agency_id)
+        if include_public:
+            scopes.append((SKU.is_public == True) & (SKU.public_status == "published"))
+        return scopes
+
+    @staticmethod
+    def _matches(signature: List[int], rows, threshold: float, limit: int) -> List[Dict[str, Any]]:
+        matches = []
+        for candidate, candidate_signature in rows:
+            score = similarity(signature, candidate_signature)
+            if score >= threshold:
+                matches.append({
+                    "sku_id": candidate.id,
+                    "sku_name": candidate.sku_name,
+                    "agency_id": candidate.agency_id,
+                    "destination_city": candidate.destination_city,
+                    "is_public": bool(candidate.is_public),
+                    "similarity": round(score, 3)
+                })
+        matches.sort(key=lambda m: m["similarity"], reverse=True)
+        return matches[:limit]
+
+    @staticmethod
+    def signatures(skus: Iterable[SKU]) -> Dict[str, Tuple[Optional[str], List[int]]]:
+        """{sku_id: (category, signature)} from loaded SKUs; compute before a commit expires them."""
+        return {sku.id: (sku.category, minhash(sku_shingles(sku))) for sku in skus}
+
+    @staticmethod
+    def index_new(db: Session, signatures: Dict[str, Tuple[Optional[str], List[int]]]):
+        """Index SKUs that were just created (nothing to replace) from precomputed signatures, in one commit."""
+        try:
+            for sku_id, (category, signature) in signatures.items():
+                if not signature:
+                    continue
+                db.add(SKUSignature(sku_id=sku_id, category=category, signature=signature, updated_at=datetime.utcnow()))
+                db.add_all([SKULSHBucket(bucket=b, sku_id=sku_id) for b in lsh_buckets(category, signature)])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning(f"Failed to index {len(signatures)} new SKUs for duplicate detection: {str(e)}")
+
+    @staticmethod
+    def find_duplicates_many(
+        db: Session,
+        signatures: Dict[str, Tuple[Optional[str], List[int]]],
+        agency_id: Optional[str] = None,
+        include_public: bool = True,
+        threshold: Optional[float] = None,
+        limit: int = 5
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        find_duplicates for several SKUs with two queries in total: one over the union of their
+        buckets, one for the candidates' signatures. Takes {sku_id: (category, signature)}.
+        """
+        threshold = settings.sku_dedup_threshold if threshold is None else threshold
+        results: Dict[str, List[Dict[str, Any]]] = {sku_id: [] for sku_id in signatures}
+        buckets_of = {
+            sku_id: lsh_buckets(category, signature)
+            for sku_id, (category, signature) in signatures.items() if signature
+        }
+        scopes = SKUDedupIndex._scopes(agency_id, include_public)
+        if not buckets_of or not scopes:
+            return results
+
+        try:
+            members: Dict[str, List[str]] = {}
+            for row in db.query(SKULSHBucket.bucket, SKULSHBucket.sku_id).join(
+                SKU, SKU.id == SKULSHBucket.sku_id
+            ).filter(
+                SKULSHBucket.bucket.in_({b for buckets in buckets_of.values() for b in buckets}),
+                SKU.status == SKUStatus.ACTIVE,
+                or_(*scopes)
+            ).limit(MAX_CANDIDATES * BANDS * len(buckets_of)):
+                members.setdefault(row.bucket, []).append(row.sku_id)
+
+            # Per SKU, the MAX_CANDIDATES candidates sharing the most bands, as in find_duplicates
+            candidates_of = {}
+            for sku_id, buckets in buckets_of.items():
+                shared = Counter(c for b in buckets for c in members.get(b, ()) if c != sku_id)
+                candidates_of[sku_id] = [c for c, _ in shared.most_common(MAX_CANDIDATES)]
+            candidate_ids = {c for ids in candidates_of.values() for c in ids}
+            if not candidate_ids:
+                return results
+
+            rows = {
+                candidate.id: (candidate, candidate_signature)
+                for candidate, candidate_signature in db.query(SKU, SKUSignature.signature).join(
+                    SKUSignature, SKUSignature.sku_id == SKU.id
+                ).filter(SKU.id.in_(candidate_ids))
+            }
+        except Exception as e:
+            logger.warning(f"Duplicate lookup failed for {len(signatures)} SKUs: {str(e)}")
+            return results
+
+        for sku_id, candidates in candidates_of.items():
+            results[sku_id] = SKUDedupIndex._matches(
+                signatures[sku_id][1], [rows[c] for c in candidates if c in rows], threshold, limit
+            )
+        return results
+
+    @staticmethod
+    def rebuild(db: Session, batch_size: int = 500) -> int:
+        """Index every SKU (initial backfill). Returns the number of SKUs indexed."""
+        count = 0
+        offset = 0
+        while True:
+            skus = db.query(SKU).order_by(SKU.id).offset(offset).limit(batch_size).all()
+            if not skus:
+                break
+            SKUDedupIndex.index_skus(db, skus)
+            count += len(skus)
+            offset += batch_size
+        return count
@@ -474,5 +474,8 @@ class SKUResponse(BaseModel):
     created_at: datetime
     updated_at: datetime
     
+    # 疑似重复SKU（仅发布/导入确认时返回）
+    possible_duplicates: Optional[List[Dict[str, Any]]] = None
+    
     class Config:
         from_attributes = True
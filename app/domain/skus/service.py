@@ -3,6 +3,8 @@ from sqlalchemy.orm.attributes import flag_modified
 from app.infra.db import SKU, scoped_query, SKUStatus, OwnerType, Product
 from app.domain.skus.schemas import SKUCreate, SKUUpdate, validate_attrs
 from app.infra.audit import audit_log
+from app.domain.skus.dedup import SKUDedupIndex
+from app.domain.quotations.impact import QuotationImpactService
 from typing import Optional, List, Dict, Any
 import uuid
 from datetime import datetime
@@ -16,6 +18,34 @@ class SKUService:
         user_id: str,
         sku_data: SKUCreate
     ) -> SKU:
+        sku = SKUService.build_sku(db, agency_id, user_id, sku_data)
+        
+        db.add(sku)
+        db.commit()
+        db.refresh(sku)
+        
+        SKUDedupIndex.index_sku(db, sku)
+        
+        audit_log(
+            db=db,
+            agency_id=agency_id,
+            user_id=user_id,
+            action="sku.create",
+            entity_type="sku",
+            entity_id=sku.id,
+            after_data={"sku_name": sku.sku_name, "sku_type": sku.sku_type}
+        )
+        
+        return sku
+    
+    @staticmethod
+    def build_sku(
+        db: Session,
+        agency_id: str,
+        user_id: str,
+        sku_data: SKUCreate
+    ) -> SKU:
+        """Validate sku_data and build the (not yet added) SKU row; raises ValueError when invalid."""
         # Validate attrs if provided
         validated_attrs = {}
         if sku_data.attrs:
@@ -91,21 +121,6 @@ class SKUService:
             created_at=datetime.utcnow(),
             updated_at=datetime.utcnow()
         )
-        
-        db.add(sku)
-        db.commit()
-        db.refresh(sku)
-        
-        audit_log(
-            db=db,
-            agency_id=agency_id,
-            user_id=user_id,
-            action="sku.create",
-            entity_type="sku",
-            entity_id=sku.id,
-            after_data={"sku_name": sku.sku_name, "sku_type": sku.sku_type}
-        )
-        
         return sku
     
     @staticmethod
@@ -156,10 +171,13 @@ class SKUService:
             setattr(sku, key, value)
         
         sku.updated_at = datetime.utcnow()
+        QuotationImpactService.mark_stale(db, agency_id, [sku.id])
         
         db.commit()
         db.refresh(sku)
         
+        SKUDedupIndex.index_sku(db, sku)
+        
         audit_log(
             db=db,
             agency_id=agency_id,
@@ -231,6 +249,8 @@ class SKUService:
         
         db.delete(sku)
         db.commit()
+        
+        SKUDedupIndex.remove_skus(db, [sku_id])
         return True
     
     @staticmethod
@@ -261,7 +281,9 @@ class SKUService:
         if sku.attrs is None:
             sku.attrs = {}
         sku.attrs['price_calendar'] = calendar_dict
+        flag_modified(sku, 'attrs')
         sku.updated_at = datetime.utcnow()
+        QuotationImpactService.mark_stale(db, agency_id, [sku.id])
         
         db.commit()
         db.refresh(sku)
@@ -283,6 +305,7 @@ class SKUService:
         skus = query.all()
         
         updated_count = 0
+        updated_ids = []
         for sku in skus:
             # Get cost price from attrs
             cost_price = None
@@ -326,7 +349,9 @@ class SKUService:
                     flag_modified(sku, 'attrs')
                     sku.updated_at = datetime.utcnow()
                     updated_count += 1
+                    updated_ids.append(sku.id)
         
+        QuotationImpactService.mark_stale(db, agency_id, updated_ids)
         db.commit()
         
         audit_log(
@@ -355,6 +380,8 @@ class SKUService:
         updated_count = query.update(update_data, synchronize_session=False)
         db.commit()
         
+        SKUDedupIndex.index_skus(db, scoped_query(db, SKU, agency_id).filter(SKU.id.in_(sku_ids)).all())
+        
         audit_log(
             db=db,
             agency_id=agency_id,
@@ -376,9 +403,12 @@ class SKUService:
     ) -> int:
         """Batch delete SKUs"""
         query = scoped_query(db, SKU, agency_id).filter(SKU.id.in_(sku_ids))
+        deleted_ids = [row.id for row in query.with_entities(SKU.id).all()]
         deleted_count = query.delete(synchronize_session=False)
         db.commit()
         
+        SKUDedupIndex.remove_skus(db, deleted_ids)
+        
         audit_log(
             db=db,
             agency_id=agency_id,
@@ -422,6 +452,9 @@ class SKUService:
         db.commit()
         db.refresh(sku)
         
+        # Flag near-identical SKUs already in the public library (not persisted, returned with the SKU)
+        sku.possible_duplicates = SKUDedupIndex.find_duplicates(db, sku, include_public=True)
+        
         audit_log(
             db=db,
             agency_id=agency_id,
@@ -435,7 +468,8 @@ class SKUService:
                 "is_public": sku.is_public,
                 "public_status": sku.public_status,
                 "visibility_scope": sku.visibility_scope,
-                "partner_whitelist": partner_whitelist
+                "partner_whitelist": partner_whitelist,
+                "possible_duplicates": [d["sku_id"] for d in sku.possible_duplicates]
             }
         )
         
@@ -1,6 +1,6 @@
 from sqlalchemy.orm import Session
 from app.infra.db import AuditLog
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 import uuid
 from datetime import datetime
 
@@ -33,3 +33,32 @@ def audit_log(
     db.add(log)
     db.commit()
     return log
+
+
+def audit_log_many(
+    db: Session,
+    agency_id: str,
+    user_id: str,
+    entries: List[Dict[str, Any]]
+) -> List[AuditLog]:
+    """Write several audit entries (dicts of audit_log's keyword arguments) in one commit."""
+    now = datetime.utcnow()
+    logs = [
+        AuditLog(
+            id=f"AUDIT-{uuid.uuid4().hex[:12].upper()}",
+            agency_id=agency_id,
+            user_id=user_id,
+            action=entry["action"],
+            entity_type=entry["entity_type"],
+            entity_id=entry["entity_id"],
+            before_data=entry.get("before_data"),
+            after_data=entry.get("after_data"),
+            ip_address=entry.get("ip_address"),
+            user_agent=entry.get("user_agent"),
+            created_at=now
+        )
+        for entry in entries
+    ]
+    db.add_all(logs)
+    db.commit()
+    return logs
@@ -0,0 +1,93 @@
+from typing import Any, Optional
+from collections import OrderedDict
+import hashlib
+import json
+import threading
+import time
+import redis
+from app.config import get_settings
+
+settings = get_settings()
+
+_redis_client = None
+_redis_lock = threading.Lock()
+
+
+def get_redis() -> redis.Redis:
+    """Shared Redis connection (lazy). Callers must tolerate redis.RedisError."""
+    global _redis_client
+    if _redis_client is None:
+        with _redis_lock:
+            if _redis_client is None:
+                _redis_client = redis.Redis.from_url(
+                    settings.redis_url,
+                    socket_timeout=0.5,
+                    socket_connect_timeout=0.5
+                )
+    return _redis_client
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class CacheClient:
+    """
+    JSON value cache: a small process-local LRU in front of Redis.
+    Redis being unavailable degrades to local-only caching instead of failing the request.
+    """
+
+    def __init__(self, namespace: str, ttl: int, local_size: int = 256):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.local_size = local_size
+        self._local: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, key: str) -> str:
+        return f"tfrm:{self.namespace}:{key}"
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._local.move_to_end(key)
+                    return value
+                del self._local[key]
+
+        try:
+            raw = get_redis().get(self._key(key))
+        except redis.RedisError:
+            return None
+        if raw is None:
+            return None
+
+        value = json.loads(raw)
+        self._set_local(key, value, self.ttl)
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        ttl = ttl or self.ttl
+        self._set_local(key, value, ttl)
+        try:
+            get_redis().set(self._key(key), json.dumps(value, ensure_ascii=False, default=str), ex=ttl)
+        except redis.RedisError:
+            pass
+
+    def delete(self, key: str):
+        with self._lock:
+            self._local.pop(key, None)
+        try:
+            get_redis().delete(self._key(key))
+        except redis.RedisError:
+            pass
+
+    def _set_local(self, key: str, value: Any, ttl: int):
+        with self._lock:
+            self._local[key] = (time.time() + ttl, value)
+            self._local.move_to_end(key)
+            while len(self._local) > self.local_size:
+                self._local.popitem(last=False)
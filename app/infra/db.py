@@ -196,6 +196,24 @@ class SKU(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+class SKUSignature(Base):
+    """MinHash signature per SKU for near-duplicate detection (see app/domain/skus/dedup.py)"""
+    __tablename__ = "sku_signatures"
+    
+    sku_id = Column(String, primary_key=True)
+    category = Column(String)
+    signature = Column(JSON, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class SKULSHBucket(Base):
+    """LSH band buckets: SKUs sharing any bucket are duplicate candidates"""
+    __tablename__ = "sku_lsh_buckets"
+    
+    bucket = Column(String, primary_key=True)
+    sku_id = Column(String, primary_key=True, index=True)
+
+
 class PricingFactor(Base):
     __tablename__ = "pricing_factors"
     
@@ -237,15 +255,50 @@ class ImportTask(Base):
     extracted_fields = Column(JSON)
     confidence = Column(JSON)
     evidence = Column(JSON)
+    confirmed_fields = Column(JSON)  # fields as reviewed by the operator on confirm
     
     error_message = Column(Text)
     
+    # LLM cost/latency accounting (estimated vs. reported tokens)
+    input_tokens_estimated = Column(Integer)
+    prompt_tokens = Column(Integer)
+    completion_tokens = Column(Integer)
+    llm_calls = Column(Integer)
+    extraction_ms = Column(Integer)
+    llm_route = Column(String)  # vision / text_compact / text (see app/infra/llm_router.py)
+    llm_model = Column(String)
+    
     created_sku_id = Column(String)
     
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
+class SupplierTemplate(Base):
+    """Parsing rules learned from a reviewed import, reused for the same supplier layout"""
+    __tablename__ = "supplier_templates"
+    
+    id = Column(String, primary_key=True)
+    agency_id = Column(String, nullable=False, index=True)
+    name = Column(String, nullable=False)
+    supplier_name = Column(String)
+    sku_type = Column(String)
+    category = Column(String)
+    
+    # Layout fingerprint: line labels of the source text (see app/domain/imports/templates.py)
+    fingerprint = Column(String, index=True)
+    labels = Column(JSON, default=[])
+    rules = Column(JSON, default={})
+    
+    source_task_id = Column(String)
+    hit_count = Column(Integer, default=0)
+    last_used_at = Column(DateTime)
+    
+    created_by = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class Quotation(Base):
     __tablename__ = "quotations"
     
@@ -268,6 +321,13 @@ class Quotation(Base):
     published_at = Column(DateTime)
     published_url = Column(String)
     share_token = Column(String, unique=True, index=True)
+    # Serialized public share response, rebuilt on publish and on changes while published
+    share_payload = Column(Text)
+    share_etag = Column(String)
+    
+    # Set when a referenced SKU's price data changes; cleared by re-pricing
+    price_stale = Column(Boolean, default=False, index=True)
+    stale_since = Column(DateTime)
     
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -279,14 +339,25 @@ class QuotationItem(Base):
     id = Column(String, primary_key=True)
     quotation_id = Column(String, nullable=False, index=True)
     
-    sku_id = Column(String, nullable=False)
+    sku_id = Column(String, nullable=False, index=True)
+    # Copied from the SKU/snapshot at creation so list aggregates need no JSON access
+    category = Column(String)
+    thumbnail_url = Column(String)
     
-    snapshot = Column(JSON, nullable=False)
+    # Content-addressed snapshot (quotation_snapshots.hash); older items keep the snapshot inline
+    snapshot_hash = Column(String, index=True)
+    snapshot = Column(JSON)
     
     quantity = Column(Integer, default=1)
     unit_price = Column(Numeric(10, 2))
     subtotal = Column(Numeric(10, 2))
     
+    # Service period priced through the pricing engine; price_basis fingerprints the inputs of the last pricing
+    service_date = Column(Date)
+    service_end_date = Column(Date)
+    price_source = Column(String)  # static|fixed|calendar|rule|mixed
+    price_basis = Column(String)
+    
     custom_title = Column(String)
     custom_description = Column(Text)
     custom_notes = Column(Text)
@@ -296,6 +367,15 @@ class QuotationItem(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
 
+class QuotationSnapshot(Base):
+    """Deduplicated SKU snapshots shared by quotation items (see app/domain/quotations/snapshots.py)"""
+    __tablename__ = "quotation_snapshots"
+    
+    hash = Column(String, primary_key=True)
+    data = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 class Vendor(Base):
     __tablename__ = "vendors"
     
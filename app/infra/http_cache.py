@@ -0,0 +1,18 @@
+"""
+Helpers for conditional GET (ETag / If-None-Match).
+"""
+from typing import Optional
+
+
+def make_etag(version: str) -> str:
+    return f'"{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True if the If-None-Match header lists this ETag (weak comparison, as RFC 9110 requires)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return etag.removeprefix("W/") in (tag.removeprefix("W/") for tag in candidates)
@@ -0,0 +1,91 @@
+from typing import Tuple
+from io import BytesIO
+from PIL import Image, ImageOps, ImageChops
+from app.config import get_settings
+
+settings = get_settings()
+
+
+class ImagePreprocessor:
+    """
+    Shrink uploaded images before they are base64-encoded into a multimodal prompt.
+    Pipeline: EXIF-rotate -> (optional) crop whitespace -> downscale -> JPEG recompress.
+    Only the copy sent to the LLM is processed; the original upload stays in storage.
+    """
+
+    WHITESPACE_PADDING = 16
+
+    def __init__(
+        self,
+        max_edge: int = None,
+        quality: int = None,
+        crop_whitespace: bool = None
+    ):
+        self.max_edge = max_edge or settings.image_max_edge
+        self.quality = quality or settings.image_jpeg_quality
+        self.crop_whitespace = settings.image_crop_whitespace if crop_whitespace is None else crop_whitespace
+
+    def process(self, data: bytes, mime_type: str = "image/jpeg") -> Tuple[bytes, str]:
+        """
+        Return (bytes, mime_type) ready to be encoded.
+        Falls back to the original bytes if Pillow cannot decode the image
+        or if re-encoding would not make the payload smaller.
+        """
+        try:
+            with Image.open(BytesIO(data)) as img:
+                img.load()
+                original_size = img.size
+                img = ImageOps.exif_transpose(img)
+                img = self._to_rgb(img)
+
+                if self.crop_whitespace:
+                    img = self._crop_whitespace(img)
+
+                if max(img.size) > self.max_edge:
+                    img.thumbnail((self.max_edge, self.max_edge), Image.LANCZOS)
+
+                out = BytesIO()
+                img.save(out, format="JPEG", quality=self.quality, optimize=True, progressive=True)
+                processed = out.getvalue()
+                processed_size = img.size
+        except Exception as e:
+            print(f"Warning: Image preprocessing failed, sending original: {str(e)}")
+            return data, mime_type
+
+        if len(processed) >= len(data) and processed_size == original_size:
+            return data, mime_type
+
+        print(f"  - Image preprocessed: {original_size[0]}x{original_size[1]} {len(data)} bytes "
+              f"-> {processed_size[0]}x{processed_size[1]} {len(processed)} bytes")
+        return processed, "image/jpeg"
+
+    @staticmethod
+    def _to_rgb(img: Image.Image) -> Image.Image:
+        if img.mode == "RGB":
+            return img
+        if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+            rgba = img.convert("RGBA")
+            background = Image.new("RGB", rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.split()[-1])
+            return background
+        return img.convert("RGB")
+
+    def _crop_whitespace(self, img: Image.Image) -> Image.Image:
+        background = Image.new("RGB", img.size, (255, 255, 255))
+        diff = ImageChops.difference(img, background).convert("L")
+        # Ignore near-white noise from JPEG artifacts / paper texture
+        diff = diff.point(lambda p: 255 if p > 24 else 0)
+        bbox = diff.getbbox()
+        if not bbox:
+            return img
+        pad = self.WHITESPACE_PADDING
+        left, top, right, bottom = bbox
+        bbox = (
+            max(0, left - pad),
+            max(0, top - pad),
+            min(img.width, right + pad),
+            min(img.height, bottom + pad)
+        )
+        if bbox == (0, 0, img.width, img.height):
+            return img
+        return img.crop(bbox)
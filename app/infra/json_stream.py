@@ -0,0 +1,95 @@
+from typing import Any, List, Optional, Set, Tuple
+import json
+
+
+class IncrementalJSONParser:
+    """
+    Incremental parser for a streamed JSON object.
+
+    Text is fed chunk by chunk; whenever a value finishes at one of the watched
+    paths it is decoded and returned, without waiting for the whole document.
+    Paths are tuples of object keys; "*" matches any key at that level, e.g.
+    ("extracted_fields", "*") yields every extracted field as soon as it closes.
+    Array elements are not tracked individually (an array is emitted as one value).
+    """
+
+    def __init__(self, watch: Set[Tuple[str, ...]]):
+        self.watch = watch
+        self.buffer = ""
+        self._pos = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        # Frames: [container_char, path, current_key, expecting_key, value_start]
+        self._stack: List[list] = []
+
+    def feed(self, chunk: str) -> List[Tuple[Tuple[str, ...], Any]]:
+        self.buffer += chunk
+        completed = []
+        buf = self.buffer
+
+        while self._pos < len(buf):
+            ch = buf[self._pos]
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    frame = self._stack[-1] if self._stack else None
+                    if frame and frame[0] == "{" and frame[3]:
+                        frame[2] = json.loads(buf[self._string_start:self._pos + 1])
+                self._pos += 1
+                continue
+
+            frame = self._stack[-1] if self._stack else None
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = self._pos
+            elif ch in "{[":
+                path = ()
+                if frame is not None:
+                    path = frame[1] + ((frame[2],) if frame[0] == "{" else ("[]",))
+                self._stack.append([ch, path, None, ch == "{", None])
+            elif ch == ":" and frame and frame[0] == "{":
+                frame[3] = False
+                frame[4] = self._pos + 1
+            elif ch == "," and frame:
+                if frame[0] == "{":
+                    self._complete(frame, self._pos, completed)
+                    frame[3] = True
+            elif ch in "}]" and frame:
+                if frame[0] == "{":
+                    self._complete(frame, self._pos, completed)
+                self._stack.pop()
+
+            self._pos += 1
+
+        return completed
+
+    def _complete(self, frame: list, end: int, completed: list):
+        key, start = frame[2], frame[4]
+        frame[2], frame[4] = None, None
+        if key is None or start is None:
+            return
+        path = frame[1] + (key,)
+        if not self._watched(path):
+            return
+        raw = self.buffer[start:end].strip()
+        try:
+            completed.append((path, json.loads(raw)))
+        except ValueError:
+            pass
+
+    def _watched(self, path: Tuple[str, ...]) -> bool:
+        for pattern in self.watch:
+            if len(pattern) == len(path) and all(p == "*" or p == k for p, k in zip(pattern, path)):
+                return True
+        return False
+
+    def result(self) -> Optional[Any]:
+        """Decode the full document once the stream has finished."""
+        return json.loads(self.buffer)
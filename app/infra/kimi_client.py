@@ -1,12 +1,69 @@
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, AsyncIterator
 import httpx
 import json
+import time
 import base64
 from app.config import get_settings
+from app.infra.image_preprocess import ImagePreprocessor
+from app.infra.json_stream import IncrementalJSONParser
+from app.infra.tokens import estimate_tokens, IMAGE_TOKEN_ESTIMATE
+from app.infra.cache import CacheClient, content_hash
+from app.infra.llm_limiter import LLMRateLimitError, LLMTransientError, parse_retry_after
+from app.infra.llm_replay import record_response
+from app.infra.llm_router import route_request
 
 settings = get_settings()
 
 
+EXTRACTION_SYSTEM_PROMPT = """你是 Kimi，一个专业的旅游资源数据提取助手。
+
+🚨 **绝对禁止规则（违反将导致严重错误）** 🚨
+
+1. **禁止编造任何信息** - 绝对不得添加图片/文本中不存在的任何内容
+2. **禁止使用外部知识** - 不得使用你的知识库中的信息来"补充"或"完善"提取结果
+3. **禁止推测或联想** - 看到"土耳其"不代表可以添加"安塔利亚"等城市信息
+4. **禁止添加标准信息** - 不得添加"标准间"、"早餐"、"WiFi"等未明确提及的内容
+5. **禁止混淆产品类型** - 旅游海报是itinerary，不是hotel；酒店价格表是hotel，不是itinerary
+
+✅ **正确做法：**
+- 仅提取图片/文本中**明确显示**的文字和数字
+- 如果某个字段在图片中找不到，设为null或完全省略
+- 产品名称、价格、日期必须与图片中的**完全一致**
+- 如果是旅游套餐海报（有"N天N晚"、价格、出发日期），sku_type必须是"itinerary"
+- 如果是酒店价格表（有房型、房价），sku_type必须是"hotel"
+
+❌ **错误示例：**
+- 图片显示"土耳其10天游"，却提取成"安塔利亚酒店" ← 严重错误！
+- 图片只有套餐价格，却添加了具体酒店名称 ← 编造信息！
+- 图片是旅游海报，却识别为hotel类型 ← 类型错误！
+
+违反以上规则将被视为严重错误，必须重新提取。"""
+
+
+COMPACT_SYSTEM_PROMPT = """你是旅游资源数据提取助手。只提取输入中明确出现的信息，不得编造、推测或使用外部知识；
+找不到的字段省略或设为 null。只输出 JSON。"""
+
+
+# Type rules and field list shared by the compact and batch prompts
+COMPACT_FIELD_GUIDE = """
+类型判断：有房型/房价 → hotel；N天N晚、出发日期的多日套餐（无房型）→ itinerary；
+只有餐饮价格 → restaurant；用车/车辆/司机 → car；导游 → guide；门票/景区 → ticket；其他单项体验 → activity。
+category 对应关系：hotel→hotel, car→transport, itinerary→route, guide→guide, restaurant→dining, ticket→ticket, activity→activity
+
+常用字段：sku_name, destination_city, destination_country, supplier_name, description, tags,
+base_cost_price, base_sale_price（数字）；
+hotel: hotel_name, address, room_types[{room_type_name, building, area_sqm, include_breakfast, pricing[{season, daily_price, currency}]}]；
+itinerary: itinerary_name, days, nights, departure_dates[{date, price, currency}], highlights, inclusions, exclusions；
+restaurant: restaurant_name, cuisine_type, meal_types, per_person_price；
+car: car_type, seats, service_mode, daily_price；guide: guide_name, languages, daily_cost_price；
+ticket: attraction_name, ticket_type, cost_price, sell_price；activity: activity_name, duration_hours, meeting_point。
+"""
+
+
+REEXTRACT_SYSTEM_PROMPT = """你是旅游资源数据校对助手。只根据给定的原文（或图片）重新提取指定字段。
+原文中找不到的字段返回 null，不得编造或使用外部知识。只输出 JSON。"""
+
+
 class KimiClient:
     """
     Kimi K2.5 client with native multimodal support (vision + text)
@@ -14,10 +71,13 @@ class KimiClient:
     Supports file upload, extraction, and structured parsing
     """
     
+    # content hash -> {"file_id", "content"}; documents are large, keep few in process memory
+    _file_cache = CacheClient("kimi_file", ttl=settings.kimi_file_cache_ttl, local_size=32)
+    
     def __init__(self):
         self.api_key = settings.kimi_api_key
         self.model = settings.kimi_model
-        self.base_url = "https://api.moonshot.cn/v1"
+        self.base_url = settings.kimi_base_url.rstrip("/")
         
         if not self.api_key or self.api_key == "your-kimi-api-key-here":
             raise ValueError("Kimi API key is not configured. Please set a valid KIMI_API_KEY in .env file")
@@ -166,6 +226,24 @@ class KimiClient:
             
             return content
     
+    async def get_document_content(self, file_data: bytes, filename: str) -> Dict[str, Any]:
+        """
+        Upload a document and extract its text, reusing earlier results for identical bytes.
+        
+        Returns:
+            {"file_id", "content", "cached"}; cached=True means no request was made to Kimi
+        """
+        key = content_hash(file_data)
+        cached = self._file_cache.get(key)
+        if cached is not None:
+            print(f"KIMI FILE CACHE HIT: {filename} -> {cached['file_id']} ({len(cached['content'])} chars)")
+            return {**cached, "cached": True}
+        
+        file_id = await self.upload_file(file_data, filename)
+        content = await self.get_file_content(file_id)
+        self._file_cache.set(key, {"file_id": file_id, "content": content})
+        return {"file_id": file_id, "content": content, "cached": False}
+    
     async def parse_sku_input(
         self, 
         input_text: str, 
@@ -183,60 +261,93 @@ class KimiClient:
         Returns:
             Structured extraction result with extracted_fields, confidence, evidence
         """
-        # Extract file contents if file_ids provided
-        file_contents = []
-        if file_ids:
-            for file_id in file_ids:
-                try:
-                    content = await self.get_file_content(file_id)
-                    file_contents.append(content)
-                except Exception as e:
-                    print(f"Warning: Failed to extract content from file {file_id}: {str(e)}")
-                    continue
+        combined_text = await self._combine_file_contents(input_text, file_ids)
+        route = route_request(combined_text, images)
+        messages = self._build_messages(combined_text, images, route["prompt"])
+        estimated_tokens = self.estimate_prompt_tokens(combined_text, images, route["prompt"])
         
-        # Merge file contents with input text
-        combined_text = input_text or ""
-        if file_contents:
-            combined_text += "\n\n--- 文件内容 ---\n" + "\n\n".join(file_contents)
+        print(f"\n{'='*80}")
+        print(f"KIMI K2.5 REQUEST:")
+        print(f"  - Model: {route['model']} (route: {route['route']}, prompt: {route['prompt']})")
+        print(f"  - Combined text length: {len(combined_text)}")
+        print(f"  - Estimated prompt tokens: {estimated_tokens}")
+        print(f"  - Images: {len(images) if images else 0}")
+        print(f"  - File IDs: {len(file_ids) if file_ids else 0}")
+        print(f"{'='*80}\n")
         
-        prompt = self._build_extraction_prompt(combined_text)
+        parsed_result = await self._complete_json(messages, estimated_tokens, route)
+        if settings.llm_record_dir:
+            record_response(settings.llm_record_dir, messages, parsed_result)
         
-        # Build multimodal messages (now without file_ids, using extracted content)
+        self._print_success(parsed_result)
+        
+        return parsed_result
+    
+    async def reextract_fields(
+        self,
+        source_text: str,
+        sku_type: Optional[str],
+        fields: Dict[str, Any],
+        images: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Focused re-extraction of a few fields from an already imported source.
+        fields maps field name -> current (doubtful) value. Uses a short prompt instead of
+        the full extraction template; returns {extracted_fields, confidence, evidence, usage}.
+        """
+        prompt = self._build_reextract_prompt(source_text, sku_type, fields)
         messages = [
-            {"role": "system", "content": """你是 Kimi，一个专业的旅游资源数据提取助手。
-
-🚨 **绝对禁止规则（违反将导致严重错误）** 🚨
-
-1. **禁止编造任何信息** - 绝对不得添加图片/文本中不存在的任何内容
-2. **禁止使用外部知识** - 不得使用你的知识库中的信息来"补充"或"完善"提取结果
-3. **禁止推测或联想** - 看到"土耳其"不代表可以添加"安塔利亚"等城市信息
-4. **禁止添加标准信息** - 不得添加"标准间"、"早餐"、"WiFi"等未明确提及的内容
-5. **禁止混淆产品类型** - 旅游海报是itinerary，不是hotel；酒店价格表是hotel，不是itinerary
-
-✅ **正确做法：**
-- 仅提取图片/文本中**明确显示**的文字和数字
-- 如果某个字段在图片中找不到，设为null或完全省略
-- 产品名称、价格、日期必须与图片中的**完全一致**
-- 如果是旅游套餐海报（有"N天N晚"、价格、出发日期），sku_type必须是"itinerary"
-- 如果是酒店价格表（有房型、房价），sku_type必须是"hotel"
-
-❌ **错误示例：**
-- 图片显示"土耳其10天游"，却提取成"安塔利亚酒店" ← 严重错误！
-- 图片只有套餐价格，却添加了具体酒店名称 ← 编造信息！
-- 图片是旅游海报，却识别为hotel类型 ← 类型错误！
-
-违反以上规则将被视为严重错误，必须重新提取。"""},
+            {"role": "system", "content": REEXTRACT_SYSTEM_PROMPT},
             {"role": "user", "content": self._build_content_parts(prompt, images, None)}
         ]
+        estimated_tokens = (
+            estimate_tokens(REEXTRACT_SYSTEM_PROMPT) + estimate_tokens(prompt)
+            + IMAGE_TOKEN_ESTIMATE * len(images or [])
+        )
         
         print(f"\n{'='*80}")
-        print(f"KIMI K2.5 REQUEST:")
-        print(f"  - Model: {self.model}")
-        print(f"  - Combined text length: {len(combined_text)}")
+        print(f"KIMI FIELD RE-EXTRACTION:")
+        print(f"  - Fields: {', '.join(fields)}")
+        print(f"  - Source text length: {len(source_text)}")
+        print(f"  - Estimated prompt tokens: {estimated_tokens}")
         print(f"  - Images: {len(images) if images else 0}")
-        print(f"  - File contents extracted: {len(file_contents)}")
         print(f"{'='*80}\n")
         
+        route = {**route_request(source_text, images), "route": "reextract"}
+        return await self._complete_json(messages, estimated_tokens, route)
+    
+    async def parse_sku_batch(self, texts: List[str]) -> Dict[str, Any]:
+        """
+        Extract several short, independent texts in one call.
+        Returns {"items": [{"index": <1-based>, ...extraction result}], "usage"}; the caller
+        matches items back to inputs by index and handles missing ones.
+        """
+        prompt = self._build_batch_prompt(texts)
+        messages = [
+            {"role": "system", "content": COMPACT_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt}
+        ]
+        estimated_tokens = estimate_tokens(COMPACT_SYSTEM_PROMPT) + estimate_tokens(prompt)
+        route = {**route_request("\n".join(texts)), "route": "text_batch"}
+        
+        print(f"\n{'='*80}")
+        print(f"KIMI BATCH REQUEST:")
+        print(f"  - Model: {route['model']}")
+        print(f"  - Items: {len(texts)}")
+        print(f"  - Estimated prompt tokens: {estimated_tokens}")
+        print(f"{'='*80}\n")
+        
+        return await self._complete_json(messages, estimated_tokens, route)
+    
+    async def _complete_json(
+        self,
+        messages: List[Dict[str, Any]],
+        estimated_tokens: int,
+        route: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        """Non-streamed chat completion returning the parsed JSON content (plus usage)."""
+        model = route["model"] if route else self.model
+        started = time.monotonic()
         try:
             async with httpx.AsyncClient(timeout=600.0) as client:
                 response = await client.post(
@@ -245,25 +356,11 @@ class KimiClient:
                         "Authorization": f"Bearer {self.api_key}",
                         "Content-Type": "application/json"
                     },
-                    json={
-                        "model": self.model,
-                        "messages": messages,
-                        "temperature": 0.6,
-                        "thinking": {"type": "disabled"},
-                        "response_format": {"type": "json_object"}
-                    }
+                    json=self._completion_payload(messages, model)
                 )
                 
                 if response.status_code != 200:
-                    error_detail = response.text
-                    print(f"\n{'='*80}")
-                    print(f"KIMI API ERROR:")
-                    print(f"  Status: {response.status_code}")
-                    print(f"  Detail: {error_detail}")
-                    print(f"  Model: {self.model}")
-                    print(f"  URL: {self.base_url}/chat/completions")
-                    print(f"{'='*80}\n")
-                    raise Exception(f"Kimi API request failed (HTTP {response.status_code}): {error_detail}")
+                    self._raise_api_error(response.status_code, response.text, response.headers.get("retry-after"), model)
                 
                 result = response.json()
                 
@@ -272,20 +369,214 @@ class KimiClient:
                 
                 content = result["choices"][0]["message"]["content"]
                 parsed_result = json.loads(content)
-                
-                print(f"\n{'='*80}")
-                print(f"KIMI EXTRACTION SUCCESS:")
-                print(f"  - SKU Type: {parsed_result.get('sku_type', 'unknown')}")
-                print(f"  - Fields extracted: {len(parsed_result.get('extracted_fields', {}))}")
-                print(f"{'='*80}\n")
-                
+                parsed_result["usage"] = self._usage(estimated_tokens, result.get("usage"), started, route)
                 return parsed_result
         except httpx.TimeoutException as e:
-            raise Exception(f"Kimi API timeout: Request took longer than 600 seconds")
+            raise LLMTransientError(f"Kimi API timeout: Request took longer than 600 seconds")
         except httpx.NetworkError as e:
-            raise Exception(f"Kimi API network error: {str(e)}")
+            raise LLMTransientError(f"Kimi API network error: {str(e)}")
         except httpx.HTTPError as e:
-            raise Exception(f"Kimi API HTTP error: {str(e)}")
+            raise LLMTransientError(f"Kimi API HTTP error: {str(e)}")
+    
+    async def stream_sku_input(
+        self,
+        input_text: str,
+        images: Optional[List[Dict[str, Any]]] = None,
+        file_ids: Optional[List[str]] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of parse_sku_input.
+        
+        Yields events as the completion arrives:
+            {"type": "field", "field": <name>, "value": <value>}  - one extracted_fields entry finished
+            {"type": "meta", "field": "sku_type"|"category", "value": ...}
+            {"type": "result", "result": <full parsed result>}   - always last
+        """
+        combined_text = await self._combine_file_contents(input_text, file_ids)
+        route = route_request(combined_text, images)
+        messages = self._build_messages(combined_text, images, route["prompt"])
+        estimated_tokens = self.estimate_prompt_tokens(combined_text, images, route["prompt"])
+        parser = IncrementalJSONParser({("extracted_fields", "*"), ("sku_type",), ("category",)})
+        api_usage = None
+        
+        print(f"\n{'='*80}")
+        print(f"KIMI K2.5 STREAMING REQUEST:")
+        print(f"  - Model: {route['model']} (route: {route['route']}, prompt: {route['prompt']})")
+        print(f"  - Combined text length: {len(combined_text)}")
+        print(f"  - Estimated prompt tokens: {estimated_tokens}")
+        print(f"  - Images: {len(images) if images else 0}")
+        print(f"{'='*80}\n")
+        
+        started = time.monotonic()
+        try:
+            async with httpx.AsyncClient(timeout=600.0) as client:
+                async with client.stream(
+                    "POST",
+                    f"{self.base_url}/chat/completions",
+                    headers={
+                        "Authorization": f"Bearer {self.api_key}",
+                        "Content-Type": "application/json"
+                    },
+                    json={
+                        **self._completion_payload(messages, route["model"]),
+                        "stream": True,
+                        "stream_options": {"include_usage": True}
+                    }
+                ) as response:
+                    if response.status_code != 200:
+                        await response.aread()
+                        self._raise_api_error(
+                            response.status_code, response.text, response.headers.get("retry-after"), route["model"]
+                        )
+                    
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        data = line[len("data:"):].strip()
+                        if data == "[DONE]":
+                            break
+                        chunk = json.loads(data)
+                        choices = chunk.get("choices") or []
+                        # Usage arrives on the last chunk (top level, or on the choice for Moonshot)
+                        api_usage = chunk.get("usage") or (choices[0].get("usage") if choices else None) or api_usage
+                        delta = (choices[0].get("delta") or {}).get("content") if choices else None
+                        if not delta:
+                            continue
+                        for path, value in parser.feed(delta):
+                            if path[0] == "extracted_fields":
+                                yield {"type": "field", "field": path[1], "value": value}
+                            else:
+                                yield {"type": "meta", "field": path[0], "value": value}
+        except httpx.TimeoutException as e:
+            raise LLMTransientError(f"Kimi API timeout: Request took longer than 600 seconds")
+        except httpx.NetworkError as e:
+            raise LLMTransientError(f"Kimi API network error: {str(e)}")
+        except httpx.HTTPError as e:
+            raise LLMTransientError(f"Kimi API HTTP error: {str(e)}")
+        
+        if not parser.buffer:
+            raise Exception("No response from Kimi API")
+        
+        parsed_result = parser.result()
+        parsed_result["usage"] = self._usage(estimated_tokens, api_usage, started, route)
+        if settings.llm_record_dir:
+            record_response(settings.llm_record_dir, messages, parsed_result)
+        self._print_success(parsed_result)
+        yield {"type": "result", "result": parsed_result}
+    
+    def estimate_prompt_tokens(
+        self,
+        combined_text: str,
+        images: Optional[List[Dict[str, Any]]] = None,
+        prompt: str = "full"
+    ) -> int:
+        """Estimated size of the full extraction request (system prompt + template + input + images)."""
+        system_prompt, user_prompt = self._prompts(combined_text, prompt)
+        return (
+            estimate_tokens(system_prompt)
+            + estimate_tokens(user_prompt)
+            + IMAGE_TOKEN_ESTIMATE * len(images or [])
+        )
+    
+    @staticmethod
+    def _usage(
+        estimated_tokens: int,
+        api_usage: Optional[Dict[str, Any]],
+        started: float,
+        route: Optional[Dict[str, str]] = None
+    ) -> Dict[str, Any]:
+        api_usage = api_usage or {}
+        usage = {
+            "estimated_input_tokens": estimated_tokens,
+            "prompt_tokens": api_usage.get("prompt_tokens"),
+            "completion_tokens": api_usage.get("completion_tokens"),
+            "llm_calls": 1,
+            "latency_ms": int((time.monotonic() - started) * 1000)
+        }
+        if route:
+            usage["route"] = route["route"]
+            usage["model"] = route["model"]
+        return usage
+    
+    async def _combine_file_contents(self, input_text: str, file_ids: Optional[List[str]]) -> str:
+        """Fetch uploaded document contents and append them to the input text."""
+        file_contents = []
+        if file_ids:
+            for file_id in file_ids:
+                try:
+                    content = await self.get_file_content(file_id)
+                    file_contents.append(content)
+                except Exception as e:
+                    print(f"Warning: Failed to extract content from file {file_id}: {str(e)}")
+                    continue
+        
+        combined_text = input_text or ""
+        if file_contents:
+            combined_text += "\n\n--- 文件内容 ---\n" + "\n\n".join(file_contents)
+        return combined_text
+    
+    def _build_messages(
+        self,
+        combined_text: str,
+        images: Optional[List[Dict[str, Any]]] = None,
+        prompt: str = "full"
+    ) -> List[Dict[str, Any]]:
+        system_prompt, user_prompt = self._prompts(combined_text, prompt)
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": self._build_content_parts(user_prompt, images, None)}
+        ]
+    
+    def _prompts(self, combined_text: str, prompt: str = "full"):
+        """(system prompt, user prompt) for the routed prompt variant."""
+        if prompt == "compact":
+            return COMPACT_SYSTEM_PROMPT, self._build_compact_prompt(combined_text)
+        return EXTRACTION_SYSTEM_PROMPT, self._build_extraction_prompt(combined_text)
+    
+    def _completion_payload(self, messages: List[Dict[str, Any]], model: Optional[str] = None) -> Dict[str, Any]:
+        return {
+            "model": model or self.model,
+            "messages": messages,
+            "temperature": 0.6,
+            "thinking": {"type": "disabled"},
+            "response_format": {"type": "json_object"}
+        }
+    
+    def _raise_api_error(
+        self,
+        status_code: int,
+        error_detail: str,
+        retry_after: Optional[str] = None,
+        model: Optional[str] = None
+    ):
+        print(f"\n{'='*80}")
+        print(f"KIMI API ERROR:")
+        print(f"  Status: {status_code}")
+        print(f"  Detail: {error_detail}")
+        print(f"  Model: {model or self.model}")
+        print(f"  URL: {self.base_url}/chat/completions")
+        if retry_after:
+            print(f"  Retry-After: {retry_after}")
+        print(f"{'='*80}\n")
+        message = f"Kimi API request failed (HTTP {status_code}): {error_detail}"
+        if status_code == 429:
+            raise LLMRateLimitError(message, retry_after=parse_retry_after(retry_after))
+        if status_code >= 500:
+            raise LLMTransientError(message, retry_after=parse_retry_after(retry_after))
+        raise Exception(message)
+    
+    @staticmethod
+    def _print_success(parsed_result: Dict[str, Any]):
+        print(f"\n{'='*80}")
+        print(f"KIMI EXTRACTION SUCCESS:")
+        print(f"  - SKU Type: {parsed_result.get('sku_type', 'unknown')}")
+        print(f"  - Fields extracted: {len(parsed_result.get('extracted_fields', {}))}")
+        usage = parsed_result.get("usage") or {}
+        if usage.get("route"):
+            print(f"  - Route: {usage['route']} ({usage.get('model')})")
+        print(f"  - Tokens: {usage.get('prompt_tokens')} prompt / {usage.get('completion_tokens')} completion "
+              f"(estimated {usage.get('estimated_input_tokens')}), {usage.get('latency_ms')} ms")
+        print(f"{'='*80}\n")
     
     def _build_content_parts(
         self, 
@@ -296,9 +587,12 @@ class KimiClient:
         """
         Build multimodal content parts for Kimi K2.5
         Supports: text + images (base64 encoded)
+        Images are EXIF-rotated, downscaled and recompressed before encoding
+        (see ImagePreprocessor); the caller's bytes are never modified.
         Note: file_ids are not used here as Kimi doesn't support 'file' type in chat messages
         """
         parts = []
+        preprocessor = ImagePreprocessor() if settings.image_preprocess_enabled else None
         
         # Add images as base64
         if images:
@@ -311,6 +605,9 @@ class KimiClient:
                         data = img_data
                         mime_type = 'image/jpeg'
                     
+                    if preprocessor and mime_type.startswith('image/'):
+                        data, mime_type = preprocessor.process(data, mime_type)
+                    
                     # Handle both PDF and images - send directly to Kimi API
                     if mime_type == 'application/pdf' or mime_type.startswith('image/'):
                         file_b64 = base64.b64encode(data).decode('utf-8')
@@ -340,6 +637,42 @@ class KimiClient:
         
         return parts
     
+    def _build_reextract_prompt(self, source_text: str, sku_type: Optional[str], fields: Dict[str, Any]) -> str:
+        current = json.dumps(fields, ensure_ascii=False, default=str)
+        return f"""资源类型：{sku_type or "未知"}
+以下字段的提取结果置信度较低，请对照原文重新提取：
+{current}
+
+原文：
+{source_text or "（见图片）"}
+
+返回格式（只包含上面列出的字段）：
+{{"extracted_fields": {{"字段名": 值}}, "confidence": {{"字段名": 0.0-1.0}}, "evidence": {{"字段名": "原文片段"}}}}"""
+    
+    def _build_compact_prompt(self, input_text: str) -> str:
+        """
+        Short prompt for small pasted texts (a WeChat message, a few price lines).
+        Same output structure as _build_extraction_prompt, without the visual/poster guidance.
+        """
+        return f"""从下面的文本中提取旅游资源信息。
+{COMPACT_FIELD_GUIDE}
+返回 JSON：
+{{"sku_type": "...", "category": "...", "extracted_fields": {{...}}, "confidence": {{"字段": 0-1}},
+"evidence": {{"字段": "原文片段"}}, "extraction_notes": "..."}}
+
+文本：
+{input_text}"""
+    
+    def _build_batch_prompt(self, texts: List[str]) -> str:
+        items = "\n\n".join(f"### 条目 {i}\n{text}" for i, text in enumerate(texts, 1))
+        return f"""下面有 {len(texts)} 条互相独立的供应商消息，请分别提取旅游资源信息，不要把不同条目的信息混在一起。
+{COMPACT_FIELD_GUIDE}
+返回 JSON（items 中每个条目一项，index 与条目编号一致）：
+{{"items": [{{"index": 1, "sku_type": "...", "category": "...", "extracted_fields": {{...}},
+"confidence": {{"字段": 0-1}}, "evidence": {{"字段": "原文片段"}}, "extraction_notes": "..."}}]}}
+
+{items}"""
+    
     def _build_extraction_prompt(self, input_text: str) -> str:
         """
         Build extraction prompt optimized for Kimi K2.5
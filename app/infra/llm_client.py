@@ -1,6 +1,8 @@
-﻿from typing import Dict, Any, Optional
+﻿from typing import Dict, Any, Optional, AsyncIterator
 from app.config import get_settings
 from app.infra.kimi_client import KimiClient
+from app.infra.llm_limiter import get_llm_limiter, backoff_delay, RETRYABLE_ERRORS
+import asyncio
 
 settings = get_settings()
 
@@ -29,4 +31,52 @@ class LLMClient:
     async def _parse_with_kimi(self, input_text: str, images: list = None, file_ids: list = None) -> Dict[str, Any]:
         """Use Kimi K2.5 for extraction with native multimodal support"""
         kimi_client = KimiClient()
-        return await kimi_client.parse_sku_input(input_text, images, file_ids)
+        limiter = get_llm_limiter("kimi")
+        return await limiter.run(lambda: kimi_client.parse_sku_input(input_text, images, file_ids))
+    
+    async def parse_sku_batch(self, texts: list) -> Dict[str, Any]:
+        """Several short texts in one call; see KimiClient.parse_sku_batch."""
+        if self.provider != "kimi":
+            raise ValueError(f"Unsupported LLM provider: {self.provider}. Only 'kimi' is supported.")
+        kimi_client = KimiClient()
+        limiter = get_llm_limiter("kimi")
+        return await limiter.run(lambda: kimi_client.parse_sku_batch(texts))
+    
+    async def reextract_fields(
+        self,
+        source_text: str,
+        sku_type: Optional[str],
+        fields: Dict[str, Any],
+        images: list = None
+    ) -> Dict[str, Any]:
+        """Re-prompt only for the given fields (name -> current value) with a short focused prompt."""
+        if self.provider != "kimi":
+            raise ValueError(f"Unsupported LLM provider: {self.provider}. Only 'kimi' is supported.")
+        kimi_client = KimiClient()
+        limiter = get_llm_limiter("kimi")
+        return await limiter.run(lambda: kimi_client.reextract_fields(source_text, sku_type, fields, images))
+    
+    async def stream_sku_input(self, input_text: str, images: list = None, file_ids: list = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming extraction: yields field events, then a final {"type": "result"} event.
+        Failures are retried only while nothing has been yielded yet.
+        """
+        if self.provider == "kimi":
+            kimi_client = KimiClient()
+            limiter = get_llm_limiter("kimi")
+            attempt = 0
+            while True:
+                started = False
+                try:
+                    async with limiter.slot():
+                        async for event in kimi_client.stream_sku_input(input_text, images, file_ids):
+                            started = True
+                            yield event
+                    return
+                except RETRYABLE_ERRORS as e:
+                    attempt += 1
+                    if started or attempt >= settings.llm_max_attempts or not settings.llm_limiter_enabled:
+                        raise
+                    await asyncio.sleep(backoff_delay(attempt, e.retry_after))
+        else:
+            raise ValueError(f"Unsupported LLM provider: {self.provider}. Only 'kimi' is supported.")
@@ -0,0 +1,248 @@
+from typing import Awaitable, Callable, Optional, TypeVar
+from contextlib import asynccontextmanager
+import asyncio
+import random
+import time
+import uuid
+import redis
+from app.config import get_settings
+from app.infra.cache import get_redis
+
+settings = get_settings()
+
+T = TypeVar("T")
+
+
+class LLMRateLimitError(Exception):
+    """Provider returned 429; retry_after comes from the Retry-After header when present."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMTransientError(Exception):
+    """Timeouts, network errors and 5xx responses: safe to retry with backoff."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMUnavailableError(Exception):
+    """Circuit breaker is open or no slot became free in time; the call was not attempted."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+RETRYABLE_ERRORS = (LLMRateLimitError, LLMTransientError, LLMUnavailableError)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Retry-After in seconds (HTTP-date values are ignored)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        return None
+
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    """Retry-After when the provider gives one, else capped exponential backoff; both jittered."""
+    if retry_after:
+        return retry_after + random.uniform(0, min(retry_after * 0.2, 5.0) + 0.5)
+    ceiling = min(settings.llm_backoff_max, settings.llm_backoff_base * (2 ** attempt))
+    return random.uniform(ceiling / 2, ceiling)
+
+
+def retry_countdown(error: BaseException, retries: int) -> int:
+    """Celery countdown for a failed extraction, honouring the provider's hint if one was given."""
+    cause = error if isinstance(error, RETRYABLE_ERRORS) else error.__cause__
+    retry_after = getattr(cause, "retry_after", None)
+    return max(1, int(backoff_delay(retries + 2, retry_after)))
+
+
+# KEYS: inflight, window, breaker_until, cooldown_until
+# ARGV: now, token, lease, initial_window
+# Returns {status, wait}: 1 = acquired, 0 = wait and try again, -1 = breaker open
+_ACQUIRE_SCRIPT = """
+local now = tonumber(ARGV[1])
+local open_until = tonumber(redis.call('GET', KEYS[3]) or '0')
+if open_until > now then
+  return {-1, tostring(open_until - now)}
+end
+local cooldown = tonumber(redis.call('GET', KEYS[4]) or '0')
+if cooldown > now then
+  return {0, tostring(cooldown - now)}
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+local window = tonumber(redis.call('GET', KEYS[2]) or ARGV[4])
+if redis.call('ZCARD', KEYS[1]) < math.max(1, math.floor(window)) then
+  redis.call('ZADD', KEYS[1], now + tonumber(ARGV[3]), ARGV[2])
+  return {1, '0'}
+end
+return {0, '0'}
+"""
+
+# KEYS: inflight, window, failures, breaker_until, cooldown_until
+# ARGV: token, outcome, now, min_window, max_window, initial_window, retry_after,
+#       breaker_threshold, breaker_cooldown
+_RELEASE_SCRIPT = """
+redis.call('ZREM', KEYS[1], ARGV[1])
+local outcome = ARGV[2]
+local now = tonumber(ARGV[3])
+local min_window = tonumber(ARGV[4])
+local window = tonumber(redis.call('GET', KEYS[2]) or ARGV[6])
+if outcome == 'success' then
+  window = math.min(tonumber(ARGV[5]), window + 1 / window)
+  redis.call('DEL', KEYS[3])
+elseif outcome == 'rate_limited' or outcome == 'error' then
+  window = math.max(min_window, window / 2)
+  local retry_after = tonumber(ARGV[7])
+  if outcome == 'rate_limited' and retry_after > 0 then
+    local current = tonumber(redis.call('GET', KEYS[5]) or '0')
+    if now + retry_after > current then
+      redis.call('SET', KEYS[5], tostring(now + retry_after), 'EX', math.ceil(retry_after) + 1)
+    end
+  end
+  local cooldown = tonumber(ARGV[9])
+  local failures = redis.call('INCR', KEYS[3])
+  redis.call('EXPIRE', KEYS[3], math.ceil(cooldown) * 2)
+  if failures >= tonumber(ARGV[8]) then
+    redis.call('SET', KEYS[4], tostring(now + cooldown), 'EX', math.ceil(cooldown) + 1)
+    redis.call('DEL', KEYS[3])
+    window = min_window
+  end
+end
+redis.call('SET', KEYS[2], tostring(window))
+return tostring(window)
+"""
+
+
+class LLMLimiter:
+    """
+    Shared limiter for LLM traffic, coordinated through Redis across API and worker processes.
+
+    - AIMD concurrency window: +1/window per success, halved on 429/timeout/5xx
+    - Retry-After from a 429 pauses every process until the provider's deadline
+    - Circuit breaker: llm_breaker_threshold consecutive failures open it for
+      llm_breaker_cooldown seconds; it then reopens with the minimum window (half-open)
+    - Slots are leased, so a crashed process cannot hold capacity forever
+
+    When Redis is unreachable the limiter fails open rather than blocking extraction.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        prefix = f"tfrm:llm:{name}"
+        self._inflight = f"{prefix}:inflight"
+        self._window = f"{prefix}:window"
+        self._failures = f"{prefix}:failures"
+        self._breaker = f"{prefix}:breaker_until"
+        self._cooldown = f"{prefix}:cooldown_until"
+        self._acquire_script = None
+        self._release_script = None
+
+    def _scripts(self):
+        if self._acquire_script is None:
+            client = get_redis()
+            self._acquire_script = client.register_script(_ACQUIRE_SCRIPT)
+            self._release_script = client.register_script(_RELEASE_SCRIPT)
+        return self._acquire_script, self._release_script
+
+    async def acquire(self) -> Optional[str]:
+        """Wait for a slot; returns a lease token (None when Redis is unavailable)."""
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + settings.llm_acquire_timeout
+        while True:
+            try:
+                acquire_script, _ = self._scripts()
+                status, wait = acquire_script(
+                    keys=[self._inflight, self._window, self._breaker, self._cooldown],
+                    args=[time.time(), token, settings.llm_slot_lease, settings.llm_window_initial]
+                )
+            except redis.RedisError as e:
+                print(f"Warning: LLM limiter unavailable, proceeding without it: {str(e)}")
+                return None
+
+            status, wait = int(status), float(wait)
+            if status == 1:
+                return token
+            if status == -1:
+                raise LLMUnavailableError(
+                    f"LLM provider '{self.name}' circuit breaker is open", retry_after=wait
+                )
+            if time.monotonic() + wait > deadline:
+                raise LLMUnavailableError(
+                    f"No LLM slot available for '{self.name}' within {settings.llm_acquire_timeout}s",
+                    retry_after=max(wait, 1.0)
+                )
+            await asyncio.sleep(max(wait, 0.05) + random.uniform(0, 0.25))
+
+    def release(self, token: Optional[str], outcome: str, retry_after: Optional[float] = None):
+        """outcome: success | rate_limited | error | neutral (non-retryable error, no signal)."""
+        if token is None:
+            return
+        try:
+            _, release_script = self._scripts()
+            release_script(
+                keys=[self._inflight, self._window, self._failures, self._breaker, self._cooldown],
+                args=[
+                    token, outcome, time.time(),
+                    settings.llm_window_min, settings.llm_window_max, settings.llm_window_initial,
+                    retry_after or 0, settings.llm_breaker_threshold, settings.llm_breaker_cooldown
+                ]
+            )
+        except redis.RedisError as e:
+            print(f"Warning: Failed to release LLM slot: {str(e)}")
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one slot for the duration of a request; the outcome is derived from the exception."""
+        if not settings.llm_limiter_enabled:
+            yield
+            return
+        token = await self.acquire()
+        try:
+            yield
+        except LLMRateLimitError as e:
+            self.release(token, "rate_limited", e.retry_after)
+            raise
+        except LLMTransientError:
+            self.release(token, "error")
+            raise
+        except BaseException:
+            self.release(token, "neutral")
+            raise
+        else:
+            self.release(token, "success")
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        """Run call() under a slot, retrying rate limits and transient errors with backoff."""
+        if not settings.llm_limiter_enabled:
+            return await call()
+
+        attempt = 0
+        while True:
+            try:
+                async with self.slot():
+                    return await call()
+            except RETRYABLE_ERRORS as e:
+                attempt += 1
+                if attempt >= settings.llm_max_attempts:
+                    raise
+                delay = backoff_delay(attempt, e.retry_after)
+                print(f"LLM call failed ({type(e).__name__}: {str(e)[:200]}), retry {attempt} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+
+_limiters = {}
+
+
+def get_llm_limiter(name: str) -> LLMLimiter:
+    if name not in _limiters:
+        _limiters[name] = LLMLimiter(name)
+    return _limiters[name]
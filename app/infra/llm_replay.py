@@ -0,0 +1,250 @@
+"""
+Record/replay stand-in for the Kimi (OpenAI-compatible) API, for offline load testing.
+
+Recording: set LLM_RECORD_DIR and run real imports; every successful extraction is
+saved as <request key>.json (the parsed result, keyed by a hash of the request messages).
+
+Replay: run the fake server and point the app at it:
+
+    python -m app.infra.llm_replay --recordings ./llm_recordings --latency-ms 1500 --error-rate 0.02
+    KIMI_BASE_URL=http://127.0.0.1:8900/v1 KIMI_API_KEY=replay uvicorn app.main:app
+
+Identical requests replay their own recording; anything else gets the recordings
+round-robin (or a built-in sample when the directory is empty). With
+--latency-per-1k-tokens-ms, latency grows with prompt size so model/prompt routing
+(app/infra/llm_router.py) can be compared offline; /stats counts requests per model.
+Batched prompts (KimiClient.parse_sku_batch) get one item per "### 条目 N" section.
+"""
+from typing import Any, Dict, List, Optional
+from pathlib import Path
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+import re
+import time
+import uuid
+
+SAMPLE_RESULT = {
+    "sku_type": "hotel",
+    "category": "hotel",
+    "extracted_fields": {
+        "sku_name": "敦煌沙洲大酒店",
+        "hotel_name": "敦煌沙洲大酒店",
+        "destination_city": "敦煌",
+        "room_types": [
+            {"name": "标准间", "price": 480, "currency": "CNY"},
+            {"name": "豪华大床房", "price": 620, "currency": "CNY"}
+        ]
+    },
+    "confidence": {"sku_name": 0.95, "hotel_name": 0.95, "destination_city": 0.9, "room_types": 0.88},
+    "evidence": {"hotel_name": "敦煌沙洲大酒店"},
+    "extraction_notes": "replayed sample"
+}
+
+
+def request_key(messages: List[Dict[str, Any]]) -> str:
+    return hashlib.sha256(
+        json.dumps(messages, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+
+
+def record_response(record_dir: str, messages: List[Dict[str, Any]], parsed_result: Dict[str, Any]):
+    """Save a successful extraction so the replay server can serve it later."""
+    try:
+        path = Path(record_dir)
+        path.mkdir(parents=True, exist_ok=True)
+        result = {k: v for k, v in parsed_result.items() if k != "usage"}
+        key = request_key(messages)
+        (path / f"{key}.json").write_text(
+            json.dumps({"key": key, "result": result}, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+    except Exception as e:
+        print(f"Warning: Failed to record LLM response: {str(e)}")
+
+
+def _user_text(messages: List[Dict[str, Any]]) -> str:
+    parts = []
+    for message in messages:
+        if message.get("role") != "user":
+            continue
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(p.get("text", "") for p in content if isinstance(p, dict))
+    return "\n".join(parts)
+
+
+def create_replay_app(
+    recordings_dir: Optional[str] = None,
+    latency_ms: int = 1000,
+    jitter_ms: int = 300,
+    error_rate: float = 0.0,
+    rate_limit_rate: float = 0.0,
+    retry_after: int = 2,
+    seed: Optional[int] = None,
+    latency_per_1k_tokens_ms: int = 0
+):
+    """
+    FastAPI app speaking the subset of the Moonshot API the import pipeline uses:
+    /v1/chat/completions (plain and streamed), /v1/files upload, metadata and content.
+    """
+    from fastapi import FastAPI, Request, UploadFile, File
+    from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+    from app.infra.tokens import estimate_tokens
+
+    rng = random.Random(seed)
+    recordings: Dict[str, Dict[str, Any]] = {}
+    if recordings_dir and Path(recordings_dir).is_dir():
+        for file in sorted(Path(recordings_dir).glob("*.json")):
+            entry = json.loads(file.read_text(encoding="utf-8"))
+            recordings[entry["key"]] = entry["result"]
+    rotation = itertools.cycle(list(recordings.values()) or [SAMPLE_RESULT])
+    files: Dict[str, Dict[str, Any]] = {}
+    stats = {"requests": 0, "errors": 0, "rate_limited": 0, "exact_hits": 0, "models": {}}
+
+    app = FastAPI(title="LLM replay")
+
+    async def simulate(prompt_tokens: int = 0) -> Optional[JSONResponse]:
+        """Sleep for the configured latency, then maybe inject a failure."""
+        stats["requests"] += 1
+        latency = latency_ms + rng.uniform(-jitter_ms, jitter_ms) + latency_per_1k_tokens_ms * prompt_tokens / 1000
+        await asyncio.sleep(max(0, latency) / 1000)
+        roll = rng.random()
+        if roll < rate_limit_rate:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                {"error": {"message": "rate limit reached (replay)", "type": "rate_limit_reached_error"}},
+                status_code=429,
+                headers={"Retry-After": str(retry_after)}
+            )
+        if roll < rate_limit_rate + error_rate:
+            stats["errors"] += 1
+            return JSONResponse(
+                {"error": {"message": "engine overloaded (replay)", "type": "engine_overloaded_error"}},
+                status_code=503
+            )
+        return None
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages") or []
+        model = body.get("model") or "-"
+        stats["models"][model] = stats["models"].get(model, 0) + 1
+        prompt_tokens = estimate_tokens(json.dumps(messages, ensure_ascii=False))
+        failure = await simulate(prompt_tokens)
+        if failure is not None:
+            return failure
+
+        key = request_key(messages)
+        if key in recordings:
+            stats["exact_hits"] += 1
+            result = recordings[key]
+        else:
+            result = next(rotation)
+        batch_items = re.findall(r"### 条目 (\d+)", _user_text(messages))
+        if batch_items and "items" not in result:
+            result = {"items": [{"index": int(i), **result} for i in batch_items]}
+        content = json.dumps(result, ensure_ascii=False)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": estimate_tokens(content)
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        completion_id = f"chatcmpl-replay-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+
+        if not body.get("stream"):
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": body.get("model"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            }
+
+        async def sse():
+            step = 24
+            for i in range(0, len(content), step):
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "choices": [{"index": 0, "delta": {"content": content[i:i + step]}}]
+                }
+                yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+                await asyncio.sleep(0.005)
+            final = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop", "usage": usage}]
+            }
+            yield f"data: {json.dumps(final, ensure_ascii=False)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(sse(), media_type="text/event-stream")
+
+    @app.post("/v1/files")
+    async def upload_file(file: UploadFile = File(...)):
+        failure = await simulate()
+        if failure is not None:
+            return failure
+        data = await file.read()
+        file_id = f"file-replay-{uuid.uuid4().hex[:12]}"
+        files[file_id] = {"filename": file.filename, "bytes": len(data)}
+        return {"id": file_id, "object": "file", "filename": file.filename, "bytes": len(data), "status": "ok"}
+
+    @app.get("/v1/files/{file_id}")
+    async def get_file(file_id: str):
+        meta = files.get(file_id) or {}
+        return {"id": file_id, "object": "file", "filename": meta.get("filename"), "status": "ok"}
+
+    @app.get("/v1/files/{file_id}/content")
+    async def get_file_content(file_id: str):
+        meta = files.get(file_id) or {}
+        return PlainTextResponse(
+            json.dumps({"filename": meta.get("filename"), "content": "（replay 文件内容）"}, ensure_ascii=False)
+        )
+
+    @app.get("/stats")
+    async def get_stats():
+        return {**stats, "recordings": len(recordings)}
+
+    return app
+
+
+if __name__ == "__main__":
+    import argparse
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Replay recorded LLM responses (OpenAI-compatible)")
+    parser.add_argument("--recordings", default="./llm_recordings")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency-ms", type=int, default=1000)
+    parser.add_argument("--jitter-ms", type=int, default=300)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 503")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--latency-per-1k-tokens-ms", type=int, default=0, help="extra latency per 1000 prompt tokens")
+    args = parser.parse_args()
+
+    uvicorn.run(
+        create_replay_app(
+            args.recordings, args.latency_ms, args.jitter_ms,
+            args.error_rate, args.rate_limit_rate, args.retry_after, args.seed,
+            args.latency_per_1k_tokens_ms
+        ),
+        host=args.host,
+        port=args.port
+    )
@@ -0,0 +1,33 @@
+"""
+Picks the model and prompt variant for an extraction request.
+
+    vision        images/PDF pages attached      -> KIMI_VISION_MODEL, full prompt
+    text_compact  short text (<= LLM_ROUTE_SHORT_TOKENS) -> KIMI_TEXT_MODEL, compact prompt
+    text          longer text                    -> KIMI_TEXT_MODEL, full prompt
+
+Empty model settings fall back to KIMI_MODEL, so routing only changes the prompt
+until a faster text model is configured.
+"""
+from typing import Any, Dict, List, Optional
+from app.config import get_settings
+from app.infra.tokens import estimate_tokens
+
+settings = get_settings()
+
+ROUTE_VISION = "vision"
+ROUTE_TEXT_COMPACT = "text_compact"
+ROUTE_TEXT = "text"
+
+
+def route_request(input_text: Optional[str], images: Optional[List[Dict[str, Any]]] = None) -> Dict[str, str]:
+    """{"route", "model", "prompt"} for one extraction call."""
+    if not settings.llm_routing_enabled:
+        return {"route": "default", "model": settings.kimi_model, "prompt": "full"}
+
+    if images:
+        return {"route": ROUTE_VISION, "model": settings.kimi_vision_model or settings.kimi_model, "prompt": "full"}
+
+    text_model = settings.kimi_text_model or settings.kimi_model
+    if estimate_tokens(input_text or "") <= settings.llm_route_short_tokens:
+        return {"route": ROUTE_TEXT_COMPACT, "model": text_model, "prompt": "compact"}
+    return {"route": ROUTE_TEXT, "model": text_model, "prompt": "full"}
@@ -0,0 +1,173 @@
+from typing import Dict, Any, List, Optional
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import multiprocessing
+import threading
+from app.config import get_settings
+from app.infra.cache import CacheClient, content_hash
+from app.infra.pdf_pages import count_pdf_pages, has_text_layer, render_pdf_pages
+
+settings = get_settings()
+
+# Per worker process OCR engine (models are loaded once per process)
+_engine = None
+_engine_name = None
+
+
+def _load_engine():
+    """Prefer PaddleOCR (Python<3.12), fall back to EasyOCR."""
+    global _engine, _engine_name
+    if _engine is not None:
+        return _engine, _engine_name
+    try:
+        from paddleocr import PaddleOCR
+        _engine = PaddleOCR(use_angle_cls=True, lang="ch", show_log=False)
+        _engine_name = "paddleocr"
+    except ImportError:
+        import easyocr
+        _engine = easyocr.Reader(["ch_sim", "en"], gpu=False, verbose=False)
+        _engine_name = "easyocr"
+    return _engine, _engine_name
+
+
+def _recognize(image_bytes: bytes) -> Dict[str, Any]:
+    """Runs inside the OCR process pool. Returns text in reading order plus mean confidence."""
+    from io import BytesIO
+    from PIL import Image, ImageOps
+    import numpy as np
+
+    engine, engine_name = _load_engine()
+
+    with Image.open(BytesIO(image_bytes)) as img:
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        array = np.array(img)
+
+    # (top, left, text, confidence)
+    boxes = []
+    if engine_name == "paddleocr":
+        result = engine.ocr(array, cls=True) or []
+        for line in (result[0] or []) if result else []:
+            box, (text, conf) = line
+            boxes.append((min(p[1] for p in box), min(p[0] for p in box), text, float(conf)))
+    else:
+        for box, text, conf in engine.readtext(array):
+            boxes.append((min(p[1] for p in box), min(p[0] for p in box), text, float(conf)))
+
+    boxes.sort(key=lambda b: (round(b[0] / 12), b[1]))
+    texts = [b[2] for b in boxes if b[2] and b[2].strip()]
+    # Weight by text length so one-character noise does not dominate the score
+    total_chars = sum(len(b[2]) for b in boxes) or 1
+    confidence = sum(b[3] * len(b[2]) for b in boxes) / total_chars if boxes else 0.0
+
+    return {
+        "text": "\n".join(texts),
+        "confidence": round(confidence, 4),
+        "line_count": len(texts),
+        "engine": engine_name
+    }
+
+
+class OCRService:
+    """
+    Local OCR pre-pass for images and scanned PDFs.
+    Recognition runs in a process pool (CPU-bound, keeps the event loop free)
+    and results are cached by content hash so retries/re-imports are free.
+    """
+
+    _executor: Optional[ProcessPoolExecutor] = None
+    _executor_lock = threading.Lock()
+    _unavailable = False
+    _cache = CacheClient("ocr", ttl=settings.ocr_cache_ttl)
+
+    @classmethod
+    def _get_executor(cls) -> ProcessPoolExecutor:
+        if cls._executor is None:
+            with cls._executor_lock:
+                if cls._executor is None:
+                    cls._executor = ProcessPoolExecutor(
+                        max_workers=settings.ocr_workers,
+                        mp_context=multiprocessing.get_context("spawn")
+                    )
+        return cls._executor
+
+    @classmethod
+    def is_available(cls) -> bool:
+        return settings.ocr_enabled and not cls._unavailable
+
+    @classmethod
+    def get_cached(cls, data: bytes) -> Optional[Dict[str, Any]]:
+        return cls._cache.get(content_hash(data))
+
+    @classmethod
+    async def recognize_image(cls, data: bytes) -> Optional[Dict[str, Any]]:
+        if not cls.is_available():
+            return None
+
+        key = content_hash(data)
+        cached = cls._cache.get(key)
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(cls._get_executor(), _recognize, data)
+        except ImportError as e:
+            print(f"Warning: No OCR engine installed, disabling OCR pre-pass: {str(e)}")
+            cls._unavailable = True
+            return None
+
+        cls._cache.set(key, result)
+        return result
+
+    @classmethod
+    async def recognize_pdf(cls, data: bytes) -> Optional[Dict[str, Any]]:
+        """
+        Rasterize a scanned PDF with pdf2image and OCR pages in parallel.
+        Returns None for PDFs over OCR_PDF_MAX_PAGES: text for only the first pages would
+        silently replace the whole document.
+        """
+        if not cls.is_available():
+            return None
+
+        key = content_hash(data)
+        cached = cls._cache.get(key)
+        if cached is not None:
+            return cached
+
+        loop = asyncio.get_running_loop()
+        page_count = await loop.run_in_executor(None, count_pdf_pages, data)
+        if not page_count or page_count > settings.ocr_pdf_max_pages:
+            return None
+
+        page_bytes: List[bytes] = await loop.run_in_executor(
+            None, render_pdf_pages, data, settings.ocr_pdf_dpi, settings.ocr_pdf_max_pages
+        )
+
+        page_results = await asyncio.gather(*(cls.recognize_image(p) for p in page_bytes))
+        if any(r is None for r in page_results):
+            return None
+
+        total_chars = sum(len(r["text"]) for r in page_results) or 1
+        result = {
+            "text": "\n\n".join(f"--- 第{i}页 ---\n{r['text']}" for i, r in enumerate(page_results, 1)),
+            "confidence": round(sum(r["confidence"] * len(r["text"]) for r in page_results) / total_chars, 4),
+            "line_count": sum(r["line_count"] for r in page_results),
+            "engine": page_results[0]["engine"] if page_results else None,
+            "pages": len(page_results)
+        }
+        cls._cache.set(key, result)
+        return result
+
+    @staticmethod
+    def is_scanned_pdf(data: bytes) -> bool:
+        """A PDF whose first pages have no extractable text (blocking: runs pdftotext)."""
+        return data[:5] == b"%PDF-" and has_text_layer(data) is False
+
+    @staticmethod
+    def is_confident(result: Optional[Dict[str, Any]]) -> bool:
+        """Whether OCR text is good enough to replace the image in the LLM prompt."""
+        return bool(
+            result
+            and result["confidence"] >= settings.ocr_min_confidence
+            and len(result["text"].strip()) >= settings.ocr_min_chars
+        )
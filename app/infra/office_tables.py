@@ -0,0 +1,194 @@
+"""
+Dependency-free readers for DOCX and XLSX that keep table structure.
+Both stream the XML with iterparse so large documents are never held as a full tree.
+"""
+from typing import Dict, Iterator, List, Tuple, Union
+from xml.etree import ElementTree as ET
+import io
+import posixpath
+import re
+import zipfile
+
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+_S = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_R = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}"
+_PR = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+
+Block = Tuple[str, Union[str, List[List[str]]]]
+
+
+def iter_docx_blocks(data: bytes) -> Iterator[Block]:
+    """
+    Yield ("paragraph", text) and ("table", rows) in document order.
+    Nested tables are flattened into the text of the enclosing cell.
+    """
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        with zf.open("word/document.xml") as xml:
+            table_depth = 0
+            rows: List[List[str]] = []
+            row: List[str] = []
+            cell_parts: List[str] = []
+            paragraph: List[str] = []
+
+            for event, elem in ET.iterparse(xml, events=("start", "end")):
+                tag = elem.tag
+                if event == "start":
+                    if tag == f"{_W}tbl":
+                        table_depth += 1
+                        if table_depth == 1:
+                            rows = []
+                    elif tag == f"{_W}tr" and table_depth == 1:
+                        row = []
+                    elif tag == f"{_W}tc" and table_depth == 1:
+                        cell_parts = []
+                    elif tag == f"{_W}p":
+                        paragraph = []
+                    continue
+
+                if tag == f"{_W}t" and elem.text:
+                    paragraph.append(elem.text)
+                elif tag == f"{_W}tab":
+                    paragraph.append("\t")
+                elif tag == f"{_W}p":
+                    text = "".join(paragraph).strip()
+                    if table_depth:
+                        if text:
+                            cell_parts.append(text)
+                    elif text:
+                        yield ("paragraph", text)
+                    paragraph = []
+                elif tag == f"{_W}tc" and table_depth == 1:
+                    row.append(" ".join(cell_parts))
+                elif tag == f"{_W}tr" and table_depth == 1:
+                    if any(c.strip() for c in row):
+                        rows.append(row)
+                elif tag == f"{_W}tbl":
+                    table_depth -= 1
+                    if table_depth == 0 and rows:
+                        yield ("table", rows)
+                elif tag == f"{_W}body":
+                    pass
+                else:
+                    continue
+                # Finished paragraphs/cells/rows are no longer needed
+                elem.clear()
+
+
+def _column_index(ref: str) -> int:
+    letters = re.match(r"[A-Z]+", ref or "")
+    if not letters:
+        return -1
+    index = 0
+    for ch in letters.group(0):
+        index = index * 26 + (ord(ch) - ord("A") + 1)
+    return index - 1
+
+
+def _shared_strings(zf: zipfile.ZipFile) -> List[str]:
+    if "xl/sharedStrings.xml" not in zf.namelist():
+        return []
+    strings = []
+    with zf.open("xl/sharedStrings.xml") as xml:
+        parts: List[str] = []
+        for event, elem in ET.iterparse(xml, events=("end",)):
+            if elem.tag == f"{_S}t" and elem.text:
+                parts.append(elem.text)
+            elif elem.tag == f"{_S}si":
+                strings.append("".join(parts))
+                parts = []
+                elem.clear()
+    return strings
+
+
+def _sheet_paths(zf: zipfile.ZipFile) -> List[Tuple[str, str]]:
+    """(sheet name, part path) in workbook order."""
+    rels = {}
+    with zf.open("xl/_rels/workbook.xml.rels") as xml:
+        for rel in ET.parse(xml).getroot().iter(f"{_PR}Relationship"):
+            target = rel.get("Target", "")
+            path = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+            rels[rel.get("Id")] = path
+    sheets = []
+    with zf.open("xl/workbook.xml") as xml:
+        for sheet in ET.parse(xml).getroot().iter(f"{_S}sheet"):
+            path = rels.get(sheet.get(f"{_R}id"))
+            if path and path in zf.namelist():
+                sheets.append((sheet.get("name") or path, path))
+    return sheets
+
+
+def _format_number(value: str) -> str:
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    return str(int(number)) if number.is_integer() else str(number)
+
+
+def read_xlsx(data: bytes, max_rows: int = 5000) -> Dict[str, List[List[str]]]:
+    """Sheet name -> rows of cell strings (merged cells keep their value in the top-left cell only)."""
+    sheets: Dict[str, List[List[str]]] = {}
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        strings = _shared_strings(zf)
+        for name, path in _sheet_paths(zf):
+            rows: List[List[str]] = []
+            with zf.open(path) as xml:
+                row: Dict[int, str] = {}
+                cell_type, cell_ref, value, inline = None, None, None, []
+                for event, elem in ET.iterparse(xml, events=("start", "end")):
+                    tag = elem.tag
+                    if event == "start":
+                        if tag == f"{_S}c":
+                            cell_type, cell_ref, value, inline = elem.get("t"), elem.get("r"), None, []
+                        elif tag == f"{_S}row":
+                            row = {}
+                        continue
+
+                    if tag == f"{_S}v":
+                        value = elem.text
+                    elif tag == f"{_S}t" and elem.text:
+                        inline.append(elem.text)
+                    elif tag == f"{_S}c":
+                        if cell_type == "s" and value is not None:
+                            text = strings[int(value)] if int(value) < len(strings) else ""
+                        elif cell_type == "inlineStr":
+                            text = "".join(inline)
+                        elif cell_type == "b":
+                            text = "TRUE" if value == "1" else "FALSE"
+                        elif cell_type in ("str", "e"):
+                            text = value or ""
+                        else:
+                            text = _format_number(value) if value is not None else ""
+                        index = _column_index(cell_ref) if cell_ref else len(row)
+                        if text.strip() and index >= 0:
+                            row[index] = text.strip()
+                        elem.clear()
+                    elif tag == f"{_S}row":
+                        if row:
+                            width = max(row) + 1
+                            rows.append([row.get(i, "") for i in range(width)])
+                        elem.clear()
+                        if len(rows) >= max_rows:
+                            break
+            if rows:
+                sheets[name] = rows
+    return sheets
+
+
+def table_to_text(rows: List[List[str]]) -> str:
+    """Render a table as pipe-separated lines so row/column structure survives in a prompt."""
+    return "\n".join(" | ".join(cell.replace("\n", " ") for cell in row) for row in rows)
+
+
+def docx_to_text(data: bytes) -> str:
+    parts = []
+    for kind, content in iter_docx_blocks(data):
+        parts.append(table_to_text(content) if kind == "table" else content)
+    return "\n".join(parts).strip()
+
+
+def xlsx_to_text(data: bytes) -> str:
+    parts = []
+    for name, rows in read_xlsx(data).items():
+        parts.append(f"--- 工作表: {name} ---\n{table_to_text(rows)}")
+    return "\n\n".join(parts).strip()
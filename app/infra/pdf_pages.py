@@ -0,0 +1,46 @@
+from typing import List, Optional
+from io import BytesIO
+import subprocess
+import tempfile
+
+
+def count_pdf_pages(data: bytes) -> Optional[int]:
+    """Page count via poppler's pdfinfo; None if the PDF cannot be inspected."""
+    from pdf2image import pdfinfo_from_bytes
+    try:
+        return int(pdfinfo_from_bytes(data).get("Pages", 0)) or None
+    except Exception as e:
+        print(f"Warning: Failed to read PDF info: {str(e)}")
+        return None
+
+
+def has_text_layer(data: bytes, max_pages: int = 3, min_chars: int = 20) -> Optional[bool]:
+    """
+    Whether the first pages have extractable text, via poppler's pdftotext (so fonts in
+    compressed object streams are handled); None if the PDF cannot be inspected. Blocking.
+    """
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf_file:
+        pdf_file.write(data)
+        pdf_file.flush()
+        try:
+            output = subprocess.run(
+                ["pdftotext", "-q", "-l", str(max_pages), pdf_file.name, "-"],
+                capture_output=True, timeout=30, check=True
+            ).stdout
+        except (OSError, subprocess.SubprocessError) as e:
+            print(f"Warning: Failed to read PDF text layer: {str(e)}")
+            return None
+    return len(output.decode("utf-8", errors="ignore").strip()) >= min_chars
+
+
+def render_pdf_pages(data: bytes, dpi: int = 150, max_pages: Optional[int] = None, quality: int = 90) -> List[bytes]:
+    """Rasterize PDF pages to JPEG bytes (blocking, run it off the event loop)."""
+    from pdf2image import convert_from_bytes
+
+    pages = convert_from_bytes(data, dpi=dpi, last_page=max_pages)
+    rendered = []
+    for page in pages:
+        buf = BytesIO()
+        page.convert("RGB").save(buf, format="JPEG", quality=quality)
+        rendered.append(buf.getvalue())
+    return rendered
@@ -18,6 +18,13 @@ celery_app.conf.update(
     task_track_started=True,
     task_time_limit=300,
     task_soft_time_limit=240,
+    beat_schedule={
+        # Re-queue micro-batches claimed by a worker that died before acking them
+        "requeue-stale-import-batches": {
+            "task": "app.domain.imports.tasks.requeue_stale_import_batches",
+            "schedule": 60.0,
+        },
+    },
 )
 
 # 导入任务模块以注册任务
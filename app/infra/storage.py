@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import BinaryIO
+from typing import BinaryIO, Optional
 import uuid
 import shutil
 from app.config import get_settings
@@ -49,3 +49,22 @@ class StorageClient:
         if storage_root not in full_path.parents and full_path != storage_root:
             raise ValueError("Invalid file path")
         return full_path
+
+    def read_bytes(self, file_path: str) -> Optional[bytes]:
+        """Contents of a stored file, or None if it does not exist."""
+        try:
+            return self.resolve_local_path(file_path).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def write_bytes(self, file_path: str, data: bytes):
+        """Write to a fixed path (derived artifacts; uploads go through upload_file)."""
+        full_path = self.resolve_local_path(file_path)
+        full_path.parent.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so concurrent readers never see a partial file
+        tmp_path = full_path.with_name(f".{full_path.name}.{uuid.uuid4().hex}")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(full_path)
+
+    def delete_folder(self, folder: str):
+        shutil.rmtree(self.resolve_local_path(folder), ignore_errors=True)
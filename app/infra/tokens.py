@@ -0,0 +1,77 @@
+from typing import List
+import re
+
+# Rough per-image cost after preprocessing (images are downscaled to image_max_edge)
+IMAGE_TOKEN_ESTIMATE = 1024
+
+_CJK_RE = re.compile(r"[\u3000-\u303f\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate without a tokenizer.
+    CJK characters count as one token each, everything else as ~4 characters per token.
+    Deliberately errs on the high side so the budget check is conservative.
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_RE.findall(text))
+    other = len(text) - cjk
+    return cjk + (other + 3) // 4
+
+
+def split_text_by_tokens(text: str, max_tokens: int, overlap_tokens: int = 0) -> List[str]:
+    """
+    Split text into chunks of at most max_tokens (estimated), breaking on paragraph
+    and line boundaries where possible. Consecutive chunks share up to overlap_tokens
+    of trailing lines so a table row or sentence cut at a boundary appears in both.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+
+    lines: List[str] = []
+    for line in text.splitlines():
+        # A single huge line (e.g. a flattened table) is cut by characters
+        while estimate_tokens(line) > max_tokens:
+            cut = _prefix_length(line, max_tokens)
+            lines.append(line[:cut])
+            line = line[cut:]
+        lines.append(line)
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    for line in lines:
+        line_tokens = estimate_tokens(line) + 1
+        if current and current_tokens + line_tokens > max_tokens:
+            chunks.append("\n".join(current))
+            current, current_tokens = _overlap_tail(current, overlap_tokens, max_tokens - line_tokens)
+        current.append(line)
+        current_tokens += line_tokens
+    if current and any(l.strip() for l in current):
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _prefix_length(line: str, max_tokens: int) -> int:
+    lo, hi = 1, len(line)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(line[:mid]) <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def _overlap_tail(lines: List[str], overlap_tokens: int, room: int):
+    tail: List[str] = []
+    tokens = 0
+    limit = min(overlap_tokens, room)
+    for line in reversed(lines):
+        line_tokens = estimate_tokens(line) + 1
+        if tokens + line_tokens > limit:
+            break
+        tail.insert(0, line)
+        tokens += line_tokens
+    return tail, tokens
@@ -1,11 +1,12 @@
 from fastapi import FastAPI, Depends, HTTPException, status, UploadFile, File, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi.responses import StreamingResponse, FileResponse, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional, Tuple
 import logging
 import sys
 import io
+import json
 
 # Configure logging
 logging.basicConfig(
@@ -15,7 +16,7 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-from app.infra.db import get_db, init_db
+from app.infra.db import get_db, init_db, SessionLocal
 from app.infra.audit import audit_log
 from app.domain.auth.schemas import UserCreate, UserLogin, Token, UserResponse
 from app.domain.auth.service import AuthService
@@ -23,10 +24,19 @@ from app.domain.auth.dependencies import get_current_user, get_current_user_opti
 from app.domain.skus.schemas import SKUCreate, SKUUpdate, SKUResponse
 from app.domain.skus.pricing_schemas import PriceCalendarUpdate, BatchPricingUpdate, BatchSKUUpdate, BatchSKUDelete, AvailabilityResponse
 from app.domain.skus.service import SKUService
-from app.domain.imports.schemas import ImportTaskCreate, ImportTaskResponse, ImportConfirm
+from app.domain.imports.schemas import (
+    ImportTaskCreate, ImportTaskResponse, ImportConfirm, ImportBatchConfirm, ImportReextract,
+    SupplierTemplateCreate, SupplierTemplateResponse
+)
 from app.domain.imports.service import ImportService
-from app.domain.quotations.schemas import QuotationCreate, QuotationUpdate, QuotationResponse, QuotationItemResponse
-from app.domain.quotations.service import QuotationService
+from app.domain.imports.templates import SupplierTemplateService
+from app.domain.quotations.schemas import QuotationCreate, QuotationUpdate, QuotationResponse, QuotationItemResponse, QuotationRepriceResult, QuotationListItem
+from app.domain.quotations.schemas import QuotationTemplateBulkCreate, QuotationTemplateBulkResult
+from app.domain.quotations.service import QuotationService, MissingSKUError
+from app.domain.quotations import pdf_cache
+from app.domain.quotations import share as quotation_share
+from app.domain.quotations.pdf_renderer import PDFRenderBusyError
+from app.domain.quotations.impact import QuotationImpactService
 from app.domain.pricing.service import PricingService
 from app.domain.products.schemas import ProductCreate, ProductUpdate, ProductResponse
 from app.domain.products.service import ProductService
@@ -37,9 +47,10 @@ from app.domain.cooperations.service import CooperationService
 from app.domain.notifications.schemas import NotificationResponse, NotificationMarkRead
 from app.domain.notifications.service import NotificationService
 from app.infra.storage import StorageClient
+from app.infra.http_cache import make_etag, etag_matches
 from app.config import get_settings
 
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 settings = get_settings()
 
@@ -392,6 +403,18 @@ def update_sku(
     return sku
 
 
+@app.get("/skus/{sku_id}/quotations")
+def get_sku_quotation_impact(
+    sku_id: str,
+    current_user: Tuple[str, str, str] = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Open (draft/published) quotations that use this SKU"""
+    user_id, agency_id, username = current_user
+    quotation_ids = QuotationImpactService.affected_quotation_ids(db, agency_id, [sku_id])
+    return {"sku_id": sku_id, "quotation_ids": quotation_ids, "count": len(quotation_ids)}
+
+
 @app.delete("/skus/{sku_id}")
 def delete_sku(
     sku_id: str,
@@ -491,10 +514,90 @@ def confirm_import_task(
     db: Session = Depends(get_db)
 ):
     user_id, agency_id, username = current_user
-    sku_id = ImportService.confirm_import(db, agency_id, user_id, task_id, confirm_data)
-    if not sku_id:
+    result = ImportService.confirm_import(db, agency_id, user_id, task_id, confirm_data)
+    if not result:
         raise HTTPException(status_code=400, detail="Cannot confirm import task")
-    return {"message": "Import confirmed", "sku_id": sku_id}
+    return {"message": "Import confirmed", **result}
+
+
+@app.post("/imports/{task_id}/re-extract", response_model=ImportTaskResponse)
+async def reextract_import_fields(
+    task_id: str,
+    reextract_data: ImportReextract,
+    current_user: Tuple[str, str, str] = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Re-extract only low-confidence (or the listed) fields of a parsed import task."""
+    user_id, agency_id, username = current_user
+    try:
+        task = await ImportService.reextract_fields(
+            db, agency_id, user_id, task_id, reextract_data.fields, reextract_data.threshold
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"Error in reextract_fields: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Re-extraction failed: {str(e)}")
+    if not task:
+        raise HTTPException(status_code=400, detail="Cannot re-extract import task")
+    return task
+
+
+@app.post("/imports/{task_id}/template", response_model=SupplierTemplateResponse)
+async def save_import_as_template(
+    task_id: str,
+    template_data: SupplierTemplateCreate,
+    current_user: Tuple[str, str, str] = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Learn a supplier template from a confirmed import so the same layout skips the LLM next time."""
+    user_id, agency_id, username = current_user
+    try:
+        template = await ImportService.save_as_template(db, agency_id, user_id, task_id, template_data.name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not template:
+        raise HTTPException(status_code=404, detail="Import task not found")
+    return template
+
+
+@app.get("/supplier-templates", response_model=List[SupplierTemplateResponse])
+def list_supplier_templates(
+    current_user: Tuple[str, str, str] = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    user_id, agency_id, username = current_user
+    return SupplierTemplateService.list_templates(db, agency_id)
+
+
+@app.delete("/supplier-templates/{template_id}")
+def delete_supplier_template(
+    template_id: str,
+    current_user: Tuple[str, str, str] = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    user_id, agency_id, username = current_user
+    if not SupplierTemplateService.delete_template(db, agency_id, user_id, template_id):
+        raise HTTPException(status_code=404, detail="Supplier template not found")
+    return {"message": "Supplier template deleted successfully"}
+
+
+@app.post("/imports/batch-confirm")
+def batch_confirm_import_tasks(
+    confirm_data: ImportBatchConfirm,
+    current_user: Tuple[str, str, str] = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Confirm many parsed import tasks at once; valid tasks are written all-or-nothing, failures are reported per task."""
+    user_id, agency_id, username = current_user
+    results = ImportService.confirm_imports(db, agency_id, user_id, confirm_data.items)
+    confirmed = sum(1 for r in results if r["status"] == "confirmed")
+    return {
+        "message": f"Confirmed {confirmed} of {len(results)} import tasks",
+        "confirmed": confirmed,
+        "failed": len(results) - confirmed,
+        "results": results
+    }
 
 
 @app.delete("/imports/{task_id}")
@@ -548,25 +651,8 @@ async def upload_import_file(
     }
 
 
-@app.post("/imports/extract", response_model=ImportTaskResponse)
-async def extract_with_ai(
-    request: Request,
-    current_user: Tuple[str, str, str] = Depends(get_current_user_optional),
-    db: Session = Depends(get_db)
-):
-    """
-    AI-powered extraction endpoint supporting GetYourGuide 4-layer architecture
-    Accepts either text input or file upload (images, PDFs)
-    """
-    logger.info("="*80)
-    logger.info("EXTRACT ENDPOINT CALLED")
-    logger.info(f"  - User: {current_user[2]}")
-    logger.info(f"  - Agency: {current_user[1]}")
-    logger.info(f"  - Content-Type: {request.headers.get('content-type')}")
-    logger.info("="*80)
-    
-    user_id, agency_id, username = current_user
-    
+async def _read_extract_form(request: Request) -> Tuple[Optional[str], Optional[bytes], Optional[str], Optional[str]]:
+    """Parse the extract FormData: (input_text, file_data, file_mime_type, original_filename)"""
     input_text = None
     file_data = None
     file_mime_type = None
@@ -596,6 +682,30 @@ async def extract_with_ai(
         logger.error(f"Validation failed - no input_text or file provided")
         raise HTTPException(status_code=400, detail="Either input_text or file must be provided")
     
+    return input_text, file_data, file_mime_type, original_filename
+
+
+@app.post("/imports/extract", response_model=ImportTaskResponse)
+async def extract_with_ai(
+    request: Request,
+    current_user: Tuple[str, str, str] = Depends(get_current_user_optional),
+    db: Session = Depends(get_db)
+):
+    """
+    AI-powered extraction endpoint supporting GetYourGuide 4-layer architecture
+    Accepts either text input or file upload (images, PDFs)
+    """
+    logger.info("="*80)
+    logger.info("EXTRACT ENDPOINT CALLED")
+    logger.info(f"  - User: {current_user[2]}")
+    logger.info(f"  - Agency: {current_user[1]}")
+    logger.info(f"  - Content-Type: {request.headers.get('content-type')}")
+    logger.info("="*80)
+    
+    user_id, agency_id, username = current_user
+    
+    input_text, file_data, file_mime_type, original_filename = await _read_extract_form(request)
+    
     try:
         task = await ImportService.extract_with_ai(
             db, agency_id, user_id, input_text, file_data, file_mime_type, original_filename
@@ -606,6 +716,42 @@ async def extract_with_ai(
         raise HTTPException(status_code=500, detail=f"Extraction failed: {str(e)}")
 
 
+@app.post("/imports/extract/stream")
+async def stream_extract_with_ai(
+    request: Request,
+    current_user: Tuple[str, str, str] = Depends(get_current_user_optional)
+):
+    """
+    Streaming AI extraction (same FormData as /imports/extract).
+    Responds with NDJSON: a "task" event, one "field" event per extracted field
+    as soon as the model finishes it, then a "done" event carrying the ImportTask.
+    """
+    user_id, agency_id, username = current_user
+    
+    input_text, file_data, file_mime_type, original_filename = await _read_extract_form(request)
+    
+    async def event_stream():
+        # The request-scoped session is closed before a streaming body is sent,
+        # so the generator owns its own session
+        db = SessionLocal()
+        try:
+            async for event in ImportService.stream_extract_with_ai(
+                db, agency_id, user_id, input_text, file_data, file_mime_type, original_filename
+            ):
+                yield json.dumps(event, ensure_ascii=False, default=str) + "\n"
+        except Exception as e:
+            logger.error(f"Error in stream_extract_with_ai: {str(e)}", exc_info=True)
+            yield json.dumps({"event": "error", "detail": f"Extraction failed: {str(e)}"}, ensure_ascii=False) + "\n"
+        finally:
+            db.close()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.post("/quotations", response_model=QuotationResponse)
 def create_quotation(
     quotation_data: QuotationCreate,
@@ -613,10 +759,28 @@ def create_quotation(
     db: Session = Depends(get_db)
 ):
     user_id, agency_id, username = current_user
-    quotation = QuotationService.create_quotation(db, agency_id, user_id, quotation_data)
+    try:
+        quotation = QuotationService.create_quotation(db, agency_id, user_id, quotation_data)
+    except MissingSKUError as e:
+        raise HTTPException(status_code=400, detail={"message": str(e), "missing_sku_ids": e.sku_ids})
     return quotation
 
 
+@app.post("/quotations/bulk-from-template", response_model=List[QuotationTemplateBulkResult])
+def create_quotations_from_template(
+    template_data: QuotationTemplateBulkCreate,
+    current_user: Tuple[str, str, str] = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Create one quotation per customer from a shared item list (all or nothing)"""
+    user_id, agency_id, username = current_user
+    try:
+        results = QuotationService.create_from_template(db, agency_id, user_id, template_data)
+    except MissingSKUError as e:
+        raise HTTPException(status_code=400, detail={"message": str(e), "missing_sku_ids": e.sku_ids})
+    return results
+
+
 @app.get("/quotations/{quotation_id}", response_model=QuotationResponse)
 def get_quotation(
     quotation_id: str,
@@ -659,6 +823,21 @@ def update_quotation(
     return quotation
 
 
+@app.post("/quotations/{quotation_id}/reprice", response_model=QuotationRepriceResult)
+def reprice_quotation(
+    quotation_id: str,
+    force: bool = False,
+    current_user: Tuple[str, str, str] = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Re-price lines whose SKU or pricing data changed (force=true re-prices every line)"""
+    user_id, agency_id, username = current_user
+    result = QuotationService.reprice_quotation(db, agency_id, user_id, quotation_id, force)
+    if not result:
+        raise HTTPException(status_code=404, detail="Quotation not found")
+    return result
+
+
 @app.post("/quotations/{quotation_id}/publish")
 def publish_quotation(
     quotation_id: str,
@@ -672,9 +851,37 @@ def publish_quotation(
     return {"message": "Quotation published", "url": published_url}
 
 
+@app.get("/quotations/export/zip")
+def export_quotations_zip(
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    status: Optional[str] = None,
+    current_user: Tuple[str, str, str] = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Export quotations created in [created_from, created_to) as a zip of PDFs"""
+    user_id, agency_id, username = current_user
+    
+    max_count = settings.pdf_bulk_export_max
+    quotations = QuotationService.list_quotations_with_items(
+        db, agency_id, created_from, created_to, status, limit=max_count + 1
+    )
+    if len(quotations) > max_count:
+        raise HTTPException(status_code=400, detail=f"Too many quotations to export at once (max {max_count}), narrow the date range")
+    
+    return StreamingResponse(
+        pdf_cache.export_zip(quotations),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f"attachment; filename=quotations_{agency_id}.zip"
+        }
+    )
+
+
 @app.get("/quotations/{quotation_id}/export/pdf")
 def export_quotation_pdf(
     quotation_id: str,
+    request: Request,
     current_user: Tuple[str, str, str] = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
@@ -689,39 +896,27 @@ def export_quotation_pdf(
     # Get items
     items = QuotationService.get_quotation_items(db, quotation_id)
     
-    # Convert to dict for PDF generator
-    from app.domain.quotations.pdf_generator import QuotationPDFGenerator
+    # Unchanged quotation: let the client reuse its copy
+    version = pdf_cache.pdf_version(quotation, items)
+    etag = make_etag(version)
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers)
     
-    quotation_dict = {
-        'id': quotation.id,
-        'title': quotation.title,
-        'customer_name': quotation.customer_name,
-        'customer_contact': quotation.customer_contact,
-        'total_amount': quotation.total_amount,
-        'discount_amount': quotation.discount_amount,
-        'final_amount': quotation.final_amount,
-        'notes': quotation.notes
-    }
-    
-    items_list = [
-        {
-            'snapshot': item.snapshot,
-            'quantity': item.quantity,
-            'unit_price': item.unit_price,
-            'subtotal': item.subtotal
-        }
-        for item in items
-    ]
-    
-    # Generate PDF
-    generator = QuotationPDFGenerator()
-    pdf_buffer = generator.generate(quotation_dict, items_list)
+    try:
+        pdf_data = pdf_cache.render_pdf(quotation, items, version)
+    except PDFRenderBusyError as e:
+        raise HTTPException(
+            status_code=503,
+            detail="PDF export is busy, please retry shortly",
+            headers={"Retry-After": str(int(e.retry_after or 1))}
+        )
     
-    # Return as streaming response
-    return StreamingResponse(
-        pdf_buffer,
+    return Response(
+        content=pdf_data,
         media_type="application/pdf",
         headers={
+            **cache_headers,
             "Content-Disposition": f"attachment; filename=quotation_{quotation_id}.pdf"
         }
     )
@@ -730,49 +925,23 @@ def export_quotation_pdf(
 @app.get("/share/quotations/{share_token}")
 def get_shared_quotation(
     share_token: str,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """Public quotation share page - no authentication required but uses opaque token"""
-    from app.infra.db import Quotation
-    
-    quotation = db.query(Quotation).filter(
-        Quotation.share_token == share_token,
-        Quotation.status == "published"
-    ).first()
-    
-    if not quotation:
+    payload = quotation_share.get_payload(db, share_token)
+    if not payload:
         raise HTTPException(status_code=404, detail="Quotation not found or not published")
     
-    items = QuotationService.get_quotation_items(db, quotation.id)
+    etag = make_etag(payload["etag"])
+    cache_headers = {"ETag": etag, "Cache-Control": f"public, max-age={settings.share_cache_ttl}"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=cache_headers)
     
-    return {
-        "quotation": {
-            "id": quotation.id,
-            "title": quotation.title,
-            "customer_name": quotation.customer_name,
-            "total_amount": float(quotation.total_amount) if quotation.total_amount else 0,
-            "discount_amount": float(quotation.discount_amount) if quotation.discount_amount else 0,
-            "final_amount": float(quotation.final_amount) if quotation.final_amount else 0,
-            "notes": quotation.notes,
-            "published_at": quotation.published_at.isoformat() if quotation.published_at else None,
-            "share_token": quotation.share_token
-        },
-        "items": [
-            {
-                "id": item.id,
-                "snapshot": item.snapshot,
-                "quantity": item.quantity,
-                "unit_price": float(item.unit_price) if item.unit_price else 0,
-                "subtotal": float(item.subtotal) if item.subtotal else 0,
-                "custom_title": item.custom_title,
-                "custom_description": item.custom_description
-            }
-            for item in items
-        ]
-    }
+    return Response(content=payload["body"], media_type="application/json", headers=cache_headers)
 
 
-@app.get("/quotations", response_model=List[QuotationResponse])
+@app.get("/quotations", response_model=List[QuotationListItem])
 def list_quotations(
     status: Optional[str] = None,
     skip: int = 0,
@@ -782,7 +951,10 @@ def list_quotations(
 ):
     user_id, agency_id, username = current_user
     quotations = QuotationService.list_quotations(db, agency_id, status, skip, limit)
-    return quotations
+    return [
+        QuotationListItem.model_validate(quotation).model_copy(update=aggregates)
+        for quotation, aggregates in quotations
+    ]
 
 
 
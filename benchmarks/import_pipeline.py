@@ -0,0 +1,179 @@
+"""
+End-to-end load test of the import pipeline.
+
+Drives N imports at the given concurrency against a running API and reports
+throughput and p50/p95/p99 latency per stage:
+
+  extract  - POST /imports/extract (inline AI extraction)
+  queued   - POST /imports, then poll GET /imports/{id} until parse_import_task finishes
+  confirm  - POST /imports/{id}/confirm for every parsed task
+
+Run it against the LLM replay server so no real Moonshot traffic is made:
+
+    python -m app.infra.llm_replay --latency-ms 1500 --rate-limit-rate 0.05 &
+    KIMI_BASE_URL=http://127.0.0.1:8900/v1 KIMI_API_KEY=replay uvicorn app.main:app &
+    KIMI_BASE_URL=http://127.0.0.1:8900/v1 KIMI_API_KEY=replay celery -A app.infra.queue worker &
+    python benchmarks/import_pipeline.py --username demo --password demo -n 200 -c 20
+"""
+from typing import Any, Dict, List, Optional
+import argparse
+import asyncio
+import statistics
+import time
+import httpx
+
+SAMPLE_TEXT = """敦煌沙洲大酒店 2026年价格表
+标准间 480元/间/晚（含双早）
+豪华大床房 620元/间/晚（含双早）
+地址：甘肃省敦煌市沙州北路
+"""
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class StageStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.errors: Dict[str, int] = {}
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+
+    def ok(self, seconds: float):
+        self.latencies.append(seconds)
+
+    def fail(self, reason: str):
+        self.errors[reason] = self.errors.get(reason, 0) + 1
+
+    def report(self) -> str:
+        elapsed = (self.finished or time.perf_counter()) - (self.started or time.perf_counter())
+        throughput = len(self.latencies) / elapsed if elapsed > 0 else 0.0
+
+        def ms(value: Optional[float]) -> str:
+            return f"{value * 1000:8.0f}" if value is not None else "       -"
+
+        line = (
+            f"{self.name:<8} ok={len(self.latencies):<5} failed={sum(self.errors.values()):<4} "
+            f"{throughput:7.2f}/s  p50={ms(percentile(self.latencies, 50))}ms "
+            f"p95={ms(percentile(self.latencies, 95))}ms p99={ms(percentile(self.latencies, 99))}ms"
+        )
+        if self.latencies:
+            line += f"  mean={statistics.mean(self.latencies) * 1000:.0f}ms"
+        if self.errors:
+            line += "\n         errors: " + ", ".join(f"{k} x{v}" for k, v in sorted(self.errors.items()))
+        return line
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> str:
+    response = await client.post("/auth/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def run_stage(name: str, count: int, concurrency: int, job) -> StageStats:
+    stats = StageStats(name)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await job(index)
+                stats.ok(time.perf_counter() - started)
+            except Exception as e:
+                stats.fail(type(e).__name__ if not str(e) else str(e)[:80])
+
+    stats.started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    stats.finished = time.perf_counter()
+    return stats
+
+
+async def main(args):
+    text = open(args.text_file, encoding="utf-8").read() if args.text_file else SAMPLE_TEXT
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        token = await login(client, args.username, args.password)
+        client.headers["Authorization"] = f"Bearer {token}"
+        parsed: List[Dict[str, Any]] = []
+        reports = []
+
+        if args.mode in ("extract", "all"):
+            async def extract(index: int):
+                response = await client.post(
+                    "/imports/extract", data={"input_text": f"{text}\n#{index}"}
+                )
+                if response.status_code != 200:
+                    raise RuntimeError(f"HTTP {response.status_code}")
+                task = response.json()
+                if task["status"] != "parsed":
+                    raise RuntimeError(f"task {task['status']}")
+                parsed.append(task)
+
+            reports.append(await run_stage("extract", args.imports, args.concurrency, extract))
+
+        if args.mode in ("queued", "all"):
+            async def queued(index: int):
+                response = await client.post("/imports", json={"input_text": f"{text}\n#{index}"})
+                if response.status_code != 200:
+                    raise RuntimeError(f"HTTP {response.status_code}")
+                task_id = response.json()["id"]
+                deadline = time.perf_counter() + args.timeout
+                while time.perf_counter() < deadline:
+                    await asyncio.sleep(args.poll_interval)
+                    task = (await client.get(f"/imports/{task_id}")).json()
+                    if task["status"] == "parsed":
+                        parsed.append(task)
+                        return
+                    if task["status"] == "failed":
+                        raise RuntimeError("task failed")
+                raise TimeoutError("task not parsed in time")
+
+            reports.append(await run_stage("queued", args.imports, args.concurrency, queued))
+
+        if not args.skip_confirm and parsed:
+            async def confirm(index: int):
+                task = parsed[index]
+                response = await client.post(f"/imports/{task['id']}/confirm", json={
+                    "extracted_fields": task["extracted_fields"] or {},
+                    "sku_type": (task["parsed_result"] or {}).get("sku_type") or "hotel"
+                })
+                if response.status_code != 200:
+                    raise RuntimeError(f"HTTP {response.status_code}")
+
+            reports.append(await run_stage("confirm", len(parsed), args.concurrency, confirm))
+
+    print(f"\n{'='*80}")
+    print(f"IMPORT PIPELINE BENCHMARK: {args.imports} imports, concurrency {args.concurrency}")
+    print(f"{'='*80}")
+    for report in reports:
+        print(report.report())
+    routes: Dict[str, int] = {}
+    for task in parsed:
+        route = f"{task.get('llm_route') or '-'} ({task.get('llm_model') or '-'})"
+        routes[route] = routes.get(route, 0) + 1
+    if routes:
+        print("routes:  " + ", ".join(f"{k} x{v}" for k, v in sorted(routes.items())))
+    print(f"{'='*80}\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test /imports/extract, parse_import_task and confirm")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--username", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("-n", "--imports", type=int, default=50)
+    parser.add_argument("-c", "--concurrency", type=int, default=10)
+    parser.add_argument("--mode", choices=["extract", "queued", "all"], default="all")
+    parser.add_argument("--text-file", help="input text to import (defaults to a small hotel rate sheet)")
+    parser.add_argument("--skip-confirm", action="store_true")
+    parser.add_argument("--poll-interval", type=float, default=0.5)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    asyncio.run(main(parser.parse_args()))
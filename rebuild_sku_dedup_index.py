@@ -0,0 +1,11 @@
+import sys
+sys.path.insert(0, '.')
+from app.infra.db import SessionLocal
+from app.domain.skus.dedup import SKUDedupIndex
+
+db = SessionLocal()
+
+print("=== 重建SKU查重索引 ===\n")
+count = SKUDedupIndex.rebuild(db)
+print(f'已索引: {count} 个SKU')
+db.close()
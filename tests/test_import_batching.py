@@ -0,0 +1,158 @@
+import os
+import time
+
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("REDIS_URL", "redis://localhost:1/0")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+from app.infra.db import ImportTask, ImportStatus, AuditLog
+from app.infra.llm_client import LLMClient
+from app.domain.imports import batching, tasks
+from app.domain.imports.templates import SupplierTemplateService
+
+
+class FakeRedis:
+    """The handful of list/hash commands the batch queue uses, in memory."""
+
+    def __init__(self):
+        self.lists = {}
+        self.hashes = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def rpush(self, key, *values):
+        self.lists.setdefault(key, []).extend(values)
+
+    def lmove(self, source, destination, src_side, dest_side):
+        if not self.lists.get(source):
+            return None
+        value = self.lists[source].pop(0)
+        self.lists.setdefault(destination, []).append(value)
+        return value
+
+    def lrem(self, key, count, value):
+        items = self.lists.get(key, [])
+        self.lists[key] = [item for item in items if item != value]
+        return len(items) - len(self.lists[key])
+
+    def lrange(self, key, start, end):
+        return list(self.lists.get(key, []))
+
+    def llen(self, key):
+        return len(self.lists.get(key, []))
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    def hsetnx(self, key, field, value):
+        self.hashes.setdefault(key, {}).setdefault(field, value)
+
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes.get(key, {}).pop(field, None)
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.calls = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.calls]
+
+
+class WorkerKilled(BaseException):
+    """Stands in for the hard time limit / OOM kill: not caught by the task's except Exception."""
+
+
+@pytest.fixture
+def env(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    ImportTask.__table__.create(engine)
+    AuditLog.__table__.create(engine)
+    Session = sessionmaker(bind=engine)
+
+    redis_client = FakeRedis()
+    monkeypatch.setattr(batching, "get_redis", lambda: redis_client)
+    monkeypatch.setattr(tasks, "SessionLocal", Session)
+    monkeypatch.setattr(SupplierTemplateService, "match", staticmethod(lambda db, agency_id, text: None))
+    monkeypatch.setattr(tasks.flush_import_batch, "delay", lambda: None)
+    individual = []
+    monkeypatch.setattr(tasks.parse_import_task, "delay", individual.append)
+
+    db = Session()
+    for i in range(2):
+        db.add(ImportTask(id=f"IMP-{i}", agency_id="A", user_id="U", status=ImportStatus.UPLOADED, input_text=f"text {i}"))
+        batching.enqueue(f"IMP-{i}")
+    db.commit()
+    db.close()
+    return Session, redis_client, individual
+
+
+def batch_response(count):
+    return {
+        "items": [{"index": i + 1, "sku_type": "ticket", "extracted_fields": {"sku_name": f"n{i}"}} for i in range(count)],
+        "usage": {}
+    }
+
+
+def test_flush_killed_after_parsing_commit_is_parsed_after_requeue(env, monkeypatch):
+    Session, redis_client, individual = env
+
+    async def killed(self, texts):
+        raise WorkerKilled()
+
+    monkeypatch.setattr(LLMClient, "parse_sku_batch", killed)
+    with pytest.raises(WorkerKilled):
+        tasks.flush_import_batch()
+
+    db = Session()
+    assert {t.status for t in db.query(ImportTask)} == {ImportStatus.PARSING}
+    assert redis_client.llen(batching.PROCESSING_KEY) == 2
+
+    # The claim outlives llm_batch_claim_timeout_s; the next flush re-queues and extracts it
+    claimed_at = redis_client.hashes[batching.CLAIMED_AT_KEY]
+    for task_id in claimed_at:
+        claimed_at[task_id] = time.time() - tasks.settings.llm_batch_claim_timeout_s - 1
+
+    async def answered(self, texts):
+        return batch_response(len(texts))
+
+    monkeypatch.setattr(LLMClient, "parse_sku_batch", answered)
+    result = tasks.flush_import_batch()
+
+    assert result["batched"] == 2
+    db.expire_all()
+    assert {t.status for t in db.query(ImportTask)} == {ImportStatus.PARSED}
+    assert redis_client.llen(batching.PROCESSING_KEY) == 0
+    assert redis_client.llen(batching.PENDING_KEY) == 0
+    assert individual == []
+    db.close()
+
+
+def test_unexpired_claims_are_left_alone(env, monkeypatch):
+    Session, redis_client, individual = env
+
+    async def killed(self, texts):
+        raise WorkerKilled()
+
+    monkeypatch.setattr(LLMClient, "parse_sku_batch", killed)
+    with pytest.raises(WorkerKilled):
+        tasks.flush_import_batch()
+
+    assert batching.requeue_stale(tasks.settings.llm_batch_claim_timeout_s) == []
+    assert tasks.flush_import_batch() == {"status": "empty"}
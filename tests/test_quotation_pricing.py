@@ -0,0 +1,32 @@
+import os
+from datetime import date
+from decimal import Decimal
+
+os.environ.setdefault("SECRET_KEY", "test")
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+os.environ.setdefault("REDIS_URL", "redis://localhost:1/0")
+
+import pytest
+from app.infra.db import SKU
+from app.domain.pricing.service import PricingService
+
+
+def make_sku(sku_type: str, price: float) -> SKU:
+    return SKU(id=f"SKU-{sku_type}", sku_type=sku_type, attrs={"sell_price": price, "daily_sell_price": price})
+
+
+@pytest.mark.parametrize("sku_type", ["itinerary", "ticket", "restaurant", "activity"])
+def test_dated_per_person_line_keeps_unit_price(sku_type):
+    sku = make_sku(sku_type, 1200)
+    result = PricingService.price_for_period(sku, date(2026, 11, 1), date(2026, 11, 5))
+    assert result["unit_price"] == Decimal("1200.00")
+    assert result["days"] == 1
+
+
+def test_dated_hotel_line_sums_nights():
+    sku = make_sku("hotel", 500)
+    sku.calendar_prices = {"2026-11-02": 800}
+    result = PricingService.price_for_period(sku, date(2026, 11, 1), date(2026, 11, 4))
+    assert result["unit_price"] == Decimal("1800.00")
+    assert result["days"] == 3
+    assert result["price_source"] == "mixed"